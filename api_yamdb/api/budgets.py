@@ -0,0 +1,101 @@
+"""
+Бюджеты SQL-запросов представлений: query_budgets = {действие: число}
+на классе (действие viewset'а или метод HTTP у APIView). Запросы
+считаются execute_wrapper за время dispatch(): аутентификация, права,
+обработчик и сериализация, без отрисовки ответа.
+
+При QUERY_BUDGET_STRICT (так в тестах, tests/conftest.py) проверяется
+каждый запрос, и превышение - исключение QueryBudgetExceeded, которое
+тестовый клиент поднимает в тесте. В работе проверяется доля
+QUERY_BUDGET_SAMPLE_RATE запросов, а превышение - предупреждение в
+журнале api.budgets с отпечатками SQL: одинаковые запросы с разными
+значениями сводятся к одному отпечатку, и N+1 виден как отпечаток,
+повторённый N раз.
+"""
+import json
+import logging
+import random
+import re
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+# Отпечатков в сообщении о превышении: самые частые.
+REPORTED_FINGERPRINTS = 5
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """SQL без значений: строки и числа - ?, списки IN - (...)."""
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprints(executed):
+    """Отпечатки выполненных запросов с числом повторов, частые первыми."""
+    return [{'sql': sql, 'count': count} for sql, count in Counter(
+        fingerprint(sql) for sql in executed).most_common()]
+
+
+class QueryBudgetMixin:
+    """
+    Проверка query_budgets представления. Действия без бюджета не
+    проверяются.
+    """
+    query_budgets = {}
+
+    def get_budget_action(self):
+        return getattr(self, 'action', None) or self.request.method.lower()
+
+    def dispatch(self, request, *args, **kwargs):
+        strict = settings.QUERY_BUDGET_STRICT
+        rate = settings.QUERY_BUDGET_SAMPLE_RATE
+        if not self.query_budgets or not strict and (
+                rate <= 0 or rate < 1 and random.random() >= rate):
+            return super().dispatch(request, *args, **kwargs)
+        executed = []
+
+        def record(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(record))
+            response = super().dispatch(request, *args, **kwargs)
+        self.check_query_budget(executed, strict)
+        return response
+
+    def check_query_budget(self, executed, strict):
+        action = self.get_budget_action()
+        budget = self.query_budgets.get(action)
+        if budget is None or len(executed) <= budget:
+            return
+        record = {'view': type(self).__name__, 'action': action,
+                  'path': self.request.path, 'budget': budget,
+                  'queries': len(executed),
+                  'fingerprints': fingerprints(executed)[
+                      :REPORTED_FINGERPRINTS]}
+        if strict:
+            raise QueryBudgetExceeded(
+                f'{record["view"]}.{action}: {len(executed)} SQL при '
+                f'бюджете {budget}:\n' + '\n'.join(
+                    f'{item["count"]} x {item["sql"]}'
+                    for item in record['fingerprints']))
+        logger.warning(json.dumps(record, ensure_ascii=False),
+                       extra={'query_budget': record})
@@ -0,0 +1,172 @@
+"""
+Версии тегов для инвалидации кеша.
+
+Каждый тег (модель целиком или отдельный объект) имеет версию в общем
+кеше. Запись в модель меняет версии её тегов после фиксации транзакции,
+поэтому всё, что было закешировано под старыми версиями, просто
+перестаёт находиться.
+
+Здесь же - счётчики попаданий и промахов кешей ответов для мониторинга
+(команда cache_stats).
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY_PREFIX = 'tag-version:'
+# Меняется только при смене имени пользователя: имя автора входит в
+# ответы с отзывами и комментариями.
+USERNAMES_TAG = 'reviews.customuser:username'
+STATS_KEY_PREFIX = 'cache-stats:'
+STATS_NAMES_KEY = f'{STATS_KEY_PREFIX}names'
+# Счётчики копятся в процессе и сбрасываются в общий кеш пачкой, чтобы
+# не добавлять запись в кеш к каждому запросу.
+STATS_FLUSH_EVERY = 100
+STATS_EVENTS = ('hits', 'misses')
+
+_pending_stats = Counter()
+_pending_lock = threading.Lock()
+
+
+def model_tag(model):
+    return model._meta.label_lower
+
+
+def object_tag(model, pk):
+    return f'{model._meta.label_lower}:{pk}'
+
+
+def scope_tag(model, pk, relation):
+    """Тег связанного списка объекта, например отзывов произведения."""
+    return f'{object_tag(model, pk)}:{relation}'
+
+
+def slug_tag(model, slug):
+    """Тег объекта по слагу (имени пользователя), которым он виден в
+    ответах других моделей."""
+    return f'{model._meta.label_lower}:slug:{slug}'
+
+
+def new_version():
+    # Версия из времени, а не счётчика: после очистки кеша новые версии
+    # не совпадут со старыми, и устаревшие записи не оживут.
+    return time.time_ns()
+
+
+def get_versions(tags, create=True, initial=None):
+    """
+    Словарь {тег: версия}. Отсутствующие версии создаются (со значением
+    `initial`, если оно задано), а с create=False пропускаются.
+    """
+    keys = {f'{VERSION_KEY_PREFIX}{tag}': tag for tag in tags}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing and create:
+        for key in missing:
+            cache.add(key, initial or new_version(), timeout=None)
+        found.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump(*tags):
+    """Меняет версии тегов и возвращает новую версию."""
+    version = new_version()
+    cache.set_many(
+        {f'{VERSION_KEY_PREFIX}{tag}': version for tag in tags},
+        timeout=None)
+    return version
+
+
+def forget(*tags):
+    """Удаляет версии тегов; следующее чтение заведёт новые."""
+    if tags:
+        cache.delete_many([f'{VERSION_KEY_PREFIX}{tag}' for tag in tags])
+
+
+def bump_on_commit(*tags, using=None):
+    """
+    Меняет версии тегов после фиксации текущей транзакции (вне транзакции
+    - сразу). Запрос, прочитавший строки до фиксации, не получает новую
+    версию со старыми данными.
+    """
+    transaction.on_commit(lambda: bump(*tags), using=using)
+
+
+def next_sequence(key):
+    """
+    Следующий номер счётчика `key` (атомарно: incr()). Новый счётчик
+    начинается со времени, как версии тегов: после очистки кеша номера не
+    повторят выданные раньше.
+    """
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, new_version(), timeout=None)
+        return cache.incr(key)
+
+
+def make_key(prefix, *parts):
+    digest = hashlib.md5(
+        json.dumps(parts, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+def stats_key(name, event):
+    return f'{STATS_KEY_PREFIX}{name}:{event}'
+
+
+def record(name, hit):
+    """Учитывает попадание (hit=True) или промах в кеш `name`."""
+    with _pending_lock:
+        _pending_stats[name, STATS_EVENTS[not hit]] += 1
+        if sum(_pending_stats.values()) < STATS_FLUSH_EVERY:
+            return
+    flush_stats()
+
+
+def flush_stats():
+    """Переносит накопленные в процессе счётчики в общий кеш."""
+    with _pending_lock:
+        pending = dict(_pending_stats)
+        _pending_stats.clear()
+    if not pending:
+        return
+    names = cache.get(STATS_NAMES_KEY, set())
+    new_names = {name for name, _ in pending} - names
+    if new_names:
+        cache.set(STATS_NAMES_KEY, names | new_names, timeout=None)
+    for (name, event), delta in pending.items():
+        key = stats_key(name, event)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Ключ вытеснили между add() и incr().
+            cache.set(key, delta, timeout=None)
+
+
+def get_stats():
+    """{имя кеша: {'hits': n, 'misses': n}} по всем процессам."""
+    names = sorted(cache.get(STATS_NAMES_KEY, set()))
+    keys = [stats_key(name, event) for name in names
+            for event in STATS_EVENTS]
+    values = cache.get_many(keys)
+    return {
+        name: {event: values.get(stats_key(name, event), 0)
+               for event in STATS_EVENTS}
+        for name in names
+    }
+
+
+def reset_stats():
+    with _pending_lock:
+        _pending_stats.clear()
+    names = cache.get(STATS_NAMES_KEY, set())
+    cache.delete_many([stats_key(name, event) for name in names
+                       for event in STATS_EVENTS] + [STATS_NAMES_KEY])
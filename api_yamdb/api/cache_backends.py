@@ -0,0 +1,50 @@
+import os
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+
+
+class SharedFileCache(FileBasedCache):
+    """
+    Файловый кеш, общий для всех воркеров на машине. FileBasedCache перед
+    каждой записью перечисляет весь каталог, чтобы проверить переполнение,
+    и запись дорожает с ростом кеша; здесь проверка идёт раз в
+    `cull_every` записей процесса.
+
+    add() и incr() у FileBasedCache - чтение и запись без блокировки:
+    два процесса могут добавить ключ оба или потерять приращение. Здесь
+    они выполняются под блокировкой файла в каталоге кеша, как у
+    счётчиков memcached и Redis.
+    """
+    cull_every = 100
+    # Без суффикса .djcache: очистка и вытеснение файл не трогают.
+    lock_filename = 'counters.lock'
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._writes = 0
+
+    def _cull(self):
+        self._writes += 1
+        if self._writes % self.cull_every == 0:
+            super()._cull()
+
+    @contextmanager
+    def counters_lock(self):
+        self._createdir()
+        with open(os.path.join(self._dir, self.lock_filename), 'ab') as f:
+            locks.lock(f, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(f)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.counters_lock():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self.counters_lock():
+            return super().incr(key, delta, version)
@@ -16,3 +16,12 @@ FORBIDDEN_USERNAMES = ('me', )
 SCORE_MIN_VALUE_VALIDATOR = 1
 SCORE_MAX_VALUE_VALIDATOR = 10
 TEXT_SYMBOL_SLICE = 20
+COUNT_CACHE_TIMEOUT = 60 * 60
+SUGGEST_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+FACETS_CACHE_TIMEOUT = 60 * 60
+FACET_YEAR_BUCKET = 10
+LIST_CACHE_TIMEOUT = 60 * 60
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+EXPORT_CHUNK_SIZE = 2000
+TITLE_JSON_CHUNK_SIZE = 1000
@@ -0,0 +1,74 @@
+"""
+Потоковая выгрузка каталога в NDJSON: по строке JSON на объект.
+
+Строки читаются порциями через QuerySet.iterator() (на PostgreSQL -
+серверным курсором), связанные данные загружаются одним запросом на
+порцию, и каждая порция сразу уходит клиенту: память не растёт с
+размером таблиц, а первые байты отправляются до конца выборки.
+"""
+from functools import partial
+from itertools import islice
+
+from reviews.models import Comment, Review, Title
+
+from .renderers import JSONFragment, NDJSONRenderer
+from .serializers import (CommentExportSerializer, ReviewExportSerializer,
+                          TitleGetSerializer, values_representation)
+
+
+def chunks(iterable, size):
+    """Элементы iterable списками по size."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def title_chunks(chunk_size):
+    """
+    Представления произведений, как в API. Сохранённый JSON читается
+    строками values_list() и отдаётся как есть; для сброшенных
+    представлений произведения с категорией и жанрами загружаются
+    запросом на порцию и собираются TitleGetSerializer. Собранное не
+    сохраняется: запись в таблицу, которую читает открытый курсор, не
+    делается.
+    """
+    rows = Title.objects.order_by('id').values_list('id', 'cached_json')
+    for chunk in chunks(rows.iterator(chunk_size=chunk_size), chunk_size):
+        stale = [pk for pk, cached_json in chunk if cached_json is None]
+        built = {}
+        if stale:
+            titles = list(Title.objects.filter(pk__in=stale).select_related(
+                'category').prefetch_related('genre'))
+            built = {title.pk: item for title, item in zip(
+                titles, TitleGetSerializer(titles, many=True).data)}
+        # Удалённые за это время произведения пропускаются.
+        yield [JSONFragment(cached_json) if cached_json is not None
+               else built[pk] for pk, cached_json in chunk
+               if cached_json is not None or pk in built]
+
+
+def values_chunks(queryset, serializer_class, chunk_size):
+    """Представления по строкам values_list() (ValuesRepresentation)."""
+    representation = values_representation(serializer_class)
+    rows = representation.rows(queryset.order_by('id'))
+    for chunk in chunks(rows.iterator(chunk_size=chunk_size), chunk_size):
+        yield representation.to_representation(chunk)
+
+
+EXPORTS = {
+    'titles': title_chunks,
+    'reviews': partial(values_chunks, Review.objects.all(),
+                       ReviewExportSerializer),
+    'comments': partial(values_chunks, Comment.objects.all(),
+                        CommentExportSerializer),
+}
+
+
+def export_lines(name, chunk_size):
+    """Байты NDJSON выгрузки name, порция за порцией."""
+    renderer = NDJSONRenderer()
+    for items in EXPORTS[name](chunk_size):
+        yield renderer.render_lines(items)
@@ -1,16 +1,161 @@
 import django_filters
+from django.db.models import Q
+from django_filters import utils
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters
 
 from reviews.models import Title
+from reviews.search import normalize
+
+from .indexes import BitmapResult, title_bitmap_index
+from .pagination import KeysetPagination
+
+# Верхняя граница диапазона для поиска по префиксу.
+PREFIX_RANGE_END = chr(0x10FFFF)
+
+
+class NormalizedSearchFilter(filters.SearchFilter):
+    """
+    Поиск по префиксу в нормализованных колонках (`search_fields` вида
+    normalized_<поле>): строка поиска приводится к тому же виду через
+    normalize(), а префикс ищется диапазоном `>= q AND < q + U+10FFFF`,
+    который обслуживается обычным индексом, в отличие от LIKE.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        term = normalize(request.query_params.get(self.search_param, ''))
+        if not search_fields or not term:
+            return queryset
+        condition = Q()
+        for field in search_fields:
+            condition |= Q(**{f'{field}__gte': term,
+                              f'{field}__lt': term + PREFIX_RANGE_END})
+        return queryset.filter(condition)
 
 
 class TitleFilter(django_filters.FilterSet):
-    name = django_filters.CharFilter(
-        field_name='name', lookup_expr='icontains')
-    genre = django_filters.CharFilter(
-        field_name='genre__slug', lookup_expr='exact')
+    # Поля полнотекстового поиска применяются вместе, одним запросом
+    # к индексу, в filter_queryset().
+    SEARCH_FIELDS = ('name', 'description')
+    GENRE_SEPARATOR = ','
+    GENRE_MODE_ALL = 'all'
+    GENRE_MODES = (('any', 'any'), (GENRE_MODE_ALL, 'all'))
+
+    name = django_filters.CharFilter()
+    description = django_filters.CharFilter()
+    # Несколько слагов через запятую; genre_mode=all требует все жанры,
+    # any (по умолчанию) - хотя бы один.
+    genre = django_filters.CharFilter()
+    genre_mode = django_filters.ChoiceFilter(choices=GENRE_MODES)
     category = django_filters.CharFilter(
         field_name='category__slug', lookup_expr='exact')
 
     class Meta:
         model = Title
-        fields = ('name', 'genre', 'category', 'year')
+        fields = ('name', 'description', 'genre', 'genre_mode', 'category',
+                  'year')
+
+    def genre_slugs(self):
+        value = self.form.cleaned_data.get('genre') or ''
+        slugs = (slug.strip() for slug in value.split(self.GENRE_SEPARATOR))
+        return tuple(dict.fromkeys(slug for slug in slugs if slug))
+
+    def match_all_genres(self):
+        return self.form.cleaned_data.get('genre_mode') == self.GENRE_MODE_ALL
+
+    def index_terms(self):
+        """
+        Условия для битового индекса произведений или None, если фильтр
+        индексом не покрывается (полнотекстовый поиск).
+        """
+        data = self.form.cleaned_data
+        if any(data.get(field) for field in self.SEARCH_FIELDS):
+            return None
+        year = data.get('year')
+        if year is not None:
+            if year % 1:
+                return None
+            year = int(year)
+        return {'genres': self.genre_slugs(),
+                'match_all': self.match_all_genres(),
+                'category': data.get('category') or None,
+                'year': year}
+
+    def filter_queryset(self, queryset):
+        terms = {}
+        for field in self.SEARCH_FIELDS:
+            value = self.form.cleaned_data.pop(field, None)
+            if value:
+                terms[field] = value
+        genres, match_all = self.genre_slugs(), self.match_all_genres()
+        self.form.cleaned_data.pop('genre', None)
+        self.form.cleaned_data.pop('genre_mode', None)
+        queryset = super().filter_queryset(queryset)
+        if genres:
+            queryset = queryset.with_genres(genres, match_all)
+        if terms:
+            queryset = queryset.search(**terms)
+        return queryset
+
+
+class TitleOrderingFilter(filters.OrderingFilter):
+    """
+    ?ordering=-rating,year,name. Публичные имена переводятся по словарю
+    `view.ordering_fields` в индексированные колонки, последним полем
+    добавляется id в направлении предыдущего: страница читается
+    диапазоном составного индекса без сортировки.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if not params:
+            return None
+        columns = view.ordering_fields
+        ordering, used = [], set()
+        for term in params.split(','):
+            term = term.strip()
+            name = term.lstrip('-')
+            if name in columns and name not in used:
+                used.add(name)
+                prefix = '-' if term.startswith('-') else ''
+                ordering.append(prefix + columns[name])
+        if not ordering:
+            return None
+        ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+
+class TitleBitmapFilterBackend(DjangoFilterBackend):
+    """
+    Для действий из `view.bitmap_actions` выборка без полнотекстового
+    поиска отбирается битовым индексом в памяти (TitleBitmapIndex), из
+    базы загружаются только объекты страницы. Остальные действия, а
+    также сортировка и пагинация по курсору, которым нужен настоящий
+    QuerySet, фильтруются через ORM.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if (getattr(view, 'action', None) not in getattr(
+                view, 'bitmap_actions', ())
+                or self.needs_queryset(request, view)):
+            return super().filter_queryset(request, queryset, view)
+        filterset = self.get_filterset(request, queryset, view)
+        if filterset is None:
+            return queryset
+        if not filterset.is_valid() and self.raise_exception:
+            raise utils.translate_validation(filterset.errors)
+        terms = filterset.index_terms()
+        if terms is None:
+            return filterset.qs
+        return BitmapResult(title_bitmap_index.select(**terms), queryset,
+                            title_bitmap_index)
+
+    @staticmethod
+    def needs_queryset(request, view):
+        """Странице списка в порядке, отличном от id, нужен QuerySet."""
+        if view.action != 'list':
+            return False
+        return bool(
+            KeysetPagination.cursor_query_param in request.query_params
+            or TitleOrderingFilter().get_ordering(request, None, view))
@@ -0,0 +1,412 @@
+"""
+Индексы каталога в памяти процесса.
+
+Индекс строится лениво при первом обращении, а затем поддерживается
+журналом изменений в общем кеше. Каждое изменение получает номер от
+атомарного счётчика и запись с id изменённых произведений; процесс
+сверяет номер последнего применённого изменения со счётчиком и
+дочитывает из базы только строки пропущенных изменений. Целиком индекс
+перестраивается при первом обращении, после expire() и если записи
+журнала вытеснены из кеша.
+"""
+import operator
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import reduce
+
+from django.core.cache import cache
+
+from reviews.models import Title
+from reviews.search import normalize
+
+from .cache import bump, new_version, next_sequence
+
+BUILD_CHUNK_SIZE = 10000
+# Сколько байт битового множества просматривается за раз при поиске
+# N-го установленного бита.
+BITSET_SCAN_BYTES = 8192
+# Записи журнала изменений: срок хранения, сколько пропущенных изменений
+# дочитывается вместо перестройки, и сколько ждать запись, номер которой
+# уже выдан, прежде чем считать её вытесненной.
+CHANGE_TIMEOUT = 24 * 60 * 60
+MAX_APPLIED_CHANGES = 1000
+MISSING_CHANGE_GRACE = 1.0
+# Запись журнала «перестроить индекс целиком».
+FULL_REBUILD = '*'
+
+
+class VersionedIndex:
+    """
+    Общая часть индексов: журнал изменений, блокировка и ленивая
+    перестройка. Версия тега `tag` меняется с каждым изменением и входит
+    в ключи кешей, построенных по индексу.
+    """
+    tag = None
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # Номер последнего применённого изменения; None - индекс не
+        # построен.
+        self.sequence = None
+        self.missing_since = None
+
+    @property
+    def sequence_key(self):
+        return f'{self.tag}:sequence'
+
+    def change_key(self, sequence):
+        return f'{self.tag}:change:{sequence}'
+
+    def current_sequence(self):
+        sequence = cache.get(self.sequence_key)
+        if sequence is None:
+            cache.add(self.sequence_key, new_version(), timeout=None)
+            sequence = cache.get(self.sequence_key)
+        return sequence
+
+    def ensure_fresh(self):
+        sequence = self.current_sequence()
+        if sequence == self.sequence:
+            return
+        with self.lock:
+            if sequence == self.sequence or self.apply_changes(sequence):
+                return
+            self.rebuild()
+            self.sequence = sequence
+            self.missing_since = None
+
+    def apply_changes(self, sequence):
+        """
+        Дочитывает изменения после своего номера до `sequence`. False -
+        индекс нужно перестроить.
+        """
+        if self.sequence is None or not (
+                0 < sequence - self.sequence <= MAX_APPLIED_CHANGES):
+            return False
+        numbers = range(self.sequence + 1, sequence + 1)
+        found = cache.get_many([self.change_key(n) for n in numbers])
+        pks, applied = set(), self.sequence
+        for number in numbers:
+            change = found.get(self.change_key(number))
+            if change is None:
+                break
+            if change == FULL_REBUILD:
+                return False
+            pks.update(change)
+            applied = number
+        if applied < sequence:
+            # Номер выдаётся до записи изменения: запись могла ещё не
+            # появиться. Если её нет и позже - она вытеснена.
+            now = time.monotonic()
+            if applied > self.sequence or self.missing_since is None:
+                self.missing_since = now
+            elif now - self.missing_since > MISSING_CHANGE_GRACE:
+                return False
+        else:
+            self.missing_since = None
+        if pks:
+            self.apply(pks)
+        self.sequence = applied
+        return True
+
+    def publish(self, change):
+        """
+        Записывает изменение (id произведений или FULL_REBUILD) в журнал и
+        возвращает его номер.
+        """
+        sequence = next_sequence(self.sequence_key)
+        cache.set(self.change_key(sequence), change, CHANGE_TIMEOUT)
+        bump(self.tag)
+        return sequence
+
+    def changed(self, pks, apply):
+        """
+        Публикует собственное изменение для других процессов. Процесс
+        применяет его сам через `apply`, только если оно следует сразу за
+        последним применённым: иначе между ними есть чужие изменения, и
+        все они дочитываются из журнала при следующем обращении.
+        """
+        sequence = self.publish(list(pks))
+        with self.lock:
+            if self.sequence is not None and self.sequence == sequence - 1:
+                apply()
+                self.sequence = sequence
+
+    def invalidate(self):
+        with self.lock:
+            self.sequence = None
+
+    def expire(self):
+        """Сбрасывает индекс в этом и во всех остальных процессах."""
+        self.publish(FULL_REBUILD)
+        self.invalidate()
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def apply(self, pks):
+        """Перечитывает из базы строки произведений `pks`."""
+        raise NotImplementedError
+
+
+class TitleSuggestIndex(VersionedIndex):
+    """
+    Отсортированный массив нормализованных названий для автодополнения:
+    поиск префикса - двоичный поиск и последовательный проход, без
+    обращения к базе.
+    """
+    tag = 'index:title-suggest'
+
+    def rebuild(self):
+        rows = sorted(
+            (normalized, pk, name, year)
+            for pk, name, normalized, year in Title.objects.values_list(
+                'id', 'name', 'normalized_name', 'year'
+            ).order_by().iterator(chunk_size=BUILD_CHUNK_SIZE)
+        )
+        self.keys = [row[0] for row in rows]
+        self.ids = array('q', (row[1] for row in rows))
+        self.names = [row[2] for row in rows]
+        self.years = array('h', (row[3] for row in rows))
+        self.key_by_id = dict(zip(self.ids, self.keys))
+
+    def suggest(self, query, limit):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self.ensure_fresh()
+        with self.lock:
+            position = bisect_left(self.keys, prefix)
+            result = []
+            while (position < len(self.keys) and len(result) < limit
+                   and self.keys[position].startswith(prefix)):
+                result.append({'id': self.ids[position],
+                               'name': self.names[position],
+                               'year': self.years[position]})
+                position += 1
+            return result
+
+    def locate(self, pk):
+        key = self.key_by_id.get(pk)
+        if key is None:
+            return None
+        start = bisect_left(self.keys, key)
+        end = bisect_right(self.keys, key)
+        for position in range(start, end):
+            if self.ids[position] == pk:
+                return position
+        return None
+
+    def discard(self, pk):
+        position = self.locate(pk)
+        if position is not None:
+            for column in (self.keys, self.ids, self.names, self.years):
+                del column[position]
+            del self.key_by_id[pk]
+
+    def insert(self, pk, name, key, year):
+        self.discard(pk)
+        position = bisect_right(self.keys, key)
+        self.keys.insert(position, key)
+        self.ids.insert(position, pk)
+        self.names.insert(position, name)
+        self.years.insert(position, year)
+        self.key_by_id[pk] = key
+
+    def apply(self, pks):
+        rows = {pk: (name, normalized, year)
+                for pk, name, normalized, year in Title.objects.filter(
+                    pk__in=pks).values_list(
+                    'id', 'name', 'normalized_name', 'year')}
+        for pk in pks:
+            if pk in rows:
+                self.insert(pk, *rows[pk])
+            else:
+                self.discard(pk)
+
+    def remove(self, pk):
+        self.changed([pk], lambda: self.discard(pk))
+
+    def put(self, pk, name, key, year):
+        self.changed([pk], lambda: self.insert(pk, name, key, year))
+
+
+def popcount(bits):
+    if hasattr(bits, 'bit_count'):
+        return bits.bit_count()
+    return bin(bits).count('1')
+
+
+def to_bitset(ids):
+    """Битовое множество (целое число) из списка id."""
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        buffer[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def bit_positions(bits, offset, limit):
+    """
+    Номера установленных битов по возрастанию, начиная с `offset`-го.
+    Блоки, целиком попадающие в пропуск, отбрасываются подсчётом битов,
+    перебираются биты только нужного блока.
+    """
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    result = []
+    for start in range(0, len(data), BITSET_SCAN_BYTES):
+        if len(result) >= limit:
+            break
+        block = int.from_bytes(
+            data[start:start + BITSET_SCAN_BYTES], 'little')
+        if not result:
+            total = popcount(block)
+            if offset >= total:
+                offset -= total
+                continue
+        while block and len(result) < limit:
+            lowest = block & -block
+            block ^= lowest
+            if offset:
+                offset -= 1
+                continue
+            result.append(start * 8 + lowest.bit_length() - 1)
+    return result
+
+
+def assign_bit(bitsets, pk, keys):
+    """Оставляет бит `pk` ровно в множествах с ключами из `keys`."""
+    mask = 1 << pk
+    for key, bits in bitsets.items():
+        if bits & mask and key not in keys:
+            bitsets[key] = bits ^ mask
+    for key in keys:
+        if key is not None:
+            bitsets[key] = bitsets.get(key, 0) | mask
+
+
+class TitleBitmapIndex(VersionedIndex):
+    """
+    Битовые множества id произведений по слагу жанра, слагу категории и
+    году. Фильтр по ним - побитовые И/ИЛИ над целыми числами, база нужна
+    только чтобы загрузить объекты одной страницы.
+    """
+    tag = 'index:title-bitmap'
+
+    def rebuild(self):
+        titles, genres, categories, years = [], {}, {}, {}
+        for pk, category, year in Title.objects.values_list(
+                'id', 'category__slug', 'year'
+        ).order_by().iterator(chunk_size=BUILD_CHUNK_SIZE):
+            titles.append(pk)
+            years.setdefault(year, []).append(pk)
+            if category is not None:
+                categories.setdefault(category, []).append(pk)
+        for pk, genre in Title.genre.through.objects.values_list(
+                'title_id', 'genre__slug'
+        ).order_by().iterator(chunk_size=BUILD_CHUNK_SIZE):
+            genres.setdefault(genre, []).append(pk)
+        self.titles = to_bitset(titles)
+        self.genres = {key: to_bitset(ids) for key, ids in genres.items()}
+        self.categories = {
+            key: to_bitset(ids) for key, ids in categories.items()}
+        self.years = {key: to_bitset(ids) for key, ids in years.items()}
+
+    def select(self, genres=(), match_all=False, category=None, year=None):
+        """Битовое множество id произведений, подходящих под фильтр."""
+        self.ensure_fresh()
+        with self.lock:
+            bits = self.titles
+            if genres:
+                bits &= reduce(
+                    operator.and_ if match_all else operator.or_,
+                    (self.genres.get(slug, 0) for slug in genres))
+            if category:
+                bits &= self.categories.get(category, 0)
+            if year is not None:
+                bits &= self.years.get(year, 0)
+            return bits
+
+    def facets(self, bits):
+        """Количество произведений из `bits` по жанрам, категориям и годам."""
+        with self.lock:
+            counts = {}
+            for name, bitsets in (('genre', self.genres),
+                                  ('category', self.categories),
+                                  ('year', self.years)):
+                counts[name] = {}
+                for key, key_bits in bitsets.items():
+                    count = popcount(bits & key_bits)
+                    if count:
+                        counts[name][key] = count
+            return counts
+
+    def apply(self, pks):
+        rows = {pk: (category, year)
+                for pk, category, year in Title.objects.filter(
+                    pk__in=pks).values_list('id', 'category__slug', 'year')}
+        genres = {}
+        for pk, genre in Title.genre.through.objects.filter(
+                title_id__in=pks).values_list('title_id', 'genre__slug'):
+            genres.setdefault(pk, set()).add(genre)
+        for pk in pks:
+            category, year = rows.get(pk, (None, None))
+            self.assign(pk, pk in rows, genres.get(pk, ()), category, year)
+
+    def refresh(self, pk):
+        """Перечитывает из базы жанры, категорию и год произведения."""
+        self.changed([pk], lambda: self.apply([pk]))
+
+    def remove(self, pk):
+        self.changed([pk], lambda: self.assign(pk, False, (), None, None))
+
+    def assign(self, pk, exists, genres, category, year):
+        mask = 1 << pk
+        self.titles = self.titles | mask if exists else self.titles & ~mask
+        assign_bit(self.genres, pk, genres)
+        assign_bit(self.categories, pk, {category})
+        assign_bit(self.years, pk, {year})
+
+
+class BitmapResult:
+    """
+    Результат фильтра по битовому индексу для пагинатора: количество -
+    число установленных битов, а срез загружает из `queryset` только
+    объекты своих id. Порядок - по возрастанию id.
+    """
+    ordered = True
+
+    def __init__(self, bits, queryset, index):
+        self.bits = bits
+        self.queryset = queryset
+        self.model = queryset.model
+        self.index = index
+
+    def count(self):
+        return popcount(self.bits)
+
+    def facet_counts(self):
+        return self.index.facets(self.bits)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice) or item.step not in (None, 1):
+            raise TypeError('Поддерживаются только срезы с шагом 1.')
+        start = item.start or 0
+        stop = self.count() if item.stop is None else item.stop
+        if start < 0 or stop < 0:
+            raise ValueError('Отрицательные индексы не поддерживаются.')
+        ids = bit_positions(self.bits, start, stop - start)
+        if not ids:
+            return []
+        objects = self.queryset.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
+
+
+title_suggest_index = TitleSuggestIndex()
+title_bitmap_index = TitleBitmapIndex()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import flush_stats, get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = ('Показывает попадания и промахи кешей ответов (list, count, '
+            'facets) по всем процессам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.')
+
+    def handle(self, *args, **options):
+        flush_stats()
+        stats = get_stats()
+        if not stats:
+            self.stdout.write('Статистики пока нет.')
+        for name, counts in stats.items():
+            total = counts['hits'] + counts['misses']
+            ratio = counts['hits'] / total if total else 0
+            self.stdout.write(
+                f'{name}: попаданий {counts["hits"]}, промахов '
+                f'{counts["misses"]}, доля попаданий {ratio:.1%}')
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Счётчики обнулены.'))
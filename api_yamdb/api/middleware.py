@@ -0,0 +1,42 @@
+import random
+import time
+
+from django.conf import settings
+
+from .timing import RequestTiming, log_request
+
+
+class RequestTimingMiddleware:
+    """
+    Замеры доли REQUEST_TIMING_SAMPLE_RATE запросов (api.timing):
+    заголовок Server-Timing и строка журнала api.timing. Стоит первым в
+    MIDDLEWARE, поэтому total включает остальные middleware, а view -
+    представление с отрисовкой ответа. Запросы вне выборки обходятся
+    одним random().
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return self.get_response(request)
+        timing = request.timing = RequestTiming()
+        started = time.perf_counter()
+        with timing.recording():
+            response = self.get_response(request)
+            timing.stop_view()
+        total = time.perf_counter() - started
+        response['Server-Timing'] = ', '.join(
+            value for value in (response.get('Server-Timing'),
+                                timing.server_timing(),
+                                f'total;dur={total * 1000:.2f}')
+            if value)
+        log_request(request, response, timing, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = getattr(request, 'timing', None)
+        if timing is not None:
+            timing.start_view()
@@ -0,0 +1,263 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q, QuerySet
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import get_versions, make_key, model_tag, record
+from .constants import COUNT_CACHE_TIMEOUT
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу: следующая страница выбирается условием
+    «строго после последней записи» по полям `view.keyset_ordering`,
+    поэтому страница N стоит столько же, сколько первая (нет COUNT и OFFSET).
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = tuple(view.keyset_ordering)
+        self.base_url = request.build_absolute_uri()
+        values, self.reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self.invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.after(ordering, values))
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if self.reverse:
+            page.reverse()
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page = page
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def after(ordering, values):
+        """
+        Условие «после ключа» для составного порядка. Первое поле
+        дополнительно ограничено нестрогим сравнением, чтобы база начинала
+        просмотр индекса сразу с нужной позиции.
+        """
+        lookups = []
+        for field in ordering:
+            name = field.lstrip('-')
+            lookups.append((name, 'lt' if field.startswith('-') else 'gt'))
+        condition = Q()
+        for position in range(len(lookups) - 1, -1, -1):
+            name, lookup = lookups[position]
+            step = Q(**{f'{name}{LOOKUP_SEP}{lookup}': values[position]})
+            if position < len(lookups) - 1:
+                step |= Q(**{name: values[position]}) & condition
+            condition = step
+        first, lookup = lookups[0]
+        bound = Q(**{f'{first}{LOOKUP_SEP}{lookup}e': values[0]})
+        return bound & condition
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii')))
+            if len(payload['v']) != len(self.ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, payload['v'])
+            ]
+            if None in values:
+                raise ValueError
+            return values, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError,
+                ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            # isoformat() сохраняет микросекунды, иначе ключ потеряет
+            # точность и записи на границе страниц пропадут.
+            values.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value)
+        payload = {'v': values}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload).encode()).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded)
+
+
+class CachedCountPagination(PageNumberPagination):
+    """
+    Постраничная пагинация, которая кеширует `count` по пути и параметрам
+    фильтрации. Ключ включает версии моделей из `view.cache_models`, так
+    что любая запись в них делает закешированное количество недоступным.
+    С `?count=false` количество не считается вовсе.
+    """
+    count_query_param = 'count'
+    count_false_values = ('false', '0', 'no')
+    count_cache_timeout = COUNT_CACHE_TIMEOUT
+    # Параметры, которые не меняют выборку.
+    count_ignored_params = ('page', 'count', 'format')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        count_param = request.query_params.get(self.count_query_param, '')
+        if count_param.lower() in self.count_false_values:
+            return self.paginate_without_count(queryset, request, page_size)
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count - cached_property, значение можно подставить.
+        paginator.count = self.get_count(queryset, request, view)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.count = paginator.count
+        return list(self.page)
+
+    def paginate_without_count(self, queryset, request, page_size):
+        page_number = request.query_params.get(self.page_query_param, 1)
+        try:
+            number = int(page_number)
+            if number < 1:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message='Неверный номер страницы.'))
+        bottom = (number - 1) * page_size
+        rows = list(queryset[bottom:bottom + page_size + 1])
+        if not rows and number > 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message='Страница пуста.'))
+        self.page = UncountedPage(
+            rows[:page_size], number, len(rows) > page_size)
+        self.count = None
+        return self.page.object_list
+
+    def get_count(self, queryset, request, view):
+        if not isinstance(queryset, QuerySet):
+            # Выборку из индекса в памяти (BitmapResult) дёшево посчитать
+            # заново, а её актуальность не следует версиям моделей.
+            return queryset.count()
+        models = getattr(view, 'cache_models', None) or (queryset.model,)
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            if key not in self.count_ignored_params
+            for value in values
+        )
+        versions = get_versions(model_tag(model) for model in models)
+        key = make_key('count', request.path, params, versions)
+        count = cache.get(key)
+        record('count', count is not None)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class UncountedPage:
+    """Страница без общего количества: следующая есть, если нашлась
+    лишняя строка."""
+
+    def __init__(self, object_list, number, has_next):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class OptionalKeysetPagination(CachedCountPagination):
+    """
+    Обычная постраничная пагинация; при наличии параметра `cursor`
+    (для первой страницы - пустого) включается пагинация по ключу.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
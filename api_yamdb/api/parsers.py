@@ -0,0 +1,54 @@
+"""
+Разбор JSON-запросов на orjson с откатом на JSONParser DRF и разбор
+MessagePack.
+"""
+import codecs
+import io
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser на orjson. Тело, которое orjson не разобрал, и тело не в
+    UTF-8 разбирает JSONParser, поэтому данные и ошибки те же.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type,
+                                 parser_context)
+
+
+class MessagePackParser(BaseParser):
+    """
+    Тело в MessagePack (Content-Type: application/msgpack). Подключается
+    в настройках, только если установлен msgpack.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            # Ключи словарей - только строки, как в JSON.
+            return msgpack.unpackb(stream.read(), raw=False)
+        except ValueError as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
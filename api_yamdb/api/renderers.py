@@ -0,0 +1,212 @@
+"""
+JSON-ответы с готовыми фрагментами.
+
+JSONFragment - строка уже сериализованного JSON (например, сохранённое
+представление произведения). JSONFragmentRenderer вставляет фрагменты в
+тело ответа как есть, кодируя json.dumps только обёртку вокруг них, и
+выдаёт те же байты, что и JSONRenderer для разобранных значений.
+ORJSONRenderer делает то же на orjson, если он установлен.
+MessagePackRenderer отдаёт те же данные в MessagePack (пакет msgpack),
+NDJSONRenderer - строками JSON для выгрузок.
+"""
+import json
+
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class JSONFragment(str):
+    """Готовый JSON, который вставляется в ответ без разбора."""
+    __slots__ = ()
+
+
+def loads(fragment):
+    if orjson is not None:
+        try:
+            return orjson.loads(str(fragment))
+        except orjson.JSONDecodeError:
+            # Например, целые больше 64 бит.
+            pass
+    return json.loads(fragment)
+
+
+def expand(data):
+    """Те же данные с разобранными фрагментами."""
+    if isinstance(data, JSONFragment):
+        return loads(data)
+    if isinstance(data, dict):
+        return {key: expand(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [expand(item) for item in data]
+    return data
+
+
+def contains_fragments(data):
+    """Есть ли в данных фрагменты, которые JSONFragmentRenderer.encode()
+    вставит как есть."""
+    if isinstance(data, JSONFragment):
+        return True
+    if isinstance(data, (list, tuple)):
+        return any(isinstance(item, JSONFragment) for item in data)
+    if isinstance(data, dict):
+        return any(isinstance(value, (JSONFragment, dict, list, tuple))
+                   and contains_fragments(value) for value in data.values())
+    return False
+
+
+def escape_separators(content):
+    """U+2028 и U+2029 в UTF-8, экранированные как в JSONRenderer."""
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+        b'\xe2\x80\xa9', b'\\u2029')
+
+
+class JSONFragmentRenderer(JSONRenderer):
+
+    @property
+    def separators(self):
+        return SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+
+    def dumps(self, data):
+        return json.dumps(
+            data, cls=self.encoder_class, ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict, separators=self.separators)
+
+    def encode(self, data):
+        """
+        JSON без отступов. Контейнеры с фрагментами собираются вручную,
+        всё остальное кодируется одним вызовом json.dumps.
+        """
+        if isinstance(data, JSONFragment):
+            return data
+        if isinstance(data, (list, tuple)) and any(
+                isinstance(item, JSONFragment) for item in data):
+            return '[%s]' % self.separators[0].join(map(self.encode, data))
+        if isinstance(data, dict) and any(
+                isinstance(value, (JSONFragment, dict, list, tuple))
+                for value in data.values()):
+            item_separator, key_separator = self.separators
+            return '{%s}' % item_separator.join(
+                f'{self.dumps(str(key))}{key_separator}{self.encode(value)}'
+                for key, value in data.items())
+        return self.dumps(data)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None:
+            # С отступами (в том числе для Browsable API) фрагменты
+            # разбираются и кодируются заново.
+            return super().render(expand(data), accepted_media_type,
+                                  renderer_context)
+        ret = self.encode(data)
+        # Как в JSONRenderer: U+2028 и U+2029 недопустимы в JavaScript.
+        ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return ret.encode()
+
+
+class ORJSONRenderer(JSONFragmentRenderer):
+    """
+    JSONFragmentRenderer на orjson. Даты, Decimal, ленивые строки и другие
+    типы, которые orjson не знает или пишет иначе, передаются в default()
+    кодировщика DRF, поэтому байты ответа те же, что у JSONRenderer.
+    Без orjson, с отступами, ensure_ascii, длинными разделителями или
+    без STRICT_JSON (NaN orjson пишет как null) работает как
+    JSONFragmentRenderer.
+    """
+    orjson_options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+                      if orjson is not None else 0)
+
+    @property
+    def uses_orjson(self):
+        return (orjson is not None and self.compact and self.strict
+                and not self.ensure_ascii)
+
+    def orjson_dumps(self, data):
+        return orjson.dumps(data, default=self.encoder_class().default,
+                            option=self.orjson_options)
+
+    def dumps(self, data):
+        if not self.uses_orjson:
+            return super().dumps(data)
+        try:
+            return self.orjson_dumps(data).decode()
+        except TypeError:
+            # Например, целые больше 64 бит: решает json.dumps.
+            return super().dumps(data)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (data is None or indent is not None or not self.uses_orjson
+                or contains_fragments(data)):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = self.orjson_dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        return escape_separators(ret)
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """
+    NDJSON: по строке JSON на объект. Выгрузки кодируют порции объектов
+    через render_lines(), обычный ответ (например, ошибка) - одна строка.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        return None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return super().render(data, accepted_media_type,
+                              renderer_context) + b'\n'
+
+    def render_lines(self, items):
+        """Строки порции; фрагменты вставляются без разбора."""
+        return b''.join(
+            escape_separators(item.encode()) + b'\n'
+            if isinstance(item, JSONFragment) else self.render(item)
+            for item in items)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Те же данные, что в JSON-ответе, в MessagePack: даты, Decimal и
+    другие типы вне MessagePack преобразует кодировщик DRF, фрагменты
+    JSON разбираются. Подключается в настройках, только если установлен
+    msgpack.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = encoders.JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if contains_fragments(data):
+            data = expand(data)
+        return msgpack.packb(data, default=self.encoder_class().default,
+                             use_bin_type=True)
+
+
+def make_fragment(data):
+    """Фрагмент в формате JSONFragmentRenderer."""
+    return JSONFragment(JSONFragmentRenderer().encode(data))
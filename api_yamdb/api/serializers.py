@@ -1,10 +1,19 @@
 # Standard library imports
+import copy
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
 from django.core.validators import (
     RegexValidator, MaxLengthValidator, MinLengthValidator
 )
 
 # Third-party imports
-from rest_framework import serializers
+from django.db.models import (Case, F, Manager, TextField, Value, When,
+                              prefetch_related_objects)
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.settings import api_settings
 from datetime import datetime
 
 # Local application imports
@@ -12,12 +21,122 @@ from reviews.models import (
     Category, Genre, Title, CustomUser, Review, Comment
 )
 
+from .renderers import JSONFragment, make_fragment
+from .timing import TimedSerializerMixin, timed
 from .constants import (USERNAME_MAX_LENGTH, EMAIL_MAX_LENGTH,
                         MIN_USERNAME_LENGTH, BIO_MAX_LENGTH,
-                        FORBIDDEN_USERNAMES)
-
-
-class TokenSerializer(serializers.Serializer):
+                        FORBIDDEN_USERNAMES, TITLE_JSON_CHUNK_SIZE)
+
+
+class ValuesRepresentation:
+    """
+    Быстрый путь чтения списков: то же представление, что у
+    ModelSerializer, но по строкам values_list() без объектов моделей и
+    обхода полей на каждой строке. Поддерживаются поля модели и
+    SlugRelatedField (JOIN на поле слага); значения, которые из базы уже
+    приходят в нужном виде, не преобразуются.
+    """
+    # to_representation этих полей не меняет значения из базы.
+    PASS_THROUGH_FIELDS = (serializers.IntegerField, serializers.CharField)
+
+    def __init__(self, serializer_class):
+        self.names, self.lookups, self.converters = [], [], []
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SlugRelatedField):
+                lookup = f'{field.source}{LOOKUP_SEP}{field.slug_field}'
+            elif isinstance(field, (serializers.BaseSerializer,
+                                    serializers.RelatedField,
+                                    serializers.SerializerMethodField)):
+                raise ImproperlyConfigured(
+                    f'Поле {serializer_class.__name__}.{name} не читается '
+                    f'через values_list().')
+            else:
+                lookup = field.source.replace('.', LOOKUP_SEP)
+                if not isinstance(field, self.PASS_THROUGH_FIELDS):
+                    self.converters.append((name, len(self.names), field))
+            self.names.append(name)
+            self.lookups.append(lookup)
+
+    def rows(self, queryset):
+        # Именованные строки: пагинация по ключу читает поля атрибутами.
+        return queryset.values_list(*self.lookups, named=True)
+
+    @staticmethod
+    def make_converter(field):
+        """
+        Функция представления значения поля. Для дат в ISO 8601 часовой
+        пояс выбирается один раз на страницу, а не на каждое значение,
+        как в DateTimeField.to_representation.
+        """
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if not isinstance(field, serializers.DateTimeField) or (
+                not isinstance(output_format, str)
+                or output_format.lower() != ISO_8601):
+            return field.to_representation
+        zone = getattr(field, 'timezone', field.default_timezone())
+        if zone is None:
+            return field.to_representation
+
+        def convert(value):
+            if not isinstance(value, datetime) or value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(zone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return convert
+
+    @timed('serializer')
+    def to_representation(self, rows):
+        names = self.names
+        converters = [(name, position, self.make_converter(field))
+                      for name, position, field in self.converters]
+        result = []
+        for row in rows:
+            item = dict(zip(names, row))
+            for name, position, convert in converters:
+                value = row[position]
+                # Как Serializer.to_representation: None не преобразуется.
+                if value is not None:
+                    item[name] = convert(value)
+            result.append(item)
+        return result
+
+
+@lru_cache(maxsize=None)
+def values_representation(serializer_class):
+    return ValuesRepresentation(serializer_class)
+
+
+class CachedFieldsMixin:
+    """
+    Строит поля ModelSerializer (разбор _meta модели в get_fields()) один
+    раз на класс. Экземпляр получает копии готовых полей: простые поля
+    копируются поверхностно (bind() пишет только в атрибуты копии), а
+    поля с вложенными полями - глубоко, как DRF копирует объявленные
+    поля. Привязка полей и проверки данных остаются прежними.
+    """
+    # Поля, которые держат привязанные к себе дочерние поля.
+    NESTED_FIELDS = (serializers.BaseSerializer, serializers.ManyRelatedField,
+                     serializers.ListField, serializers.DictField,
+                     serializers.HStoreField, serializers.JSONField)
+
+    def get_fields(self):
+        cls = type(self)
+        # Через __dict__: у подкласса свои поля, а не копия родительских.
+        fields = cls.__dict__.get('_field_prototypes')
+        if fields is None:
+            fields = super().get_fields()
+            cls._field_prototypes = fields
+        return {
+            name: (copy.deepcopy(field)
+                   if isinstance(field, self.NESTED_FIELDS)
+                   else copy.copy(field))
+            for name, field in fields.items()
+        }
+
+
+class TokenSerializer(TimedSerializerMixin, serializers.Serializer):
     username = serializers.CharField(
         max_length=USERNAME_MAX_LENGTH,
         validators=[
@@ -40,7 +159,8 @@ class TokenSerializer(serializers.Serializer):
         return value
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, CachedFieldsMixin,
+                     serializers.ModelSerializer):
     username = serializers.CharField(
         max_length=USERNAME_MAX_LENGTH,
         validators=[
@@ -92,7 +212,7 @@ class UserSerializer(serializers.ModelSerializer):
         return data
 
 
-class RegisterSerializer(serializers.Serializer):
+class RegisterSerializer(TimedSerializerMixin, serializers.Serializer):
     username_validator = RegexValidator(
         regex=r'^[\w.@+-]+\Z',
         message="Неверный формат Username",
@@ -133,28 +253,68 @@ class RegisterSerializer(serializers.Serializer):
         return user
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, CachedFieldsMixin,
+                         serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ('name', 'slug')
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, CachedFieldsMixin,
+                      serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ('name', 'slug')
 
 
-class TitlePostSerializer(serializers.ModelSerializer):
+class ManySlugRelatedField(serializers.ManyRelatedField):
+    """
+    Список слагов: все объекты загружаются одним запросом slug__in, а не
+    запросом на каждый слаг, как у SlugRelatedField(many=True).
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        child = self.child_relation
+        if not all(isinstance(slug, str) for slug in data):
+            child.fail('invalid')
+        found = {
+            getattr(obj, child.slug_field): obj
+            for obj in child.get_queryset().filter(
+                **{f'{child.slug_field}__in': set(data)})
+        }
+        for slug in data:
+            if slug not in found:
+                child.fail('does_not_exist', slug_name=child.slug_field,
+                           value=slug)
+        return [found[slug] for slug in data]
+
+
+class BulkSlugRelatedField(serializers.SlugRelatedField):
+    """SlugRelatedField, который с many=True проверяет слаги разом."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {key: value for key, value in kwargs.items()
+                       if key in MANY_RELATION_KWARGS}
+        return ManySlugRelatedField(child_relation=cls(*args, **kwargs),
+                                    **list_kwargs)
+
+
+class TitlePostSerializer(TimedSerializerMixin, CachedFieldsMixin,
+                          serializers.ModelSerializer):
     category = serializers.SlugRelatedField(
         slug_field='slug', queryset=Category.objects.all(), required=True)
-    genre = serializers.SlugRelatedField(
+    genre = BulkSlugRelatedField(
         slug_field='slug', queryset=Genre.objects.all(), many=True,
         required=True)
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'name', 'year', 'description', 'genre', 'category')
 
     def validate_year(self, value):
         if value > datetime.now().year:
@@ -170,17 +330,103 @@ class TitlePostSerializer(serializers.ModelSerializer):
         return TitleGetSerializer(instance).data
 
 
-class TitleGetSerializer(serializers.ModelSerializer):
+class TitleGetSerializer(TimedSerializerMixin, CachedFieldsMixin,
+                         serializers.ModelSerializer):
     rating = serializers.FloatField(read_only=True)
     category = CategorySerializer(read_only=True)
     genre = GenreSerializer(many=True, read_only=True)
 
     class Meta:
         model = Title
-        fields = '__all__'
+        fields = ('id', 'rating', 'category', 'genre', 'name', 'year',
+                  'description')
+
+
+class TitleJSONListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        titles = list(data.all() if isinstance(data, Manager) else data)
+        stale = [title for title in titles if title.cached_json is None]
+        built = dict(zip(stale, self.child.render(stale)))
+        return [built.get(title) or JSONFragment(title.cached_json)
+                for title in titles]
+
+
+class TitleJSONSerializer(TitleGetSerializer):
+    """
+    Отдаёт сохранённое представление произведения (Title.cached_json)
+    фрагментом JSON без построения словарей. Сброшенное представление
+    собирается TitleGetSerializer только для ответа: сохраняет его запись
+    после фиксации (store_title_json()), чтение в базу не пишет.
+    """
 
+    class Meta(TitleGetSerializer.Meta):
+        list_serializer_class = TitleJSONListSerializer
 
-class ReviewSerializer(serializers.ModelSerializer):
+    @property
+    def data(self):
+        # Фрагмент вместо ReturnDict.
+        return self.to_representation(self.instance)
+
+    def to_representation(self, instance):
+        if instance.cached_json is None:
+            return self.render([instance])[0]
+        return JSONFragment(instance.cached_json)
+
+    def render(self, titles):
+        """Собирает фрагменты; категория и жанры загружаются для всех разом."""
+        prefetch_related_objects(titles, 'category', 'genre')
+        fragments = []
+        for title in titles:
+            fragments.append(make_fragment(super().to_representation(title)))
+        return fragments
+
+
+def store_title_json(pks, using='default'):
+    """
+    Собирает и сохраняет сброшенный JSON произведений `pks`. Вызывается
+    после фиксации записи, которая его сбросила (api.signals), поэтому
+    собирается из зафиксированных данных.
+    """
+    titles = list(Title.objects.using(using).filter(
+        pk__in=pks, cached_json=None).select_related('category'))
+    if not titles:
+        return
+    fragments = TitleJSONSerializer().render(titles)
+    # Одним UPDATE. Сброс во время сборки увеличил номер: устаревший
+    # JSON не сохранится, его соберёт запись, сделавшая сброс. Номер
+    # только растёт: Title.save() не записывает его из объекта.
+    Title.objects.using(using).filter(
+        pk__in=[title.pk for title in titles]
+    ).update(cached_json=Case(
+        *(When(pk=title.pk,
+               cached_json_version=title.cached_json_version,
+               then=Value(fragment))
+          for title, fragment in zip(titles, fragments)),
+        default=F('cached_json'), output_field=TextField()))
+
+
+def store_stale_title_json(using='default',
+                           chunk_size=TITLE_JSON_CHUNK_SIZE):
+    """
+    Сохраняет весь сброшенный JSON порциями по id - после массовой
+    загрузки, которая идёт без сигналов.
+    """
+    stale = Title.objects.using(using).filter(cached_json=None).order_by(
+        'pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        pks = list(stale.filter(pk__gt=last)[:chunk_size])
+        if not pks:
+            return
+        store_title_json(pks, using)
+        if len(pks) < chunk_size:
+            return
+        last = pks[-1]
+
+
+class ReviewSerializer(TimedSerializerMixin, CachedFieldsMixin,
+                       serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True,
@@ -202,7 +448,8 @@ class ReviewSerializer(serializers.ModelSerializer):
         return data
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, CachedFieldsMixin,
+                        serializers.ModelSerializer):
     author = serializers.SlugRelatedField(
         slug_field='username',
         read_only=True,
@@ -211,3 +458,21 @@ class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = ('id', 'text', 'author', 'pub_date')
+
+
+class ReviewExportSerializer(ReviewSerializer):
+    """Отзыв в выгрузке: с произведением."""
+    title = serializers.IntegerField(source='title_id', read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ('title',)
+
+
+class CommentExportSerializer(CommentSerializer):
+    """Комментарий в выгрузке: с отзывом и произведением."""
+    review = serializers.IntegerField(source='review_id', read_only=True)
+    title = serializers.IntegerField(source='review.title.id',
+                                     read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ('review', 'title')
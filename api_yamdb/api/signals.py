@@ -0,0 +1,218 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init
+from django.db.models.signals import post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+
+from .cache import (USERNAMES_TAG, bump, bump_on_commit, model_tag,
+                    object_tag, scope_tag, slug_tag)
+from .indexes import title_bitmap_index, title_suggest_index
+from .serializers import store_stale_title_json, store_title_json
+
+CACHED_APP_LABEL = 'reviews'
+# Поля, которыми объекты видны в ответах других моделей.
+SLUG_FIELDS = {Category: 'slug', Genre: 'slug', CustomUser: 'username'}
+
+
+def is_cached_model(sender):
+    return sender._meta.app_label == CACHED_APP_LABEL
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_instance_tags(sender, instance, using, **kwargs):
+    if is_cached_model(sender):
+        bump_on_commit(model_tag(sender), object_tag(sender, instance.pk),
+                       using=using)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_review_scope_tags(sender, instance, using, **kwargs):
+    # Рейтинг произведения меняется UPDATE-ом без сигналов Title.
+    bump_on_commit(object_tag(Title, instance.title_id),
+                   scope_tag(Title, instance.title_id, 'reviews'),
+                   using=using)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_scope_tags(sender, instance, using, **kwargs):
+    bump_on_commit(scope_tag(Review, instance.review_id, 'comments'),
+                   using=using)
+
+
+@receiver(post_delete, sender=Title)
+@receiver(post_delete, sender=Review)
+def bump_deleted_scope_tags(sender, instance, using, **kwargs):
+    # Пустой список отзывов или комментариев удалённого объекта не
+    # получает сигналов дочерних записей, а отвечать должен 404.
+    relation = 'reviews' if sender is Title else 'comments'
+    bump_on_commit(scope_tag(sender, instance.pk, relation), using=using)
+
+
+@receiver(post_init, sender=Category)
+@receiver(post_init, sender=Genre)
+@receiver(post_init, sender=CustomUser)
+def remember_slug(sender, instance, **kwargs):
+    # Через __dict__, чтобы отложенное поле не вызвало запрос.
+    instance._saved_slug = instance.__dict__.get(SLUG_FIELDS[sender])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=CustomUser)
+def bump_slug_tags(sender, instance, created, using, **kwargs):
+    slug, saved_slug = getattr(instance, SLUG_FIELDS[sender]), (
+        instance._saved_slug)
+    instance._saved_slug = slug
+    if sender is CustomUser:
+        # Из пользователя в ответы попадает только имя.
+        if created or slug == saved_slug:
+            return
+        bump_on_commit(USERNAMES_TAG, using=using)
+    tags = {slug_tag(sender, slug)}
+    if saved_slug is not None:
+        tags.add(slug_tag(sender, saved_slug))
+    bump_on_commit(*tags, using=using)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=CustomUser)
+def bump_deleted_slug_tag(sender, instance, using, **kwargs):
+    bump_on_commit(slug_tag(sender, getattr(instance, SLUG_FIELDS[sender])),
+                   using=using)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_genre_tags(sender, instance, action, reverse, pk_set, using,
+                          **kwargs):
+    if reverse and action == 'pre_clear':
+        # После clear() со стороны жанра его произведения уже не найти.
+        instance._cleared_title_pks = set(
+            instance.title_set.values_list('pk', flat=True))
+        return
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        pks = pk_set if pk_set is not None else (
+            instance.__dict__.pop('_cleared_title_pks', ()))
+        tags = [object_tag(Title, pk) for pk in pks]
+    else:
+        tags = [object_tag(Title, instance.pk)]
+    bump_on_commit(model_tag(Title), *tags, using=using)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def update_title_bitmap_genres(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse and pk_set is None:
+        # clear() со стороны жанра: какие произведения затронуты, неизвестно.
+        transaction.on_commit(title_bitmap_index.expire)
+        return
+    for pk in pk_set if reverse else (instance.pk,):
+        transaction.on_commit(lambda pk=pk: title_bitmap_index.refresh(pk))
+
+
+@receiver(post_save, sender=Title)
+def update_title_indexes(sender, instance, **kwargs):
+    # Индексы в памяти меняются только после фиксации транзакции.
+    pk = instance.pk
+    values = (pk, instance.name, instance.normalized_name,
+              instance.year)
+    transaction.on_commit(lambda: title_suggest_index.put(*values))
+    transaction.on_commit(lambda: title_bitmap_index.refresh(pk))
+
+
+def renew_title_json(pks, using, expire=True):
+    """
+    Сбрасывает готовый JSON произведений `pks` и собирает его заново
+    после фиксации транзакции (store_title_json()): чтение его не
+    сохраняет, а до фиксации отдаёт прежний.
+    """
+    pks = list(pks)
+    if expire:
+        Title.objects.using(using).filter(pk__in=pks).expire_json()
+    transaction.on_commit(lambda: store_title_json(pks, using), using=using)
+
+
+@receiver(post_save, sender=Title)
+def expire_title_json(sender, instance, created, using, **kwargs):
+    # У нового произведения JSON ещё не собран.
+    renew_title_json([instance.pk], using, expire=not created)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def renew_rated_title_json(sender, instance, using, **kwargs):
+    # Рейтинг и сброс JSON - в Title.objects.change_rating().
+    renew_title_json([instance.title_id], using, expire=False)
+
+
+def renew_related_title_json(titles, using):
+    """
+    То же для выборки произведений жанра или категории: она бывает
+    большой, поэтому после фиксации порциями собирается весь сброшенный
+    JSON (store_stale_title_json()).
+    """
+    titles.expire_json()
+    transaction.on_commit(lambda: store_stale_title_json(using),
+                          using=using)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def expire_title_genre_json(sender, instance, action, reverse, pk_set,
+                            using, **kwargs):
+    if reverse and action == 'pre_clear':
+        renew_related_title_json(
+            Title.objects.using(using).filter(genre=instance), using)
+    elif action.startswith('post_') and not (reverse and pk_set is None):
+        renew_title_json(pk_set if reverse else (instance.pk,), using)
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+@receiver(post_save, sender=Genre)
+@receiver(pre_delete, sender=Genre)
+def expire_related_title_json(sender, instance, using, **kwargs):
+    # pre_delete: после удаления связи уже сняты каскадом и SET_NULL.
+    if not kwargs.get('created'):
+        lookup = 'category' if sender is Category else 'genre'
+        renew_related_title_json(
+            Title.objects.using(using).filter(**{lookup: instance}), using)
+
+
+@receiver(post_delete, sender=Title)
+def remove_title_from_indexes(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: title_suggest_index.remove(pk))
+    transaction.on_commit(lambda: title_bitmap_index.remove(pk))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def expire_title_bitmap(sender, **kwargs):
+    # Множества хранятся по слагам; смена слага или удаление с каскадом
+    # и SET_NULL проходят без сигналов произведений.
+    transaction.on_commit(title_bitmap_index.expire)
+
+
+def invalidate_all():
+    """Сбрасывает кеши и индексы после изменений без сигналов моделей."""
+    bump(*(model_tag(model)
+           for model in apps.get_app_config(CACHED_APP_LABEL).get_models()))
+    title_suggest_index.expire()
+    title_bitmap_index.expire()
+
+
+@receiver(post_migrate)
+def bump_all_model_tags(sender, **kwargs):
+    # flush и migrate меняют таблицы без сигналов моделей.
+    invalidate_all()
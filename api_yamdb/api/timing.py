@@ -0,0 +1,136 @@
+"""
+Замеры запроса для заголовка Server-Timing и журнала api.timing
+(middleware.RequestTimingMiddleware): число и время SQL-запросов, время
+сериализаторов и представления. DEBUG не нужен: SQL считает
+execute_wrapper соединений, а не журнал запросов Django. Замеряются
+только выбранные запросы (REQUEST_TIMING_SAMPLE_RATE); в остальных
+timed() сводится к чтению contextvar.
+
+Участки пересекаются: SQL, выполненный из сериализатора, входит и в
+db, и в serializer, а оба - в view.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Замеры одного запроса; длительности в секундах."""
+
+    def __init__(self):
+        self.queries = 0
+        self.durations = {'db': 0.0, 'serializer': 0.0}
+        self.view_started = None
+        # Участки, которые сейчас замеряются: вложенный вызов не
+        # считается второй раз.
+        self.running = set()
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations['db'] += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def recording(self):
+        """Замеры SQL и участков timed() внутри блока."""
+        token = _current.set(self)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(self.execute))
+                yield self
+        finally:
+            _current.reset(token)
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+
+    def stop_view(self):
+        if self.view_started is not None:
+            self.durations['view'] = time.perf_counter() - self.view_started
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing (длительности в мс)."""
+        metrics = [f'db;dur={self.durations["db"] * 1000:.2f};'
+                   f'desc="{self.queries} SQL"']
+        metrics += [f'{name};dur={seconds * 1000:.2f}'
+                    for name, seconds in self.durations.items()
+                    if name != 'db']
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        record = {'queries': self.queries}
+        record.update({f'{name}_ms': round(seconds * 1000, 2)
+                       for name, seconds in self.durations.items()})
+        return record
+
+
+def timed(name):
+    """
+    Декоратор: время вызовов прибавляется к участку name замеряемого
+    запроса. Вне замера и во вложенных вызовах - просто вызов.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            timing = _current.get()
+            if timing is None or name in timing.running:
+                return function(*args, **kwargs)
+            timing.running.add(name)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timing.running.discard(name)
+                timing.durations[name] = timing.durations.get(name, 0.0) + (
+                    time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+class TimedSerializerMixin:
+    """
+    Время представления и проверки данных сериализатора - участок
+    serializer. Переопределённые в подклассах to_representation и
+    run_validation оборачиваются тоже: иначе переопределение, не
+    вызывающее super(), выпало бы из замера.
+    """
+    TIMED_METHODS = ('to_representation', 'run_validation')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for method in cls.TIMED_METHODS:
+            if method in cls.__dict__:
+                setattr(cls, method, timed('serializer')(cls.__dict__[method]))
+
+    @timed('serializer')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+    @timed('serializer')
+    def run_validation(self, *args, **kwargs):
+        return super().run_validation(*args, **kwargs)
+
+
+def log_request(request, response, timing, total):
+    """Строка журнала api.timing: JSON с замерами запроса."""
+    match = request.resolver_match
+    record = {'method': request.method, 'path': request.path,
+              'view': match.view_name if match else None,
+              'status': response.status_code,
+              'total_ms': round(total * 1000, 2), **timing.as_dict()}
+    logger.info(json.dumps(record, ensure_ascii=False, sort_keys=True),
+                extra={'request_timing': record})
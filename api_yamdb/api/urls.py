@@ -1,11 +1,11 @@
-from django.urls import include, path  # Импорты из библиотеки Django
+from django.urls import include, path, re_path  # Импорты из библиотеки Django
 
 from rest_framework.routers import DefaultRouter  # Импорты сторонних библиотек
 
 from .views import (  # Импорты модулей текущего проекта
     CategoryViewSet, GenreViewSet, TitleViewSet,
     UsersViewSet, RegisterView, TokenView,
-    CommentViewSet, ReviewViewSet
+    CommentViewSet, ReviewViewSet, ExportView
 )
 
 
@@ -25,5 +25,7 @@ router_v1.register(
 urlpatterns = [
     path('v1/auth/signup/', RegisterView.as_view()),
     path('v1/auth/token/', TokenView.as_view()),
+    re_path(r'^v1/export/(?P<name>titles|reviews|comments)\.ndjson$',
+            ExportView.as_view()),
     path('v1/', include(router_v1.urls)),
 ]
@@ -3,14 +3,18 @@ from django.conf import settings
 
 # Standard library
 from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
 from django.core.mail import send_mail
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 # Third-party
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, status, views, permissions, filters
+from rest_framework import viewsets, status, views, permissions
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework import mixins, viewsets
@@ -24,18 +28,196 @@ from api.serializers import (RegisterSerializer,
                              TokenSerializer,
                              CommentSerializer,
                              ReviewSerializer)
-from .serializers import TitleGetSerializer, TitlePostSerializer
+from .serializers import (TitleJSONSerializer, TitlePostSerializer,
+                          values_representation)
 from .permissions import (IsAdmin,
                           IsReadOnly,
                           AdminModeratorAuthor)
-from .filters import TitleFilter
+from .budgets import QueryBudgetMixin
+from .cache import (USERNAMES_TAG, forget, get_versions, make_key, model_tag,
+                    new_version, object_tag, record, scope_tag, slug_tag)
+from .constants import (EXPORT_CHUNK_SIZE, FACET_YEAR_BUCKET,
+                        FACETS_CACHE_TIMEOUT, LIST_CACHE_TIMEOUT,
+                        RESPONSE_CACHE_TIMEOUT,
+                        SUGGEST_LIMIT, SUGGEST_MAX_LIMIT)
+from .filters import (NormalizedSearchFilter, TitleBitmapFilterBackend,
+                      TitleFilter, TitleOrderingFilter)
+from .indexes import title_bitmap_index, title_suggest_index
+from .pagination import CachedCountPagination, OptionalKeysetPagination
+from .export import export_lines
+from .renderers import NDJSONRenderer, ORJSONRenderer, expand
+
+
+class CachedListMixin(mixins.ListModelMixin):
+    """
+    Кеширует данные ответа list() в общем кеше по адресу (со схемой и
+    хостом: ссылки пагинации в данных абсолютные), параметрам запроса и
+    версии тега модели. post_save и post_delete меняют версию
+    (api.signals), поэтому попадание не выполняет ни одного SQL-запроса
+    и не отдаёт устаревших данных ни в одном процессе.
+    """
+    list_cache_timeout = LIST_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        model = self.get_queryset().model
+        key = make_key('list', request.scheme, request.get_host(),
+                       request.path, sorted(request.query_params.lists()),
+                       get_versions([model_tag(model)]))
+        data = cache.get(key)
+        record('list', data is not None)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data, self.list_cache_timeout)
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag и Last-Modified для list() и retrieve(). Валидаторы строятся из
+    пути, параметров, формата ответа и версий тегов get_version_tags(),
+    поэтому 304 Not Modified отдаётся по одним версиям из кеша, до
+    загрузки и сериализации строк.
+    """
+
+    def get_version_tags(self):
+        raise NotImplementedError
+
+    def url_id(self, kwarg):
+        """
+        Id из адреса в виде числа, как в тегах сигналов (api.signals):
+        /titles/01/ и /titles/1/ - одно произведение с одними тегами.
+        """
+        value = self.kwargs[kwarg]
+        return int(value) if value.isdecimal() else value
+
+    def get_validators(self, request, versions):
+        key = make_key('etag', request.path,
+                       sorted(request.query_params.lists()),
+                       request.accepted_renderer.format, versions)
+        # Версии - время записи в наносекундах.
+        last_modified = max(versions.values()) // 10 ** 9
+        return quote_etag(key.split(':', 1)[1]), last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        tags = set(self.get_version_tags())
+        versions = get_versions(tags, create=False)
+        created = tags - versions.keys()
+        if created:
+            versions = get_versions(tags)
+        etag, last_modified = self.get_validators(request, versions)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            try:
+                response = handler(request, *args, **kwargs)
+            except Exception:
+                # Запрос к несуществующему id (Http404) не оставляет
+                # ключей в кеше. Удалить версию безопасно, даже если её
+                # уже сменила запись: следующее чтение заведёт новую.
+                forget(*created)
+                raise
+            if response.status_code != status.HTTP_200_OK:
+                forget(*created)
+                return response
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Общий кеш ответов list() и retrieve() на анонимные GET-запросы по
+    адресу (со схемой и хостом: ссылки пагинации в ответе абсолютные),
+    нормализованным параметрам и формату ответа. Запись хранит
+    версии тегов get_response_tags(), от которых зависят её данные, и
+    отдаётся, только пока ни одна из них не изменилась: запись в модели
+    меняет ровно свои теги (api.signals). Запросы с пользователем кеш не
+    читают и не пополняют.
+    """
+    response_cache_timeout = RESPONSE_CACHE_TIMEOUT
+
+    def get_response_tags(self, data):
+        raise NotImplementedError
+
+    @staticmethod
+    def response_items(data):
+        if isinstance(data, dict) and 'results' in data:
+            return data['results']
+        return data if isinstance(data, list) else [data]
+
+    def author_tags(self, data):
+        return [slug_tag(CustomUser, item['author'])
+                for item in self.response_items(data)]
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = make_key('response', request.scheme, request.get_host(),
+                       request.path, sorted(request.query_params.lists()),
+                       request.accepted_renderer.format)
+        entry = cache.get(key)
+        if entry is not None:
+            data, versions = entry
+            if get_versions(versions) == versions:
+                record('response', True)
+                return Response(data)
+        record('response', False)
+        started = new_version()
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            # Отсутствующие версии создаются с временем начала запроса:
+            # запись, зафиксированная во время построения ответа, уже
+            # поставила бы свою, более позднюю. Тег, изменённый во время
+            # построения ответа, мог не попасть в данные: такой ответ не
+            # кешируется.
+            versions = get_versions(self.get_response_tags(response.data),
+                                    initial=started)
+            if max(versions.values()) <= started:
+                cache.set(key, (response.data, versions),
+                          self.response_cache_timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
 
-class BaseViewSet(viewsets.GenericViewSet):
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class ValuesListMixin:
+    """
+    list() только для чтения через values_list(): строки страницы не
+    превращаются в объекты моделей, а словари ответа строятся по полям
+    сериализатора (serializers.ValuesRepresentation). Ответ совпадает с
+    ответом сериализатора побайтно.
+    """
+
+    def list(self, request, *args, **kwargs):
+        representation = values_representation(self.get_serializer_class())
+        rows = representation.rows(
+            self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                representation.to_representation(page))
+        return Response(representation.to_representation(rows))
+
+
+class BaseViewSet(QueryBudgetMixin, viewsets.GenericViewSet):
     permission_classes = (IsAdmin,)
     http_method_names = ('get', 'post', 'delete', 'head', 'options')
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
-    search_fields = ('name',)
+    filter_backends = (DjangoFilterBackend, NormalizedSearchFilter)
+    search_fields = ('normalized_name',)
 
     def get_permissions(self):
         if self.action in ('list', 'retrieve'):
@@ -43,46 +225,164 @@ class BaseViewSet(viewsets.GenericViewSet):
         return (IsAdmin(), )
 
 
-class CategoryViewSet(mixins.ListModelMixin,
+class CategoryViewSet(CachedListMixin,
                       mixins.CreateModelMixin,
                       mixins.DestroyModelMixin,
                       BaseViewSet):
     queryset = Category.objects.order_by('id')
     serializer_class = CategorySerializer
+    # Удаление обнуляет категорию у произведений, сбрасывает их JSON и
+    # после фиксации собирает его заново.
+    query_budgets = {'list': 3, 'create': 3, 'destroy': 11}
     lookup_field = 'slug'
 
     def retrieve(self, request, *args, **kwargs):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
-class GenreViewSet(mixins.ListModelMixin,
+class GenreViewSet(CachedListMixin,
                    mixins.CreateModelMixin,
                    mixins.DestroyModelMixin,
                    BaseViewSet):
     queryset = Genre.objects.all().order_by('id')
     serializer_class = GenreSerializer
+    query_budgets = {'list': 3, 'create': 3, 'destroy': 7}
     lookup_field = 'slug'
 
     def retrieve(self, request, *args, **kwargs):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
 
-class TitleViewSet(viewsets.ModelViewSet):
-    queryset = Title.objects.all()
-    filter_backends = (DjangoFilterBackend,)
+class TitleViewSet(QueryBudgetMixin, ConditionalGetMixin,
+                   AnonymousResponseCacheMixin, viewsets.ModelViewSet):
+    # Произведения отдаются готовым JSON из своей строки; категория и
+    # жанры загружаются только для ещё не собранного (TitleJSONSerializer).
+    queryset = Title.objects.order_by('id')
+    # Порядок по id совпадает с порядком выдачи битового индекса.
+    filter_backends = (TitleBitmapFilterBackend, TitleOrderingFilter)
+    bitmap_actions = ('list', 'facets')
     filterset_class = TitleFilter
+    # Публичное имя поля сортировки -> индексированная колонка.
+    ordering_fields = {'rating': 'rating_avg', 'year': 'year',
+                       'name': 'normalized_name'}
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = OptionalKeysetPagination
+    # Фильтры по слагам жанра и категории зависят и от этих таблиц.
+    cache_models = (Title, Genre, Category)
+    # list - со сборкой сброшенного JSON страницы (категории и жанры
+    # одним запросом на всю страницу); create и partial_update - с
+    # обновлением загруженного битового индекса и сохранением JSON, при
+    # partial_update - и со сменой набора жанров. Жанры по слагам
+    # загружаются одним запросом, бюджет не зависит от их числа.
+    query_budgets = {'list': 5, 'retrieve': 4, 'create': 18,
+                     'partial_update': 26, 'destroy': 7, 'facets': 6,
+                     'suggest': 1}
+
+    @property
+    def keyset_ordering(self):
+        # Курсор следует выбранной сортировке.
+        return TitleOrderingFilter().get_ordering(
+            self.request, None, self) or ('id',)
 
     def get_permissions(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'suggest', 'facets'):
             return [IsReadOnly()]
         return [IsAdmin()]
 
+    def get_version_tags(self):
+        # В ответ входят названия категорий и жанров, а рейтинг меняется
+        # с каждым отзывом.
+        tags = [model_tag(Category), model_tag(Genre)]
+        if self.action == 'retrieve':
+            return tags + [object_tag(Title, self.url_id('pk'))]
+        return tags + [model_tag(Title), model_tag(Review)]
+
+    def get_response_tags(self, data):
+        # Точнее валидаторов: данные уже известны, поэтому вместо таблиц
+        # категорий и жанров - только слаги из ответа.
+        tags = []
+        for title in self.response_items(expand(data)):
+            tags.append(object_tag(Title, title['id']))
+            if title['category'] is not None:
+                tags.append(slug_tag(Category, title['category']['slug']))
+            tags.extend(slug_tag(Genre, genre['slug'])
+                        for genre in title['genre'])
+        if self.action == 'list':
+            # Состав страницы; при сортировке по рейтингу его меняет
+            # и любой отзыв.
+            tags += [model_tag(Title), title_bitmap_index.tag]
+            if any(field.lstrip('-') == 'rating_avg'
+                   for field in self.keyset_ordering):
+                tags.append(model_tag(Review))
+        return tags
+
     def get_serializer_class(self):
         if self.action in ['list', 'retrieve']:
-            return TitleGetSerializer
+            return TitleJSONSerializer
         return TitlePostSerializer
 
+    def perform_create(self, serializer):
+        # Произведение и его жанры фиксируются вместе: готовый JSON и
+        # индексы пересобираются один раз, после фиксации.
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    @action(detail=False, methods=['GET'], pagination_class=None)
+    def suggest(self, request):
+        # Автодополнение по началу названия из индекса в памяти,
+        # без запросов к базе.
+        try:
+            limit = int(request.query_params.get('limit', SUGGEST_LIMIT))
+        except ValueError:
+            limit = SUGGEST_LIMIT
+        limit = max(1, min(limit, SUGGEST_MAX_LIMIT))
+        return Response(title_suggest_index.suggest(
+            request.query_params.get('q', ''), limit))
+
+    @action(detail=False, methods=['GET'], pagination_class=None)
+    def facets(self, request):
+        # Количество произведений по жанрам, категориям и десятилетиям
+        # при тех же параметрах фильтра, что и у списка.
+        params = sorted(request.query_params.lists())
+        tags = [model_tag(model) for model in self.cache_models]
+        versions = get_versions(tags + [title_bitmap_index.tag])
+        key = make_key('facets', params, versions)
+        data = cache.get(key)
+        record('facets', data is not None)
+        if data is None:
+            result = self.filter_queryset(self.get_queryset())
+            data = self.build_facets(result.count(), result.facet_counts())
+            cache.set(key, data, FACETS_CACHE_TIMEOUT)
+        return Response(data)
+
+    @staticmethod
+    def build_facets(total, counts):
+        def by_slug(model, slug_counts):
+            return sorted(
+                ({'slug': slug, 'name': name,
+                  'count': slug_counts.get(slug, 0)}
+                 for slug, name in model.objects.values_list('slug', 'name')),
+                key=lambda item: (-item['count'], item['name']))
+
+        decades = {}
+        for year, count in counts['year'].items():
+            start = year - year % FACET_YEAR_BUCKET
+            decades[start] = decades.get(start, 0) + count
+        return {
+            'count': total,
+            'genre': by_slug(Genre, counts['genre']),
+            'category': by_slug(Category, counts['category']),
+            'year': [
+                {'from': start, 'to': start + FACET_YEAR_BUCKET - 1,
+                 'count': decades[start]}
+                for start in sorted(decades)
+            ],
+        }
+
     def update(self, request, *args, **kwargs):
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
@@ -91,19 +391,21 @@ class TitleViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(
             instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        self.perform_update(serializer)
         return Response(serializer.data)
 
 
-class UsersViewSet(viewsets.ModelViewSet):
+class UsersViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
     permission_classes = (permissions.IsAuthenticated, IsAdmin)
     http_method_names = ['get', 'post', 'patch', 'delete']
     lookup_field = 'username'
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    search_fields = ('username', 'email',)
-    pagination_class = PageNumberPagination
+    filter_backends = [DjangoFilterBackend, NormalizedSearchFilter]
+    search_fields = ('normalized_username', 'normalized_email',)
+    pagination_class = CachedCountPagination
+    query_budgets = {'list': 3, 'retrieve': 2, 'create': 4,
+                     'partial_update': 5, 'destroy': 9, 'me': 4}
 
     @action(detail=False,
             methods=['GET', 'PATCH'],
@@ -124,8 +426,9 @@ class UsersViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class RegisterView(views.APIView):
+class RegisterView(QueryBudgetMixin, views.APIView):
     permission_classes = (permissions.AllowAny,)
+    query_budgets = {'post': 9}
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -146,8 +449,9 @@ class RegisterView(views.APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class TokenView(views.APIView):
+class TokenView(QueryBudgetMixin, views.APIView):
     permission_classes = (permissions.AllowAny,)
+    query_budgets = {'post': 1}
 
     def post(self, request, *args, **kwargs):
         serializer = TokenSerializer(data=request.data)
@@ -163,11 +467,33 @@ class TokenView(views.APIView):
             return Response(request.data, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ExportView(views.APIView):
+    """
+    Потоковая выгрузка произведений, отзывов или комментариев в NDJSON
+    для администраторов.
+    """
+    permission_classes = (permissions.IsAuthenticated, IsAdmin)
+    renderer_classes = (NDJSONRenderer, ORJSONRenderer)
+    chunk_size = EXPORT_CHUNK_SIZE
+
+    def get(self, request, name):
+        return StreamingHttpResponse(export_lines(name, self.chunk_size),
+                                     content_type=NDJSONRenderer.media_type)
+
+
+class ReviewViewSet(QueryBudgetMixin, ConditionalGetMixin,
+                    AnonymousResponseCacheMixin, ValuesListMixin,
+                    viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete']
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = (AdminModeratorAuthor,)
+    # Запись отзыва пересчитывает рейтинг произведения и после фиксации
+    # сохраняет его JSON.
+    query_budgets = {'list': 4, 'retrieve': 3, 'create': 9,
+                     'partial_update': 10, 'destroy': 10}
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('pub_date', 'id')
 
     def get_title(self):
         return get_object_or_404(Title,
@@ -180,14 +506,33 @@ class ReviewViewSet(viewsets.ModelViewSet):
         )
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return self.get_title().reviews.select_related('author').order_by(
+            *self.keyset_ordering)
+
+    def get_version_tags(self):
+        if self.action == 'retrieve':
+            tag = object_tag(Review, self.url_id('pk'))
+        else:
+            tag = scope_tag(Title, self.url_id('title_id'), 'reviews')
+        return [tag, USERNAMES_TAG]
+
+    def get_response_tags(self, data):
+        # Вместо общего тега имён - имена авторов из ответа.
+        tag, _ = self.get_version_tags()
+        return [tag, *self.author_tags(data)]
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(QueryBudgetMixin, ConditionalGetMixin,
+                     AnonymousResponseCacheMixin, ValuesListMixin,
+                     viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete']
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     permission_classes = (AdminModeratorAuthor,)
+    query_budgets = {'list': 4, 'retrieve': 3, 'create': 3,
+                     'partial_update': 4, 'destroy': 5}
+    pagination_class = OptionalKeysetPagination
+    keyset_ordering = ('pub_date', 'id')
 
     def get_review(self):
         return get_object_or_404(
@@ -201,4 +546,17 @@ class CommentViewSet(viewsets.ModelViewSet):
         )
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return self.get_review().comments.select_related('author').order_by(
+            *self.keyset_ordering)
+
+    def get_version_tags(self):
+        if self.action == 'retrieve':
+            tag = object_tag(Comment, self.url_id('pk'))
+        else:
+            tag = scope_tag(Review, self.url_id('review_id'), 'comments')
+        return [tag, USERNAMES_TAG]
+
+    def get_response_tags(self, data):
+        # Вместо общего тега имён - имена авторов из ответа.
+        tag, _ = self.get_version_tags()
+        return [tag, *self.author_tags(data)]
@@ -1,3 +1,5 @@
+import hashlib
+from importlib.util import find_spec
 from pathlib import Path
 
 
@@ -28,6 +30,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым: замер охватывает остальные middleware.
+    'api.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,6 +41,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Доля запросов с замерами SQL, сериализаторов и представления
+# (заголовок Server-Timing и журнал api.timing); 0 - выключено.
+REQUEST_TIMING_SAMPLE_RATE = 0.01
+
+# Бюджеты SQL-запросов представлений (api.budgets): доля проверяемых
+# запросов; при QUERY_BUDGET_STRICT проверяется каждый запрос, а
+# превышение - исключение (так в тестах).
+QUERY_BUDGET_SAMPLE_RATE = 0.01
+QUERY_BUDGET_STRICT = False
+
 ROOT_URLCONF = 'api_yamdb.urls'
 
 TEMPLATES_DIR = BASE_DIR / 'templates'
@@ -65,6 +79,21 @@ DATABASES = {
     }
 }
 
+# Общий для всех воркеров кеш: версии тегов, количества и ответы списков.
+CACHES = {
+    'default': {
+        'BACKEND': 'api.cache_backends.SharedFileCache',
+        'LOCATION': BASE_DIR / 'cache',
+        # Версии тегов и ответы относятся к своей базе: проекты с разными
+        # базами на одном каталоге кеша не видят записей друг друга.
+        'KEY_PREFIX': hashlib.md5(
+            str(DATABASES['default']['NAME']).encode()).hexdigest()[:12],
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -81,6 +110,8 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+MSGPACK_INSTALLED = find_spec('msgpack') is not None
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -88,7 +119,20 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # orjson, если установлен; иначе те же классы работают на json.
+    # MessagePack (Accept и Content-Type application/msgpack) - только
+    # с установленным msgpack.
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ) + (('api.renderers.MessagePackRenderer',) if MSGPACK_INSTALLED
+         else ()),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ) + (('api.parsers.MessagePackParser',) if MSGPACK_INSTALLED else ()),
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CachedCountPagination',
     'PAGE_SIZE': 5,
 
 }
@@ -0,0 +1,148 @@
+"""
+Загрузка CSV из static/data в базу.
+
+TABLES описывает файлы в порядке внешних ключей: модель, переименование
+колонок и построение объекта из строки. Объекты вставляются
+bulk_create(ignore_conflicts=True) с идентификаторами из файлов, поэтому
+повторная загрузка пропускает уже существующие строки. Пароли
+пользователей не хешируются (пароль непригоден, вход - по коду
+подтверждения), сигналы на строку выключены, а производные данные
+(рейтинги, готовый JSON, кеши) пересчитываются после загрузки.
+"""
+import csv
+from contextlib import contextmanager
+
+from django.contrib.auth.base_user import AbstractBaseUser
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.color import no_style
+from django.db import connections
+from django.db.models import DateField
+from django.db.models.signals import (m2m_changed, post_init, post_save,
+                                      pre_init, pre_save)
+
+from api.export import chunks
+
+from .models import (Category, Comment, CustomUser, Genre,
+                     NormalizedFieldsMixin, Review, Title)
+
+ROW_SIGNALS = (pre_init, post_init, pre_save, post_save, m2m_changed)
+
+
+class CsvTable:
+    """Файл static/data и модель, в которую он загружается."""
+
+    def __init__(self, file_name, model, renamed=None):
+        self.file_name = file_name
+        self.model = model
+        # Колонка файла -> поле модели.
+        self.renamed = renamed or {}
+
+    def __str__(self):
+        return self.file_name
+
+    def build(self, row):
+        fields = {}
+        for column, value in row.items():
+            name = self.renamed.get(column, column)
+            # Пустой внешний ключ - NULL, а не ''.
+            fields[name] = None if name.endswith('_id') and not value else (
+                value)
+        instance = self.model(**fields)
+        if isinstance(instance, NormalizedFieldsMixin):
+            instance.fill_normalized_fields()
+        if isinstance(instance, AbstractBaseUser):
+            # Непригодный пароль без случайного хвоста set_unusable_password:
+            # его генерация дороже самой вставки.
+            instance.password = UNUSABLE_PASSWORD_PREFIX
+        return instance
+
+    def db_values(self, row, connection):
+        """
+        Значения колонок таблицы для вставки в обход bulk_create, в
+        порядке local_concrete_fields, как их готовит save().
+        """
+        instance = self.build(row)
+        return tuple(
+            field.get_db_prep_save(field.pre_save(instance, True),
+                                   connection)
+            for field in self.model._meta.local_concrete_fields)
+
+
+TABLES = (
+    CsvTable('users.csv', CustomUser),
+    CsvTable('category.csv', Category),
+    CsvTable('genre.csv', Genre),
+    CsvTable('titles.csv', Title, {'category': 'category_id'}),
+    CsvTable('genre_title.csv', Title.genre.through),
+    CsvTable('review.csv', Review, {'author': 'author_id'}),
+    CsvTable('comments.csv', Comment, {'author': 'author_id'}),
+)
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        yield from csv.DictReader(file)
+
+
+@contextmanager
+def muted_signals(*signals):
+    """Выключает получателей сигналов на время блока."""
+    saved = [(signal, signal.receivers) for signal in signals]
+    try:
+        for signal in signals:
+            signal.receivers = []
+            signal.sender_receivers_cache.clear()
+        yield
+    finally:
+        for signal, receivers in saved:
+            signal.receivers = receivers
+            signal.sender_receivers_cache.clear()
+
+
+@contextmanager
+def stored_dates(*models):
+    """
+    Даты с auto_now_add/auto_now пишутся из файла, а не текущим
+    временем.
+    """
+    fields = [(field, field.auto_now, field.auto_now_add)
+              for model in models for field in model._meta.concrete_fields
+              if isinstance(field, DateField)
+              and (field.auto_now or field.auto_now_add)]
+    try:
+        for field, _, _ in fields:
+            field.auto_now = field.auto_now_add = False
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def load_rows(table, rows, batch_size, using='default'):
+    """Вставляет строки файла пачками; возвращает число прочитанных."""
+    count = 0
+    manager = table.model._default_manager.db_manager(using)
+    for batch in chunks(map(table.build, rows), batch_size):
+        manager.bulk_create(batch, batch_size=batch_size,
+                            ignore_conflicts=True)
+        count += len(batch)
+    return count
+
+
+def reset_sequences(using='default'):
+    """Счётчики идентификаторов после вставки с явными id (PostgreSQL)."""
+    connection = connections[using]
+    sql = connection.ops.sequence_reset_sql(
+        no_style(), [table.model for table in TABLES])
+    with connection.cursor() as cursor:
+        for statement in sql:
+            cursor.execute(statement)
+
+
+def recount_derived(using='default'):
+    """
+    Рейтинги пересчитываются по отзывам одним UPDATE, готовый JSON
+    произведений сбрасывается: жанры и категории могли измениться.
+    Собирает его store_stale_title_json() после фиксации загрузки.
+    """
+    Title.objects.using(using).fill_ratings()
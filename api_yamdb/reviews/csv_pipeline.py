@@ -0,0 +1,258 @@
+"""
+Параллельная возобновляемая загрузка CSV из static/data
+(import_csv --workers N) для больших файлов.
+
+Файл делится на диапазоны байтов по границам записей (перевод строки
+внутри кавычек запись не завершает). Процессы пула разбирают диапазоны
+и готовят значения колонок для базы, а единственный писатель - основной
+процесс - вставляет их по порядку executemany с пропуском конфликтов,
+транзакцией на порцию. После каждой порции смещение в файле пишется в
+файл контрольной точки, и прерванная загрузка продолжается с него;
+порция, записанная, но не отмеченная, при повторе пропускается как
+конфликт. Файлы загружаются в порядке внешних ключей TABLES.
+"""
+import csv
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+
+from django.db import connections, transaction
+
+from api.serializers import store_stale_title_json
+from api.signals import invalidate_all
+
+from .csv_import import (ROW_SIGNALS, TABLES, muted_signals,
+                         recount_derived, reset_sequences, stored_dates)
+
+
+def record_ends(path, start):
+    """Смещения концов записей CSV после start."""
+    with open(path, 'rb') as file:
+        file.seek(start)
+        offset, quotes = start, 0
+        for line in file:
+            offset += len(line)
+            quotes += line.count(b'"')
+            if quotes % 2 == 0:
+                quotes = 0
+                yield offset
+
+
+def read_header(path):
+    """Имена колонок и смещение начала данных."""
+    end = next(record_ends(path, 0), 0)
+    with open(path, 'rb') as file:
+        header = file.read(end).decode('utf-8')
+    return next(csv.reader(io.StringIO(header, newline='')), []), end
+
+
+def chunk_ranges(path, start, chunk_rows):
+    """Диапазоны байтов по chunk_rows записей."""
+    begin, rows = start, 0
+    for end in record_ends(path, start):
+        rows += 1
+        if rows == chunk_rows:
+            yield begin, end
+            begin, rows = end, 0
+    if rows:
+        yield begin, end
+
+
+def parse_chunk(table_index, path, fieldnames, start, end, using):
+    """
+    Разбор диапазона в процессе пула: значения колонок для вставки,
+    конец диапазона и время разбора.
+    """
+    started = time.perf_counter()
+    table = TABLES[table_index]
+    with open(path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+    rows = csv.DictReader(io.StringIO(text, newline=''),
+                          fieldnames=fieldnames)
+    connection = connections[using]
+    values = [table.db_values(row, connection) for row in rows]
+    return end, values, time.perf_counter() - started
+
+
+def insert_sql(table, connection):
+    """INSERT с пропуском конфликтов на языке СУБД."""
+    ops = connection.ops
+    fields = table.model._meta.local_concrete_fields
+    return '{} {} ({}) VALUES ({}) {}'.format(
+        ops.insert_statement(ignore_conflicts=True),
+        ops.quote_name(table.model._meta.db_table),
+        ', '.join(ops.quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+        ops.ignore_conflicts_suffix_sql(ignore_conflicts=True))
+
+
+def write_chunk(connection, sql, values):
+    with transaction.atomic(using=connection.alias), (
+            connection.cursor()) as cursor:
+        cursor.executemany(sql, values)
+
+
+class Checkpoint:
+    """
+    Контрольная точка в JSON: для каждого файла - смещение и число
+    записанных строк. Смещение действительно, пока у файла те же размер
+    и время изменения.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                self.state = json.load(file)
+
+    @staticmethod
+    def signature(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def position(self, table, path):
+        """Смещение, число строк и признак завершения файла."""
+        saved = self.state.get(table.file_name)
+        if not saved or saved['signature'] != self.signature(path):
+            return None, 0, False
+        return saved['offset'], saved['rows'], saved['done']
+
+    def save(self, table, path, offset, rows, done=False):
+        self.state[table.file_name] = {
+            'signature': self.signature(path), 'offset': offset,
+            'rows': rows, 'done': done}
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.state, file)
+        # Замена файла атомарна: точка не бывает записана наполовину.
+        os.replace(temporary, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def default_checkpoint(data_dir, using='default'):
+    """
+    Файл контрольной точки во временном каталоге, а не рядом с CSV:
+    каталог с данными лежит в репозитории. Имя зависит от каталога и
+    базы, поэтому повторный запуск той же загрузки находит свою точку.
+    """
+    database = connections[using].settings_dict['NAME']
+    digest = hashlib.md5(
+        f'{Path(data_dir).resolve()}:{database}'.encode()).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / (
+        f'import_csv-{digest}.checkpoint.json')
+
+
+def fork_context():
+    """Контекст fork: процессам пула нужен настроенный Django."""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+class Pipeline:
+    """
+    Загрузка каталога data_dir: workers процессов разбора (0 - разбор в
+    основном процессе), порции по chunk_rows записей, контрольная точка
+    в checkpoint_path. report получает строку отчёта на этап.
+    """
+
+    def __init__(self, data_dir, checkpoint_path, workers=2,
+                 chunk_rows=10000, using='default', report=print):
+        self.data_dir = data_dir
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.workers = workers if fork_context() is not None else 0
+        self.chunk_rows = chunk_rows
+        self.using = using
+        self.report = report
+
+    def parsed(self, pool, tasks):
+        """
+        Результаты разбора по порядку. В работе не больше двух порций на
+        процесс: память не растёт, если писатель отстаёт.
+        """
+        if pool is None:
+            for task in tasks:
+                yield parse_chunk(*task)
+            return
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(parse_chunk, task))
+            if len(pending) >= 2 * self.workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+    def load(self, pool, table_index):
+        table = TABLES[table_index]
+        path = self.data_dir / table.file_name
+        offset, rows, done = self.checkpoint.position(table, path)
+        if done:
+            self.report(f'{table}: загружен ранее, строк {rows}')
+            return rows
+        fieldnames, data_start = read_header(path)
+        resumed = offset is not None
+        offset = offset if resumed else data_start
+        connection = connections[self.using]
+        sql = insert_sql(table, connection)
+        started = time.perf_counter()
+        parse_time = write_time = 0
+        new_rows = 0
+        tasks = ((table_index, path, fieldnames, start, end, self.using)
+                 for start, end in chunk_ranges(path, offset,
+                                                self.chunk_rows))
+        for offset, values, seconds in self.parsed(pool, tasks):
+            write_started = time.perf_counter()
+            write_chunk(connection, sql, values)
+            write_time += time.perf_counter() - write_started
+            parse_time += seconds
+            new_rows += len(values)
+            self.checkpoint.save(table, path, offset, rows + new_rows)
+        self.checkpoint.save(table, path, offset, rows + new_rows, done=True)
+        elapsed = time.perf_counter() - started
+        self.report(
+            f'{table}: строк {new_rows}'
+            f'{f" (продолжено после {rows})" if resumed else ""}, '
+            f'{elapsed:.2f} с, {new_rows / elapsed:.0f} строк/с; '
+            f'разбор {parse_time:.2f} с, запись {write_time:.2f} с')
+        return rows + new_rows
+
+    def run(self):
+        """Загружает все файлы и пересчитывает производные данные."""
+        started = time.perf_counter()
+        total = 0
+        # Сигналы и даты выключаются до fork: процессы пула наследуют это.
+        with muted_signals(*ROW_SIGNALS), (
+                stored_dates(*(table.model for table in TABLES))):
+            pool = None
+            if self.workers:
+                # Процессы не должны делить открытые соединения с базой.
+                connections.close_all()
+                pool = fork_context().Pool(self.workers)
+            try:
+                for table_index in range(len(TABLES)):
+                    total += self.load(pool, table_index)
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                    pool.join()
+        derived_started = time.perf_counter()
+        with transaction.atomic(using=self.using):
+            reset_sequences(self.using)
+            recount_derived(self.using)
+        invalidate_all()
+        store_stale_title_json(self.using)
+        self.report(f'производные данные: '
+                    f'{time.perf_counter() - derived_started:.2f} с')
+        self.checkpoint.remove()
+        return total, time.perf_counter() - started
@@ -0,0 +1,241 @@
+"""
+Синтетические данные для проверки под нагрузкой (generate_dataset).
+
+Объём задаёт масштаб: на единицу масштаба приходится SCALE_UNIT строк
+каждого вида. Распределения похожи на настоящие: отзывы по
+произведениям распределены по Ципфу (немногие популярные собирают
+большую часть отзывов, у многих нет ни одного), даты отзывов идут
+всплесками после выхода произведения и затухают, комментарии чаще
+достаются отзывам на популярные произведения. Всё берётся из одного
+random.Random(seed) в фиксированном порядке, и даты отсчитываются от
+DATASET_END, а не от текущего времени, поэтому одинаковые масштаб и
+seed дают одинаковую базу. Строки вставляются bulk_create с явными id,
+сигналы на строку выключены, рейтинги пересчитываются одним UPDATE.
+"""
+import random
+import time
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db.models.signals import post_delete, pre_delete
+
+from api.export import chunks
+
+from .csv_import import (ROW_SIGNALS, muted_signals,
+                         recount_derived, reset_sequences, stored_dates)
+from .models import Category, Comment, CustomUser, Genre, Review, Title
+
+SCALE_UNIT = {'users': 200, 'titles': 100, 'reviews': 1000,
+              'comments': 500}
+ZIPF_EXPONENT = 1.1
+DATASET_END = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DATASET_DAYS = 3 * 365
+# Среднее время от выхода произведения до отзыва: всплеск и затухание.
+BURST_DAYS = 7
+COMMENT_DAYS = 2
+# Модели в порядке внешних ключей.
+MODELS = (CustomUser, Category, Genre, Title, Title.genre.through, Review,
+          Comment)
+WORDS = (
+    'тень ветер город море ночь песня дорога звезда сердце огонь зима '
+    'лето река небо время мост остров сад дом война мир тайна память '
+    'охота путь берег свет луна солнце гора лес поле буря вечер утро '
+    'король капитан доктор мастер художник странник брат сестра отец '
+    'последний первый красный белый чёрный тихий далёкий старый новый '
+    'потерянный забытый золотой стеклянный железный северный южный'
+).split()
+CATEGORIES = ('Фильм', 'Книга', 'Музыка', 'Сериал', 'Игра', 'Спектакль')
+GENRES = ('Драма', 'Комедия', 'Триллер', 'Ужасы', 'Документальный',
+          'Фэнтези', 'Вестерн', 'Нуар', 'Мюзикл', 'Аниме', 'Детектив',
+          'Фантастика', 'Мелодрама', 'Приключения', 'Биография')
+
+
+def dataset_sizes(scale):
+    """Количество строк каждого вида для масштаба scale."""
+    sizes = {name: count * scale for name, count in SCALE_UNIT.items()}
+    sizes['categories'] = min(len(CATEGORIES), 3 + scale // 10)
+    sizes['genres'] = min(len(GENRES), 5 + scale // 2)
+    return sizes
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    """Накопленные веса рангов 1..count по закону Ципфа."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+class DatasetGenerator:
+    """
+    Строки базы масштаба scale. Методы-генераторы вызываются строго в
+    порядке MODELS: каждый продолжает одну и ту же случайную
+    последовательность и опирается на выбранное предыдущими.
+    """
+
+    def __init__(self, scale, seed=0):
+        self.random = random.Random(seed)
+        self.sizes = dataset_sizes(scale)
+        self.start = DATASET_END - timedelta(days=DATASET_DAYS)
+
+    def text(self, low, high):
+        return ' '.join(self.random.choices(
+            WORDS, k=self.random.randint(low, high)))
+
+    def moment(self, after, mean_days):
+        """Время после after: экспоненциальная задержка до DATASET_END."""
+        delay = timedelta(days=self.random.expovariate(1 / mean_days))
+        if after + delay > DATASET_END:
+            delay = (DATASET_END - after) * self.random.random()
+        return after + delay
+
+    def users(self):
+        for pk in range(1, self.sizes['users'] + 1):
+            user = CustomUser(
+                id=pk, username=f'user{pk}', email=f'user{pk}@example.com',
+                password=UNUSABLE_PASSWORD_PREFIX,
+                role=(CustomUser.Roles.MODER if pk % 100 == 0
+                      else CustomUser.Roles.USER),
+                bio=self.text(0, 12),
+                date_joined=self.start + timedelta(
+                    days=DATASET_DAYS * self.random.random()))
+            user.fill_normalized_fields()
+            yield user
+
+    def categories(self):
+        for pk, name in enumerate(
+                CATEGORIES[:self.sizes['categories']], 1):
+            category = Category(id=pk, name=name, slug=f'category-{pk}')
+            category.fill_normalized_fields()
+            yield category
+
+    def genres(self):
+        for pk, name in enumerate(GENRES[:self.sizes['genres']], 1):
+            genre = Genre(id=pk, name=name, slug=f'genre-{pk}')
+            genre.fill_normalized_fields()
+            yield genre
+
+    def titles(self):
+        count = self.sizes['titles']
+        # Популярность не совпадает с порядком id: ранг Ципфа у
+        # произведения случайный.
+        self.popularity = list(range(1, count + 1))
+        self.random.shuffle(self.popularity)
+        self.releases = {}
+        self.quality = {}
+        categories = zipf_weights(self.sizes['categories'])
+        for pk in range(1, count + 1):
+            self.releases[pk] = self.start + timedelta(
+                days=DATASET_DAYS * self.random.random())
+            self.quality[pk] = self.random.gauss(7, 1.5)
+            title = Title(
+                id=pk, name=self.text(1, 4).capitalize(),
+                year=self.random.randint(1950, DATASET_END.year),
+                description=self.text(5, 30),
+                category_id=bisect_right(
+                    categories, self.random.random() * categories[-1]) + 1)
+            title.fill_normalized_fields()
+            yield title
+
+    def genre_links(self):
+        Through = Title.genre.through
+        genres = range(1, self.sizes['genres'] + 1)
+        links = 0
+        for pk in range(1, self.sizes['titles'] + 1):
+            for genre_id in self.random.sample(
+                    genres, min(len(genres), self.random.randint(1, 3))):
+                links += 1
+                yield Through(id=links, title_id=pk, genre_id=genre_id)
+
+    def reviews(self):
+        users = self.sizes['users']
+        weights = zipf_weights(self.sizes['titles'])
+        by_rank = {rank: pk for pk, rank in enumerate(self.popularity, 1)}
+        counts = Counter()
+        remaining = self.sizes['reviews']
+        # У произведения не больше users отзывов; лишние разыгрываются
+        # заново среди остальных.
+        while remaining:
+            for rank in self.random.choices(
+                    range(len(weights)), cum_weights=weights, k=remaining):
+                title_id = by_rank[rank + 1]
+                if counts[title_id] < users:
+                    counts[title_id] += 1
+                    remaining -= 1
+        # Для комментариев: вес отзыва - вес его произведения по Ципфу.
+        self.review_dates, self.review_weights = [], []
+        pk = 0
+        for title_id in sorted(counts):
+            quality = self.quality[title_id]
+            weight = 1 / self.popularity[title_id - 1] ** ZIPF_EXPONENT
+            # Один отзыв автора на произведение.
+            for author in self.random.sample(
+                    range(1, users + 1), counts[title_id]):
+                pk += 1
+                pub_date = self.moment(self.releases[title_id], BURST_DAYS)
+                self.review_dates.append(pub_date)
+                self.review_weights.append(weight)
+                yield Review(
+                    id=pk, title_id=title_id, author_id=author,
+                    score=min(10, max(1, round(
+                        self.random.gauss(quality, 2)))),
+                    text=self.text(3, 60), pub_date=pub_date)
+
+    def comments(self):
+        if not self.review_dates:
+            return
+        weights = list(accumulate(self.review_weights))
+        for pk in range(1, self.sizes['comments'] + 1):
+            index = bisect_right(weights,
+                                 self.random.random() * weights[-1])
+            index = min(index, len(weights) - 1)
+            yield Comment(
+                id=pk, review_id=index + 1,
+                author_id=self.random.randint(1, self.sizes['users']),
+                text=self.text(2, 30),
+                pub_date=self.moment(self.review_dates[index],
+                                     COMMENT_DAYS))
+
+    def rows(self):
+        """Пары (модель, генератор строк) в порядке внешних ключей."""
+        return zip(MODELS, (self.users, self.categories, self.genres,
+                            self.titles, self.genre_links, self.reviews,
+                            self.comments))
+
+
+def has_data(using='default'):
+    return any(model._default_manager.using(using).exists()
+               for model in MODELS)
+
+
+def clear(using='default'):
+    """Удаляет строки MODELS; кеши сбрасываются после загрузки целиком."""
+    with muted_signals(pre_delete, post_delete):
+        for model in reversed(MODELS):
+            model._default_manager.using(using).all().delete()
+
+
+def generate(scale, seed=0, batch_size=1000, using='default',
+             report=print):
+    """
+    Наполняет пустую базу; report получает строку отчёта на модель.
+    Возвращает количество вставленных строк по моделям.
+    """
+    generator = DatasetGenerator(scale, seed)
+    counts = {}
+    with muted_signals(*ROW_SIGNALS), stored_dates(*MODELS):
+        for model, rows in generator.rows():
+            manager = model._default_manager.db_manager(using)
+            started = time.perf_counter()
+            count = 0
+            for batch in chunks(rows(), batch_size):
+                manager.bulk_create(batch, batch_size=batch_size)
+                count += len(batch)
+            elapsed = time.perf_counter() - started
+            counts[model] = count
+            report(f'{model._meta.db_table}: строк {count}, '
+                   f'{elapsed:.2f} с, {count / elapsed:.0f} строк/с')
+    reset_sequences(using)
+    recount_derived(using)
+    return counts
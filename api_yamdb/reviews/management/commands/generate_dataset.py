@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.serializers import store_stale_title_json
+from api.signals import invalidate_all
+from reviews import dataset
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу синтетическими пользователями, произведениями, '
+            'отзывами и комментариями: отзывы по произведениям - по '
+            'Ципфу, даты - всплесками. Одинаковые --scale и --seed дают '
+            'одинаковые данные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=int, default=1,
+            help='Масштаб: на единицу {}.'.format(', '.join(
+                f'{name} {count}'
+                for name, count in dataset.SCALE_UNIT.items())))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки для bulk_create.')
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить существующие данные перед наполнением.')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['scale'] < 1:
+            raise CommandError('Масштаб должен быть положительным.')
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        started = time.perf_counter()
+        with transaction.atomic(using=using):
+            if options['clear']:
+                dataset.clear(using)
+            elif dataset.has_data(using):
+                raise CommandError(
+                    'База не пуста; --clear удалит существующие данные.')
+            counts = dataset.generate(
+                options['scale'], options['seed'], options['batch_size'],
+                using, report=self.stdout.write)
+            transaction.on_commit(invalidate_all, using=using)
+            transaction.on_commit(
+                lambda: store_stale_title_json(using), using=using)
+        total = sum(counts.values())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {total}, {elapsed:.2f} с, '
+            f'{total / elapsed:.0f} строк/с'))
@@ -0,0 +1,92 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.serializers import store_stale_title_json
+from api.signals import invalidate_all
+from reviews.csv_pipeline import Pipeline, default_checkpoint
+from reviews.csv_import import (ROW_SIGNALS, TABLES, load_rows,
+                                muted_signals, read_rows, recount_derived,
+                                reset_sequences, stored_dates)
+
+
+class Command(BaseCommand):
+    help = ('Загружает CSV из static/data одной транзакцией через '
+            'bulk_create. Повторный запуск пропускает существующие строки. '
+            'С --workers файлы разбираются пулом процессов и пишутся '
+            'порциями с контрольной точкой, с которой продолжается '
+            'прерванная загрузка.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', type=Path,
+            default=settings.BASE_DIR / 'static' / 'data',
+            help='Каталог с CSV.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки для bulk_create.')
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--workers', type=int, default=0,
+            help='Процессов разбора; 0 - загрузка одной транзакцией.')
+        parser.add_argument(
+            '--chunk-rows', type=int, default=10000,
+            help='Записей в порции при загрузке с --workers.')
+        parser.add_argument(
+            '--checkpoint', type=Path, default=None,
+            help='Файл контрольной точки (по умолчанию - во временном '
+                 'каталоге, свой для каталога с CSV и базы).')
+
+    def handle(self, *args, **options):
+        path, using = options['path'], options['database']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть положительным.')
+        missing = [str(table) for table in TABLES
+                   if not (path / table.file_name).is_file()]
+        if missing:
+            raise CommandError(f'Нет файлов в {path}: {", ".join(missing)}')
+        if options['workers'] > 0:
+            return self.run_pipeline(path, using, options)
+        started = time.perf_counter()
+        total = inserted = 0
+        with transaction.atomic(using=using), muted_signals(*ROW_SIGNALS), (
+                stored_dates(*(table.model for table in TABLES))):
+            for table in TABLES:
+                manager = table.model._default_manager.db_manager(using)
+                before = manager.count()
+                table_started = time.perf_counter()
+                count = load_rows(table, read_rows(path / table.file_name),
+                                  batch_size, using)
+                elapsed = time.perf_counter() - table_started
+                added = manager.count() - before
+                total, inserted = total + count, inserted + added
+                self.stdout.write(
+                    f'{table}: строк {count}, добавлено {added}, '
+                    f'{elapsed:.2f} с, {count / elapsed:.0f} строк/с')
+            if inserted:
+                reset_sequences(using)
+                recount_derived(using)
+                transaction.on_commit(invalidate_all, using=using)
+                transaction.on_commit(
+                    lambda: store_stale_title_json(using), using=using)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {total}, добавлено: {inserted}, '
+            f'{elapsed:.2f} с, {total / elapsed:.0f} строк/с'))
+
+    def run_pipeline(self, path, using, options):
+        if options['chunk_rows'] < 1:
+            raise CommandError('Размер порции должен быть положительным.')
+        checkpoint = options['checkpoint'] or default_checkpoint(
+            path, using)
+        total, elapsed = Pipeline(
+            path, checkpoint, workers=options['workers'],
+            chunk_rows=options['chunk_rows'], using=using,
+            report=self.stdout.write).run()
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено строк: {total}, {elapsed:.2f} с, '
+            f'{total / elapsed:.0f} строк/с'))
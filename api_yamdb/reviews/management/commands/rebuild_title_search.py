@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс произведений (FTS5).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if not search.is_available(using, refresh=True):
+            raise CommandError('Полнотекстовый индекс недоступен.')
+        search.ensure_triggers(using)
+        search.rebuild(using)
+        self.stdout.write(self.style.SUCCESS('Индекс перестроен.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.serializers import store_stale_title_json
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённые счётчики рейтинга произведений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки для bulk_update.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = Title.objects.recount_ratings(
+                batch_size=options['batch_size'])
+        store_stale_title_json()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено произведений: {fixed}'))
@@ -0,0 +1,40 @@
+# Generated by Django 3.2 on 2026-10-18 20:16
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating_counters(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    Review = apps.get_model('reviews', 'Review')
+    totals = (
+        Review.objects.order_by().values('title')
+        .annotate(score_sum=Sum('score'), score_count=Count('id'))
+    )
+    titles = []
+    for row in totals:
+        titles.append(Title(pk=row['title'], rating_sum=row['score_sum'],
+                            rating_count=row['score_count']))
+    Title.objects.bulk_update(
+        titles, ('rating_sum', 'rating_count'), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_alter_title_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество оценок'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_rating_counters, migrations.RunPython.noop),
+    ]
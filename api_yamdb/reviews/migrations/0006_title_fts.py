@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# SQL зафиксирован здесь, а не взят из reviews.search: миграция не
+# должна меняться вместе с модулем поиска.
+CREATE_TABLE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING fts5(
+        name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+TRIGGERS_SQL = {
+    'reviews_title_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_insert
+        AFTER INSERT ON reviews_title
+        BEGIN
+            INSERT INTO reviews_title_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+    'reviews_title_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_delete
+        AFTER DELETE ON reviews_title
+        BEGIN
+            INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    'reviews_title_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_update
+        AFTER UPDATE OF name, description ON reviews_title
+        BEGIN
+            INSERT INTO reviews_title_fts(reviews_title_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO reviews_title_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def create_fts(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite' or not has_fts5(connection):
+        return
+    schema_editor.execute(CREATE_TABLE_SQL)
+    for sql in TRIGGERS_SQL.values():
+        schema_editor.execute(sql)
+    schema_editor.execute(
+        "INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('rebuild')")
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in TRIGGERS_SQL:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    schema_editor.execute('DROP TABLE IF EXISTS reviews_title_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 3.2 on 2026-10-18 20:34
+
+import re
+import unicodedata
+from importlib import import_module
+
+from django.db import migrations, models
+
+NORMALIZED_FIELDS = {
+    'CustomUser': ('username', 'email'),
+    'Category': ('name',),
+    'Genre': ('name',),
+    'Title': ('name',),
+}
+WHITESPACE_RE = re.compile(r'\s+')
+# SQL и нормализация зафиксированы здесь, а не взяты из reviews.search:
+# миграция не должна меняться вместе с модулем поиска.
+CREATE_TABLE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING fts5(
+        normalized_name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+TRIGGERS_SQL = {
+    'reviews_title_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_insert
+        AFTER INSERT ON reviews_title
+        BEGIN
+            INSERT INTO reviews_title_fts(rowid, normalized_name, description)
+            VALUES (new.id, new.normalized_name, new.description);
+        END
+    """,
+    'reviews_title_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_delete
+        AFTER DELETE ON reviews_title
+        BEGIN
+            INSERT INTO reviews_title_fts(reviews_title_fts, rowid,
+                                          normalized_name, description)
+            VALUES ('delete', old.id, old.normalized_name, old.description);
+        END
+    """,
+    'reviews_title_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_update
+        AFTER UPDATE OF normalized_name, description ON reviews_title
+        BEGIN
+            INSERT INTO reviews_title_fts(reviews_title_fts, rowid,
+                                          normalized_name, description)
+            VALUES ('delete', old.id, old.normalized_name, old.description);
+            INSERT INTO reviews_title_fts(rowid, normalized_name, description)
+            VALUES (new.id, new.normalized_name, new.description);
+        END
+    """,
+}
+
+
+def normalize(value, max_length):
+    value = unicodedata.normalize('NFC', value or '').casefold()
+    value = WHITESPACE_RE.sub(' ', value.replace('ё', 'е')).strip()
+    return value[:max_length]
+
+
+def fill_normalized_fields(apps, schema_editor):
+    for model_name, sources in NORMALIZED_FIELDS.items():
+        model = apps.get_model('reviews', model_name)
+        targets = [f'normalized_{source}' for source in sources]
+        objects = list(model.objects.only('id', *sources))
+        for obj in objects:
+            for source, target in zip(sources, targets):
+                max_length = model._meta.get_field(target).max_length
+                setattr(obj, target,
+                        normalize(getattr(obj, source), max_length))
+        model.objects.bulk_update(objects, targets, batch_size=1000)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in TRIGGERS_SQL:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    schema_editor.execute('DROP TABLE IF EXISTS reviews_title_fts')
+
+
+def index_normalized_name(apps, schema_editor):
+    # Таблица произведений пересоздана, старые триггеры FTS исчезли;
+    # индекс строится заново по нормализованному названию.
+    drop_fts(apps, schema_editor)
+    connection = schema_editor.connection
+    fts = import_module('reviews.migrations.0006_title_fts')
+    if connection.vendor != 'sqlite' or not fts.has_fts5(connection):
+        return
+    schema_editor.execute(CREATE_TABLE_SQL)
+    for sql in TRIGGERS_SQL.values():
+        schema_editor.execute(sql)
+    schema_editor.execute(
+        "INSERT INTO reviews_title_fts(reviews_title_fts) VALUES ('rebuild')")
+
+
+def index_raw_name(apps, schema_editor):
+    drop_fts(apps, schema_editor)
+    import_module('reviews.migrations.0006_title_fts').create_fts(
+        apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_title_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='normalized_email',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='normalized_username',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='normalized_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256),
+        ),
+        migrations.RunPython(fill_normalized_fields,
+                             migrations.RunPython.noop),
+        migrations.RunPython(index_normalized_name, index_raw_name),
+    ]
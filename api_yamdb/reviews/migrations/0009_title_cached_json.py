@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 21:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_rating_ordering'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='cached_json',
+            field=models.TextField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='cached_json_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
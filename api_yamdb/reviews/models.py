@@ -3,9 +3,11 @@ from django.core.validators import (
     RegexValidator, MaxValueValidator, MinValueValidator
 )
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
-from django.db.models import Avg
+from django.db.models import (Count, F, FloatField, IntegerField, OuterRef,
+                              Subquery, Sum)
+from django.db.models.functions import Cast, Coalesce, NullIf
 
 # Импортируем константы
 from api.constants import (USERNAME_MAX_LENGTH, EMAIL_MAX_LENGTH,
@@ -13,9 +15,35 @@ from api.constants import (USERNAME_MAX_LENGTH, EMAIL_MAX_LENGTH,
                            CATEGORY_NAME, CATEGORY_SLUG, GENRE_NAME,
                            GENRE_SLUG, TITLE_NAME, SCORE_MAX_VALUE_VALIDATOR,
                            SCORE_MIN_VALUE_VALIDATOR, TEXT_SYMBOL_SLICE)
-
-
-class CustomUser(AbstractUser):
+from . import search
+
+
+class NormalizedFieldsMixin:
+    """
+    Заполняет при сохранении индексируемые поля вида `normalized_<поле>`
+    (см. search.normalize), по которым идёт поиск без учёта регистра.
+    """
+    normalized_fields = ()
+
+    def fill_normalized_fields(self):
+        for source in self.normalized_fields:
+            target = f'normalized_{source}'
+            max_length = self._meta.get_field(target).max_length
+            setattr(self, target,
+                    search.normalize(getattr(self, source), max_length))
+
+    def save(self, *args, **kwargs):
+        self.fill_normalized_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                f'normalized_{source}' for source in self.normalized_fields
+                if source in update_fields
+            }
+        super().save(*args, **kwargs)
+
+
+class CustomUser(NormalizedFieldsMixin, AbstractUser):
     class Roles(models.TextChoices):
         ADMIN = 'admin', 'Admin'
         MODER = 'moderator', 'Moderator'
@@ -44,9 +72,16 @@ class CustomUser(AbstractUser):
         'Код',
         max_length=CONFIRMATION_CODE_MAX_LENGTH,
         blank=True)
+    normalized_username = models.CharField(
+        max_length=USERNAME_MAX_LENGTH, db_index=True, editable=False,
+        default='')
+    normalized_email = models.CharField(
+        max_length=EMAIL_MAX_LENGTH, db_index=True, editable=False,
+        default='')
 
     USERNAME_FIELD = 'username'
     REQUIRED_FIELDS = ('email', )
+    normalized_fields = ('username', 'email')
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -70,10 +105,15 @@ class CustomUser(AbstractUser):
         return self.username
 
 
-class Category(models.Model):
+class Category(NormalizedFieldsMixin, models.Model):
     name = models.CharField(max_length=CATEGORY_NAME, verbose_name='Категория')
     slug = models.SlugField(max_length=CATEGORY_SLUG, unique=True,
                             verbose_name='Слаг')
+    normalized_name = models.CharField(
+        max_length=CATEGORY_NAME, db_index=True, editable=False,
+        default='')
+
+    normalized_fields = ('name',)
 
     def __str__(self):
         return self.name
@@ -83,10 +123,15 @@ class Category(models.Model):
         verbose_name_plural = 'Категории'
 
 
-class Genre(models.Model):
+class Genre(NormalizedFieldsMixin, models.Model):
     name = models.CharField(max_length=GENRE_NAME, verbose_name='Жанр')
     slug = models.SlugField(max_length=GENRE_SLUG, unique=True,
                             verbose_name='Слаг')
+    normalized_name = models.CharField(
+        max_length=GENRE_NAME, db_index=True, editable=False,
+        default='')
+
+    normalized_fields = ('name',)
 
     def __str__(self):
         return self.name
@@ -104,8 +149,147 @@ def validate_year(value):
         )
 
 
-class Title(models.Model):
+def expired_json():
+    """Значения полей для сброса Title.cached_json."""
+    return {'cached_json': None,
+            'cached_json_version': F('cached_json_version') + 1}
+
+
+class TitleQuerySet(models.QuerySet):
+    def search(self, **terms):
+        """
+        Полнотекстовый поиск: search(name='...', description='...').
+        Результаты упорядочены по релевантности (bm25); без FTS5 -
+        поиск подстроки без ранжирования.
+        """
+        query = search.build_match_query(terms)
+        if query is None or not search.is_available(self.db):
+            lookups = {}
+            for field, text in terms.items():
+                column = search.FTS_COLUMNS[field]
+                if column == field:
+                    lookups[f'{field}__icontains'] = text
+                else:
+                    lookups[f'{column}__contains'] = search.normalize(text)
+            return self.filter(**lookups)
+        table = search.FTS_TABLE
+        return self.extra(
+            tables=[table],
+            where=[f'{table}.rowid = {self.model._meta.db_table}.id',
+                   f'{table} MATCH %s'],
+            params=[query],
+            select={'search_rank': f'{table}.rank'},
+            order_by=['search_rank', 'id'],
+        )
+
+    def with_genres(self, slugs, match_all=False):
+        """
+        Произведения хотя бы с одним из жанров `slugs` или, при
+        match_all, со всеми сразу. Подзапросы к связующей таблице не
+        размножают строки, поэтому DISTINCT не нужен.
+        """
+        links = self.model.genre.through.objects
+        if not match_all:
+            return self.filter(pk__in=links.filter(
+                genre__slug__in=slugs).values('title_id'))
+        queryset = self
+        for slug in slugs:
+            queryset = queryset.filter(pk__in=links.filter(
+                genre__slug=slug).values('title_id'))
+        return queryset
+
+    def facet_counts(self):
+        """
+        Количество произведений выборки по слагам жанров, категорий и по
+        годам: три сгруппированных запроса, сколько бы ни было значений.
+        Группировка идёт в том же запросе, а не в подзапросе, потому что
+        условия search() ссылаются на имя таблицы.
+        """
+        titles = self.order_by()
+        counts = {}
+        for facet, field in (('genre', 'genre__slug'),
+                             ('category', 'category__slug'),
+                             ('year', 'year')):
+            counts[facet] = dict(
+                titles.values_list(field).annotate(Count('id')))
+            counts[facet].pop(None, None)
+        return counts
+
+    def change_rating(self, sum_delta, count_delta):
+        """
+        Сдвигает счётчики рейтинга атомарным UPDATE без чтения строки.
+        Средняя оценка пересчитывается в том же UPDATE из старых значений
+        счётчиков и сдвигов; без оценок она равна 0.
+        """
+        rating_sum = F('rating_sum') + sum_delta
+        rating_count = F('rating_count') + count_delta
+        return self.update(
+            rating_sum=rating_sum, rating_count=rating_count,
+            rating_avg=Coalesce(
+                Cast(rating_sum, FloatField()) / NullIf(rating_count, 0),
+                0.0),
+            **expired_json())
+
+    def expire_json(self):
+        """Сбрасывает готовый JSON произведений (Title.cached_json)."""
+        return self.update(**expired_json())
+
+    def fill_ratings(self):
+        """
+        Записывает счётчики рейтинга по отзывам одним UPDATE с
+        подзапросами, не читая произведения (после массовой загрузки) и
+        сбрасывая готовый JSON. Возвращает количество произведений.
+        """
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')).order_by().values('title')
+
+        def total(aggregate):
+            return Coalesce(Subquery(reviews.annotate(
+                total=aggregate).values('total')), 0,
+                output_field=IntegerField())
+
+        rating_sum, rating_count = total(Sum('score')), total(Count('id'))
+        return self.update(
+            rating_sum=rating_sum, rating_count=rating_count,
+            rating_avg=Coalesce(
+                Cast(rating_sum, FloatField()) / NullIf(rating_count, 0),
+                0.0),
+            **expired_json())
+
+    def recount_ratings(self, batch_size=1000):
+        """
+        Пересчитывает счётчики рейтинга одним сгруппированным запросом
+        по отзывам. Возвращает количество исправленных произведений.
+        """
+        totals = {
+            row['title']: (row['score_sum'], row['score_count'])
+            for row in Review.objects.filter(title__in=self).order_by()
+            .values('title')
+            .annotate(score_sum=Sum('score'), score_count=Count('id'))
+        }
+        fields = ('rating_sum', 'rating_count', 'rating_avg')
+        changed = []
+        for title in self.only('id', *fields).iterator():
+            rating_sum, rating_count = totals.get(title.pk, (0, 0))
+            rating_avg = rating_sum / rating_count if rating_count else 0.0
+            if (title.rating_sum, title.rating_count, title.rating_avg) != (
+                    rating_sum, rating_count, rating_avg):
+                title.rating_sum = rating_sum
+                title.rating_count = rating_count
+                title.rating_avg = rating_avg
+                for field, value in expired_json().items():
+                    setattr(title, field, value)
+                changed.append(title)
+        self.model.objects.bulk_update(
+            changed, fields + tuple(expired_json()), batch_size=batch_size)
+        return len(changed)
+
+
+class Title(NormalizedFieldsMixin, models.Model):
     name = models.CharField(max_length=TITLE_NAME, verbose_name='Название')
+    normalized_name = models.CharField(
+        max_length=TITLE_NAME, db_index=True, editable=False,
+        default='')
     year = models.SmallIntegerField(
         verbose_name='Год',
         db_index=True,
@@ -117,10 +301,44 @@ class Title(models.Model):
     category = models.ForeignKey(
         Category, on_delete=models.SET_NULL, null=True, related_name='titles',
         verbose_name='Категория')
+    # Сумма и количество оценок поддерживаются при каждой записи отзыва,
+    # поэтому рейтинг читается без дополнительного запроса.
+    rating_sum = models.PositiveIntegerField(
+        'Сумма оценок', default=0, editable=False)
+    rating_count = models.PositiveIntegerField(
+        'Количество оценок', default=0, editable=False)
+    # Ключ сортировки по рейтингу: среднее, 0 без оценок (не NULL, чтобы
+    # сравнения курсора и порядок в индексе были однозначными).
+    rating_avg = models.FloatField(
+        'Средняя оценка', default=0, editable=False)
+    # Готовое JSON-представление для API (NULL - собрать заново) и номер
+    # его сброса: собранный JSON сохраняется, только если за время
+    # сборки произведение не менялось.
+    cached_json = models.TextField(null=True, editable=False)
+    cached_json_version = models.PositiveIntegerField(
+        default=0, editable=False)
+
+    objects = TitleQuerySet.as_manager()
+
+    normalized_fields = ('name',)
 
     @property
     def rating(self):
-        return self.reviews.aggregate(Avg('score'))['score__avg']
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    def save(self, *args, **kwargs):
+        # Счётчики рейтинга и готовый JSON меняются только UPDATE-ами
+        # (TitleQuerySet.change_rating(), expired_json()); копия в
+        # загруженном объекте может устареть, и полное сохранение
+        # записывает только редактируемые поля.
+        if (kwargs.get('update_fields') is None and not self._state.adding
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if field.editable and not field.primary_key]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -128,6 +346,16 @@ class Title(models.Model):
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
+        # Сортировки списка: id в конце - порядок при равенстве ключей,
+        # страница читается диапазоном индекса без сортировки.
+        indexes = (
+            models.Index(fields=('rating_avg', 'id'),
+                         name='title_rating_idx'),
+            models.Index(fields=('category', 'year', 'id'),
+                         name='title_category_year_idx'),
+            models.Index(fields=('category', 'rating_avg', 'id'),
+                         name='title_category_rating_idx'),
+        )
 
 
 class Review(models.Model):
@@ -152,9 +380,34 @@ class Review(models.Model):
                 name='unique_author_title'
             )
         ]
+        indexes = [
+            # Ключ пагинации отзывов произведения: (pub_date, id).
+            models.Index(fields=['title', 'pub_date', 'id'],
+                         name='review_title_keyset_idx'),
+        ]
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
 
+    def save(self, *args, **kwargs):
+        # Счётчики рейтинга меняются в той же транзакции, что и сам отзыв.
+        with transaction.atomic(using=kwargs.get('using')):
+            previous = None
+            if not self._state.adding and self.pk is not None:
+                previous = (
+                    Review.objects.select_for_update()
+                    .filter(pk=self.pk).values('title_id', 'score').first()
+                )
+            super().save(*args, **kwargs)
+            titles = Title.objects.filter(pk=self.title_id)
+            if previous is None:
+                titles.change_rating(self.score, 1)
+            elif previous['title_id'] != self.title_id:
+                Title.objects.filter(pk=previous['title_id']).change_rating(
+                    -previous['score'], -1)
+                titles.change_rating(self.score, 1)
+            elif previous['score'] != self.score:
+                titles.change_rating(self.score - previous['score'], 0)
+
 
 class Comment(models.Model):
     author = models.ForeignKey(
@@ -168,6 +421,10 @@ class Comment(models.Model):
         'Дата добавления', auto_now_add=True, db_index=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['review', 'pub_date', 'id'],
+                         name='comment_review_keyset_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
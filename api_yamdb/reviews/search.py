@@ -0,0 +1,164 @@
+"""
+Полнотекстовый поиск по произведениям через SQLite FTS5.
+
+Таблица `reviews_title_fts` - внешний индекс над `reviews_title`; его
+синхронизируют триггеры, поэтому в индекс попадают и сохранения моделей,
+и массовые операции. На других СУБД и без FTS5 поиск сводится к
+`icontains`.
+"""
+import re
+import unicodedata
+
+from django.apps import apps
+from django.db import connections
+
+from api.cache import bump, model_tag
+
+FTS_TABLE = 'reviews_title_fts'
+# Поле фильтра -> колонка индекса. Название индексируется в
+# нормализованном виде (см. normalize()), чтобы «ё» и «е» совпадали.
+FTS_COLUMNS = {'name': 'normalized_name', 'description': 'description'}
+TOKEN_RE = re.compile(r'\w+')
+WHITESPACE_RE = re.compile(r'\s+')
+
+CREATE_TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        normalized_name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+TRIGGERS_SQL = {
+    f'{FTS_TABLE}_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+        AFTER INSERT ON reviews_title
+        BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, normalized_name, description)
+            VALUES (new.id, new.normalized_name, new.description);
+        END
+    """,
+    f'{FTS_TABLE}_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+        AFTER DELETE ON reviews_title
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name,
+                                    description)
+            VALUES ('delete', old.id, old.normalized_name, old.description);
+        END
+    """,
+    f'{FTS_TABLE}_update': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+        AFTER UPDATE OF normalized_name, description ON reviews_title
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name,
+                                    description)
+            VALUES ('delete', old.id, old.normalized_name, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, normalized_name, description)
+            VALUES (new.id, new.normalized_name, new.description);
+        END
+    """,
+}
+
+_available = {}
+
+
+def normalize(value, max_length=None):
+    """
+    Форма строки для поиска: NFC, casefold (в отличие от LIKE в SQLite
+    работает и для кириллицы), ё -> е, пробелы схлопнуты.
+    """
+    value = unicodedata.normalize('NFC', value or '').casefold()
+    value = WHITESPACE_RE.sub(' ', value.replace('ё', 'е')).strip()
+    return value[:max_length] if max_length else value
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def create_index(connection):
+    if connection.vendor != 'sqlite' or not has_fts5(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        for sql in TRIGGERS_SQL.values():
+            cursor.execute(sql)
+    rebuild(connection.alias)
+
+
+def drop_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name in TRIGGERS_SQL:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def ensure_triggers(using='default'):
+    """
+    Пересоздаёт триггеры, если их нет. SQLite выполняет ALTER TABLE
+    в миграциях через пересоздание таблицы, и триггеры при этом теряются;
+    индекс после этого перестраивается целиком.
+    """
+    connection = connections[using]
+    if not is_available(using, refresh=True):
+        return False
+    with connection.cursor() as cursor:
+        columns = {column.name for column in connection.introspection
+                   .get_table_description(cursor, 'reviews_title')}
+        if not columns.issuperset(FTS_COLUMNS.values()):
+            # База откачена к миграции, где колонок индекса ещё нет:
+            # триггеры создала сама эта миграция.
+            return False
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [sql for name, sql in TRIGGERS_SQL.items()
+                   if name not in existing]
+        for sql in missing:
+            cursor.execute(sql)
+    if missing:
+        rebuild(using)
+    return bool(missing)
+
+
+def is_available(using='default', refresh=False):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    key = (using, str(connection.settings_dict['NAME']))
+    if refresh or key not in _available:
+        _available[key] = (
+            FTS_TABLE in connection.introspection.table_names())
+    return _available[key]
+
+
+def build_match_query(terms):
+    """
+    Превращает {поле: строка} в выражение MATCH: каждое слово ищется
+    как префикс в своей колонке, все слова обязательны. Синтаксис FTS5 из
+    ввода не пропускается - слова берутся в кавычки.
+    """
+    parts = []
+    for field, text in terms.items():
+        column = FTS_COLUMNS[field]
+        if column != field:
+            # Колонка хранит normalize(), запрос приводится к тому же виду.
+            text = normalize(text)
+        tokens = TOKEN_RE.findall(text)
+        if not tokens:
+            return None
+        words = ' '.join(f'"{token}"*' for token in tokens)
+        parts.append(f'{{{column}}} : ({words})')
+    return ' AND '.join(parts) or None
+
+
+def rebuild(using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    # Результаты поиска изменились без записи в модели.
+    bump(model_tag(apps.get_model('reviews', 'Title')))
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_migrate
+from django.dispatch import receiver
+
+from . import search
+from .models import Review, Title
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # Сигнал приходит и при каскадном удалении (автора или произведения)
+    # внутри транзакции Collector.delete().
+    Title.objects.filter(pk=instance.title_id).change_rating(
+        -instance.score, -1)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'reviews':
+        search.ensure_triggers(using)
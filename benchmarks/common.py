@@ -0,0 +1,134 @@
+"""Общая обвязка бенчмарков: Django на отдельной SQLite-базе."""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'api_yamdb'
+
+
+def setup_django(db_name=None):
+    """
+    Настраивает Django на базе `db_name` (по умолчанию во временном
+    каталоге) с кешем в каталоге рядом с ней и применяет миграции.
+    Повторный запуск с тем же файлом переиспользует уже созданные данные.
+    """
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
+    from django.conf import settings
+
+    db_name = db_name or os.path.join(tempfile.gettempdir(),
+                                      'yamdb_bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_name
+    # Свой каталог кеша у каждой базы: бенчмарк не делит версии тегов и
+    # ответы с проектом и может очищать кеш целиком.
+    settings.CACHES['default']['LOCATION'] = f'{db_name}-cache'
+    settings.DEBUG = False
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('migrate', verbosity=0)
+
+
+def percentiles(timings, points=(50, 95, 99)):
+    """Перцентили списка времён (мс) методом ближайшего ранга."""
+    ordered = sorted(timings)
+    return {
+        point: ordered[min(len(ordered) - 1,
+                           max(0, round(point / 100 * len(ordered)) - 1))]
+        for point in points
+    }
+
+
+@contextmanager
+def count_queries():
+    """
+    Список SQL, выполненных внутри блока. CaptureQueriesContext для серии
+    запросов не годится: тестовый клиент очищает журнал запросов в начале
+    каждого запроса.
+    """
+    from django.db import connection
+
+    executed = []
+
+    def wrapper(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield executed
+
+
+def measure(func, repeat=20):
+    """Медиана и максимум времени вызова в миллисекундах."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+GENRES = ('drama', 'comedy', 'thriller', 'horror', 'documentary', 'fantasy',
+          'western', 'noir', 'musical', 'anime')
+CATEGORIES = ('movie', 'book', 'music', 'series')
+BATCH_SIZE = 5000
+
+
+def title_name(pk):
+    """
+    Детерминированное название из трёх слов словаря генератора данных
+    (reviews.dataset.WORDS).
+    """
+    from reviews.dataset import WORDS
+
+    return ' '.join(
+        WORDS[(pk * prime) % len(WORDS)] for prime in (7, 31, 101)
+    ).capitalize() + f' {pk}'
+
+
+def ensure_titles(count):
+    """
+    Наполняет базу `count` произведениями с 1-3 жанрами и категорией.
+    Если произведений уже столько, база не трогается.
+    """
+    from django.db import transaction
+
+    from api.serializers import store_stale_title_json
+    from reviews.models import Category, Genre, Title
+    from reviews.search import normalize
+
+    if Title.objects.exclude(normalized_name='').count() == count:
+        return
+    Through = Title.genre.through
+    with transaction.atomic():
+        Title.objects.all().delete()
+        Genre.objects.all().delete()
+        Category.objects.all().delete()
+        Genre.objects.bulk_create(
+            Genre(id=idx, name=slug.title(), slug=slug,
+                  normalized_name=slug)
+            for idx, slug in enumerate(GENRES, 1))
+        Category.objects.bulk_create(
+            Category(id=idx, name=slug.title(), slug=slug,
+                     normalized_name=slug)
+            for idx, slug in enumerate(CATEGORIES, 1))
+        for start in range(1, count + 1, BATCH_SIZE):
+            ids = range(start, min(start + BATCH_SIZE, count + 1))
+            Title.objects.bulk_create(
+                Title(id=pk, name=title_name(pk),
+                      normalized_name=normalize(title_name(pk)),
+                      year=1900 + pk % 120,
+                      category_id=pk % len(CATEGORIES) + 1)
+                for pk in ids)
+            Through.objects.bulk_create(
+                Through(title_id=pk,
+                        genre_id=(pk + step * 3) % len(GENRES) + 1)
+                for pk in ids for step in range(1, pk % 3 + 2))
+    # Готовый JSON собран, как после записи через API.
+    store_stale_title_json()
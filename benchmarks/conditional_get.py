@@ -0,0 +1,42 @@
+"""
+Повторный опрос отзывов и произведения: полный ответ 200 против
+304 Not Modified по ETag из версий тегов.
+
+    python -m benchmarks.conditional_get --reviews 100000
+"""
+import argparse
+
+from benchmarks.common import count_queries, measure, setup_django
+from benchmarks.keyset_pagination import fill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reviews', type=int, default=100_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.test import Client
+
+    title = fill(args.reviews)
+    client = Client()
+    print(f'Отзывов: {args.reviews}; медиана/максимум, мс; SQL; байт')
+    for url in (f'/api/v1/titles/{title.pk}/reviews/',
+                f'/api/v1/titles/{title.pk}/reviews/?page=1000',
+                f'/api/v1/titles/{title.pk}/'):
+        etag = client.get(url)['ETag']
+        for name, headers in (('200', {}),
+                              ('304', {'HTTP_IF_NONE_MATCH': etag})):
+            with count_queries() as queries:
+                response = client.get(url, **headers)
+            assert response.status_code == int(name)
+            median, worst = measure(
+                lambda: client.get(url, **headers), args.repeat)
+            print(f'{url:>42} {name}: {median:6.2f} / {worst:6.2f}; '
+                  f'{len(queries)}; {len(response.content)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Стоимость `/api/v1/titles/?name=город` с подсчётом `count` на каждый
+запрос, с закешированным `count` и с `?count=false`. Фильтр по названию
+идёт через базу; фильтры по жанру отвечаются индексом в памяти (см.
+benchmarks/title_bitmap.py).
+
+    python -m benchmarks.count_cache --titles 200000
+"""
+import argparse
+
+from benchmarks.common import ensure_titles, measure, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=200_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.core.cache import cache
+    from django.test import Client
+
+    ensure_titles(args.titles)
+    client = Client()
+    url = '/api/v1/titles/'
+    params = {'name': 'город', 'page': 3}
+
+    def uncached():
+        cache.clear()
+        client.get(url, params)
+
+    client.get(url, params)
+    results = (
+        ('COUNT на каждый запрос', measure(uncached, args.repeat)),
+        ('count из кеша', measure(lambda: client.get(url, params),
+                                  args.repeat)),
+        ('?count=false', measure(
+            lambda: client.get(url, {**params, 'count': 'false'}),
+            args.repeat)),
+    )
+    print(f'Произведений: {args.titles}; медиана/максимум, мс')
+    for name, (median, worst) in results:
+        print(f'{name:>24}: {median:8.2f} / {worst:8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Выгрузка NDJSON (/api/v1/export/*.ndjson) против листания API по
+PAGE_SIZE: время до первой порции, полное время и пик памяти Python
+(tracemalloc) в сравнении со сборкой всей выгрузки одним списком.
+
+    python -m benchmarks.export --titles 100000 --reviews 100000
+"""
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.common import ensure_titles, setup_django
+from benchmarks.keyset_pagination import fill
+
+
+def run(make_lines):
+    """
+    Время до первой порции и полное время (мс), байты и пик памяти.
+    Память меряется вторым проходом: tracemalloc замедляет код.
+    """
+    started = time.perf_counter()
+    first, size = None, 0
+    for chunk in make_lines():
+        if first is None:
+            first = (time.perf_counter() - started) * 1000
+        size += len(chunk)
+    total = (time.perf_counter() - started) * 1000
+    tracemalloc.start()
+    for chunk in make_lines():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first, total, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100_000)
+    parser.add_argument('--reviews', type=int, default=100_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--pages', type=int, default=200)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.conf import settings
+    from django.test import Client
+
+    from api.constants import EXPORT_CHUNK_SIZE
+    from api.export import export_lines
+    from api.serializers import store_stale_title_json
+
+    ensure_titles(args.titles)
+    title = fill(args.reviews)
+    # Представления собраны: обычное состояние каталога.
+    store_stale_title_json()
+
+    print('до первой порции / всего, мс; размер, МБ; пик памяти, МБ')
+    for name in ('titles', 'reviews'):
+        for label, make_lines in (
+                ('порциями', lambda: export_lines(name, EXPORT_CHUNK_SIZE)),
+                ('одним списком',
+                 lambda: [b''.join(export_lines(name, 10 ** 9))])):
+            first, total, size, peak = run(make_lines)
+            print(f'{name:>8}, {label:>13}: {first:9.1f} / {total:9.1f}; '
+                  f'{size / 2 ** 20:6.1f}; {peak / 2 ** 20:7.1f}')
+
+    client = Client()
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    for name, url, count in (
+            ('titles', '/api/v1/titles/', args.titles),
+            ('reviews', f'/api/v1/titles/{title.pk}/reviews/',
+             args.reviews)):
+        started = time.perf_counter()
+        for page in range(1, args.pages + 1):
+            client.get(url, {'page': page})
+        per_page = (time.perf_counter() - started) / args.pages
+        requests = -(-count // page_size)
+        print(f'{name:>8}, листание по {page_size}: {requests} запросов, '
+              f'~{per_page * requests:.1f} с')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Наполнение базы generate_dataset и время ответов TitleViewSet и
+ReviewViewSet на получившихся данных: список произведений, первая
+страница отзывов самого популярного произведения и произведения из
+хвоста распределения. Повторный запуск с тем же масштабом и seed
+переиспользует базу.
+
+    python -m benchmarks.generate_dataset --scale 100
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import count_queries, measure, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--db', default=None)
+    args = parser.parse_args()
+    db = args.db or os.path.join(
+        tempfile.gettempdir(),
+        f'yamdb_dataset_{args.scale}_{args.seed}.sqlite3')
+    setup_django(db)
+
+    from django.core.management import call_command
+    from django.test import Client
+
+    from api.views import AnonymousResponseCacheMixin
+    from reviews import dataset
+    from reviews.models import Review, Title
+
+    sizes = dataset.dataset_sizes(args.scale)
+    if Review.objects.count() != sizes['reviews']:
+        call_command('generate_dataset', scale=args.scale, seed=args.seed,
+                     clear=True)
+    counts = sorted(Title.objects.values_list('rating_count', flat=True),
+                    reverse=True)
+    top = sum(counts[:max(1, len(counts) // 100)]) / sum(counts)
+    print(f'произведений: {len(counts)}, отзывов: {sum(counts)}; '
+          f'у 1% популярных {top:.0%} отзывов, без отзывов '
+          f'{counts.count(0)}, максимум {counts[0]}')
+
+    popular = Title.objects.order_by('-rating_count').first()
+    tail = Title.objects.filter(rating_count=1).first()
+    client = Client()
+    # Без кеша ответов: каждый запрос доходит до базы.
+    AnonymousResponseCacheMixin.response_cache_timeout = 0
+    urls = {
+        'список произведений': '/api/v1/titles/',
+        'по рейтингу': '/api/v1/titles/?ordering=-rating',
+        'жанр и категория': '/api/v1/titles/?genre=genre-1'
+                            '&category=category-1',
+        f'отзывы популярного ({popular.rating_count})':
+            f'/api/v1/titles/{popular.pk}/reviews/',
+        'отзывы из хвоста (1)': f'/api/v1/titles/{tail.pk}/reviews/',
+    }
+    print(f'{"запрос":<32} {"медиана, мс":>12} {"макс, мс":>9} '
+          f'{"SQL":>4}')
+    for name, url in urls.items():
+        client.get(url)
+        median, worst = measure(lambda: client.get(url), args.repeat)
+        with count_queries() as queries:
+            assert client.get(url).status_code == 200
+        print(f'{name:<32} {median:>12.2f} {worst:>9.1f} '
+              f'{len(queries):>4}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+"""
+Сквозной HTTP-бенчмарк API: WSGI-приложение целиком (middleware, DRF,
+рендереры) в том же процессе, на базе generate_dataset. Смесь запросов
+повторяет сценарии postman_collection: список произведений с фильтрами,
+произведение, страницы отзывов и комментариев, регистрация, получение
+токена и создание отзыва. Для каждого вида запросов - req/s, p50/p95/p99
+и SQL-запросов на запрос; отчёт пишется в JSON с сортированными ключами,
+который удобно сравнивать между коммитами (или передать в --baseline).
+
+Каждый запуск идёт на свежей копии сгенерированной базы, а запросы
+выбираются из random.Random(seed), поэтому последовательность
+запросов и число SQL повторяются от запуска к запуску.
+
+    python -m benchmarks.http_suite --scale 10 --requests 5000 \\
+        --output before.json
+    python -m benchmarks.http_suite --scale 10 --requests 5000 \\
+        --output after.json --baseline before.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from bisect import bisect_right
+from collections import Counter
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from benchmarks.common import count_queries, percentiles, setup_django
+
+# Вид запроса и его доля в смеси.
+MIX = (
+    ('titles_list', 30),
+    ('title_detail', 20),
+    ('reviews_page', 15),
+    ('review_detail', 5),
+    ('comments_page', 10),
+    ('signup', 5),
+    ('token', 5),
+    ('review_create', 10),
+)
+TITLE_FILTERS = (
+    {}, {'ordering': '-rating'}, {'ordering': 'year'},
+    {'genre': 'genre-1'}, {'category': 'category-1'},
+    {'genre': 'genre-2', 'category': 'category-2'},
+    {'name': 'тень'}, {'year': '2000'}, {'page': '2'},
+)
+AUTHORS = 100
+
+
+class Workload:
+    """Запросы смеси MIX; данные для них читаются из базы один раз."""
+
+    def __init__(self, seed):
+        from django.contrib.auth.tokens import default_token_generator
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from reviews import dataset
+        from reviews.models import CustomUser, Review, Title
+
+        self.random = random.Random(seed)
+        self.make_code = default_token_generator.make_token
+        # Популярность по Ципфу: чаще запрашиваются произведения с
+        # большим числом отзывов.
+        self.titles = list(Title.objects.order_by(
+            '-rating_count', 'id').values_list('id', flat=True))
+        self.weights = dataset.zipf_weights(len(self.titles))
+        self.reviews = list(Review.objects.order_by('id').values_list(
+            'id', 'title_id'))
+        self.reviewed = set(Review.objects.values_list('author_id',
+                                                       'title_id'))
+        users = list(CustomUser.objects.order_by('id')[:AUTHORS])
+        self.users = users
+        self.tokens = {user.pk: f'Bearer {AccessToken.for_user(user)}'
+                       for user in users}
+        self.signups = 0
+
+    def title(self):
+        return self.titles[bisect_right(
+            self.weights, self.random.random() * self.weights[-1])]
+
+    def titles_list(self):
+        return 'GET', '/api/v1/titles/', self.random.choice(
+            TITLE_FILTERS), None, None
+
+    def title_detail(self):
+        return 'GET', f'/api/v1/titles/{self.title()}/', {}, None, None
+
+    def reviews_page(self):
+        path = f'/api/v1/titles/{self.title()}/reviews/'
+        return 'GET', path, {}, None, None
+
+    def review_detail(self):
+        review_id, title_id = self.random.choice(self.reviews)
+        path = f'/api/v1/titles/{title_id}/reviews/{review_id}/'
+        return 'GET', path, {}, None, None
+
+    def comments_page(self):
+        review_id, title_id = self.random.choice(self.reviews)
+        path = f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+        return 'GET', path, {}, None, None
+
+    def signup(self):
+        self.signups += 1
+        name = f'bench-{self.signups}'
+        return 'POST', '/api/v1/auth/signup/', {}, {
+            'username': name, 'email': f'{name}@example.com'}, None
+
+    def token(self):
+        user = self.random.choice(self.users)
+        return 'POST', '/api/v1/auth/token/', {}, {
+            'username': user.username,
+            'confirmation_code': self.make_code(user)}, None
+
+    def review_create(self):
+        # Произведение, на которое у автора ещё нет отзыва.
+        while True:
+            user, title_id = self.random.choice(self.users), self.title()
+            if (user.pk, title_id) not in self.reviewed:
+                break
+        self.reviewed.add((user.pk, title_id))
+        return 'POST', f'/api/v1/titles/{title_id}/reviews/', {}, {
+            'text': 'Отзыв из бенчмарка', 'score': self.random.randint(1, 10)
+        }, self.tokens[user.pk]
+
+    def requests(self, count):
+        names = [name for name, _ in MIX]
+        weights = [weight for _, weight in MIX]
+        for name in self.random.choices(names, weights, k=count):
+            yield (name, *getattr(self, name)())
+
+
+def environ(method, path, query, data, authorization):
+    """WSGI-окружение запроса, как его передал бы сервер."""
+    body = json.dumps(data).encode() if data is not None else b''
+    env = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path,
+        'QUERY_STRING': urlencode(query),
+        'CONTENT_TYPE': 'application/json' if data is not None else '',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': BytesIO(body),
+    }
+    if authorization:
+        env['HTTP_AUTHORIZATION'] = authorization
+    setup_testing_defaults(env)
+    return env
+
+
+def call(application, env):
+    """Ответ приложения целиком; возвращает код статуса."""
+    status = []
+
+    def start_response(value, headers, exc_info=None):
+        status.append(value)
+
+    response = application(env, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return int(status[0].split()[0])
+
+
+def summary(timings, queries, statuses):
+    points = percentiles(timings)
+    total = sum(timings)
+    return {
+        'requests': len(timings),
+        'req_per_s': round(len(timings) / total * 1000, 1),
+        'p50_ms': round(points[50], 2),
+        'p95_ms': round(points[95], 2),
+        'p99_ms': round(points[99], 2),
+        'sql_per_request': round(sum(queries) / len(queries), 2),
+        'sql_max': max(queries),
+        'status': {str(code): count
+                   for code, count in sorted(Counter(statuses).items())},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_database(scale, seed, path):
+    """
+    Копия сгенерированной базы для запуска: запросы на запись меняют
+    базу, а каждый запуск должен начинаться с одинаковых данных.
+    """
+    base = os.path.join(tempfile.gettempdir(),
+                        f'yamdb_http_{scale}_{seed}.sqlite3')
+    if os.path.exists(base):
+        shutil.copy(base, path)
+    elif os.path.exists(path):
+        os.remove(path)
+    setup_django(path)
+
+    from django.core.management import call_command
+    from django.db import connections
+
+    from reviews import dataset
+    from reviews.models import Review
+
+    if Review.objects.count() != dataset.dataset_sizes(scale)['reviews']:
+        call_command('generate_dataset', scale=scale, seed=seed, clear=True)
+        connections.close_all()
+        shutil.copy(path, base)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--warmup', type=int, default=500)
+    parser.add_argument('--no-response-cache', action='store_true',
+                        help='Без кеша ответов анонимным GET.')
+    parser.add_argument('--output', default=os.path.join(
+        tempfile.gettempdir(), 'yamdb_http_suite.json'))
+    parser.add_argument('--baseline', default=None,
+                        help='Отчёт для сравнения.')
+    args = parser.parse_args()
+    prepare_database(args.scale, args.seed, os.path.join(
+        tempfile.gettempdir(), 'yamdb_http_run.sqlite3'))
+
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+
+    from django.core.cache import cache
+
+    from api.views import AnonymousResponseCacheMixin
+
+    # Письма с кодом - в память, а не в sent_emails проекта.
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    if args.no_response_cache:
+        AnonymousResponseCacheMixin.response_cache_timeout = 0
+    # Кеш общий с другими базами и запусками: каждый запуск начинается
+    # с пустого, иначе число SQL зависит от предыдущего.
+    cache.clear()
+    application = get_wsgi_application()
+    workload = Workload(args.seed)
+    results = {name: ([], [], []) for name, _ in MIX}
+
+    with count_queries() as executed:
+        for _, *request in workload.requests(args.warmup):
+            call(application, environ(*request))
+        started = time.perf_counter()
+        for name, *request in workload.requests(args.requests):
+            before = len(executed)
+            request_started = time.perf_counter()
+            status = call(application, environ(*request))
+            timings, queries, statuses = results[name]
+            timings.append((time.perf_counter() - request_started) * 1000)
+            queries.append(len(executed) - before)
+            statuses.append(status)
+        elapsed = time.perf_counter() - started
+
+    report = {
+        'commit': git_commit(),
+        'scale': args.scale,
+        'seed': args.seed,
+        'response_cache': not args.no_response_cache,
+        'total': {'requests': args.requests,
+                  'seconds': round(elapsed, 2),
+                  'req_per_s': round(args.requests / elapsed, 1)},
+        'endpoints': {name: summary(*values)
+                      for name, values in results.items() if values[0]},
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, sort_keys=True, ensure_ascii=False)
+        file.write('\n')
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)['endpoints']
+    print(f'запросов: {args.requests}, {elapsed:.2f} с, '
+          f'{report["total"]["req_per_s"]} req/s; отчёт: {args.output}')
+    print(f'{"запрос":<15} {"n":>5} {"req/s":>8} {"p50":>7} {"p95":>7} '
+          f'{"p99":>7} {"SQL":>5}  статусы')
+    for name, row in report['endpoints'].items():
+        line = (f'{name:<15} {row["requests"]:>5} {row["req_per_s"]:>8} '
+                f'{row["p50_ms"]:>7} {row["p95_ms"]:>7} {row["p99_ms"]:>7} '
+                f'{row["sql_per_request"]:>5}  {row["status"]}')
+        if name in baseline:
+            old = baseline[name]
+            line += (f'; было p50 {old["p50_ms"]}, p95 {old["p95_ms"]}, '
+                     f'SQL {old["sql_per_request"]}')
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
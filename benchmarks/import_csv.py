@@ -0,0 +1,114 @@
+"""
+import_csv на размноженных копиях static/data против загрузки по строке
+через save() с сигналами (как при наполнении через API).
+
+    python -m benchmarks.import_csv --copies 1000
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import PROJECT_DIR, setup_django
+
+DATA_DIR = PROJECT_DIR / 'static' / 'data'
+# Колонки с идентификаторами, которые сдвигаются в каждой копии.
+ID_COLUMNS = {
+    'users.csv': {'id': 'users.csv'},
+    'category.csv': {'id': 'category.csv'},
+    'genre.csv': {'id': 'genre.csv'},
+    'titles.csv': {'id': 'titles.csv', 'category': 'category.csv'},
+    'genre_title.csv': {'id': 'genre_title.csv', 'title_id': 'titles.csv',
+                        'genre_id': 'genre.csv'},
+    'review.csv': {'id': 'review.csv', 'title_id': 'titles.csv',
+                   'author': 'users.csv'},
+    'comments.csv': {'id': 'comments.csv', 'review_id': 'review.csv',
+                     'author': 'users.csv'},
+}
+UNIQUE_COLUMNS = ('username', 'email', 'slug')
+
+
+def write_copies(target, copies):
+    """Пишет copies копий каждого файла со сдвинутыми id и слагами."""
+    data = {}
+    for file_name in ID_COLUMNS:
+        with open(DATA_DIR / file_name, encoding='utf-8', newline='') as f:
+            data[file_name] = list(csv.DictReader(f))
+    steps = {file_name: max(int(row['id']) for row in rows)
+             for file_name, rows in data.items()}
+    for file_name, rows in data.items():
+        with open(target / file_name, 'w', encoding='utf-8',
+                  newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            for copy in range(copies):
+                for row in rows:
+                    row = dict(row)
+                    for column, source in ID_COLUMNS[file_name].items():
+                        if row[column]:
+                            row[column] = int(row[column]) + (
+                                copy * steps[source])
+                    for column in UNIQUE_COLUMNS:
+                        if column in row:
+                            row[column] = f'{copy}{row[column]}'
+                    writer.writerow(row)
+
+
+def save_rows(target):
+    """Загрузка по строке: save() модели с сигналами и хешем пароля."""
+    from django.db import transaction
+
+    from reviews.csv_import import TABLES, read_rows
+
+    count = 0
+    with transaction.atomic():
+        for table in TABLES:
+            for row in read_rows(target / table.file_name):
+                instance = table.build(row)
+                if hasattr(instance, 'set_password'):
+                    instance.set_password(instance.username)
+                instance.save(force_insert=True)
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--copies', type=int, default=1000)
+    parser.add_argument('--save-copies', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--db', default=os.path.join(
+        tempfile.gettempdir(), 'yamdb_import_bench.sqlite3'))
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    setup_django(args.db)
+
+    from django.core.management import call_command
+
+    from reviews.csv_import import TABLES, stored_dates
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp)
+        write_copies(target, args.copies)
+        print(f'import_csv, копий: {args.copies}')
+        call_command('import_csv', path=target,
+                     batch_size=args.batch_size)
+        print('повторный запуск')
+        call_command('import_csv', path=target,
+                     batch_size=args.batch_size)
+
+        call_command('flush', interactive=False, verbosity=0)
+        write_copies(target, args.save_copies)
+        started = time.perf_counter()
+        with stored_dates(*(table.model for table in TABLES)):
+            count = save_rows(target)
+        elapsed = time.perf_counter() - started
+        print(f'save() по строке, копий: {args.save_copies}: строк '
+              f'{count}, {elapsed:.2f} с, {count / elapsed:.0f} строк/с')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Загрузка размноженных копий static/data: import_csv одной транзакцией
+против конвейера (import_csv --workers N) с разным числом процессов
+разбора, и продолжение прерванной конвейерной загрузки.
+
+    python -m benchmarks.import_pipeline --copies 3000 --workers 0 2 4
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import setup_django
+from benchmarks.import_csv import write_copies
+
+
+class Interrupted(Exception):
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--copies', type=int, default=3000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4])
+    parser.add_argument('--chunk-rows', type=int, default=10000)
+    parser.add_argument('--db', default=os.path.join(
+        tempfile.gettempdir(), 'yamdb_pipeline_bench.sqlite3'))
+    args = parser.parse_args()
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    setup_django(args.db)
+
+    from django.core.management import call_command
+
+    from reviews import csv_pipeline
+
+    def flush():
+        call_command('flush', interactive=False, verbosity=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp)
+        write_copies(target, args.copies)
+        print(f'копий: {args.copies}; import_csv одной транзакцией')
+        started = time.perf_counter()
+        call_command('import_csv', path=target, stdout=open(os.devnull, 'w'))
+        print(f'  {time.perf_counter() - started:.2f} с')
+        for workers in args.workers:
+            flush()
+            print(f'конвейер, процессов разбора: {workers}')
+            total, elapsed = csv_pipeline.Pipeline(
+                target, target / 'checkpoint.json', workers=workers,
+                chunk_rows=args.chunk_rows).run()
+            print(f'  итого {elapsed:.2f} с, {total / elapsed:.0f} строк/с')
+
+        # Прерывание на середине отзывов и продолжение.
+        flush()
+        write = csv_pipeline.write_chunk
+        written = []
+
+        def failing(connection, sql, values):
+            if 'reviews_review' in sql and len(written) == 3:
+                raise Interrupted
+            if 'reviews_review' in sql:
+                written.append(len(values))
+            write(connection, sql, values)
+
+        csv_pipeline.write_chunk = failing
+        try:
+            call_command('import_csv', path=target, workers=2,
+                         chunk_rows=args.chunk_rows,
+                         stdout=open(os.devnull, 'w'))
+        except Interrupted:
+            print(f'прервано после {sum(written)} строк отзывов')
+        csv_pipeline.write_chunk = write
+        call_command('import_csv', path=target, workers=2,
+                     chunk_rows=args.chunk_rows)
+
+
+if __name__ == '__main__':
+    main()
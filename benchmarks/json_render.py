@@ -0,0 +1,68 @@
+"""
+Рендер и разбор больших страниц JSON: JSONRenderer/JSONParser DRF (json
+из стандартной библиотеки) против ORJSONRenderer/ORJSONParser.
+
+    python -m benchmarks.json_render --size 1000
+"""
+import argparse
+import io
+
+from benchmarks.common import ensure_titles, measure, setup_django
+from benchmarks.keyset_pagination import fill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from api.parsers import ORJSONParser, orjson
+    from api.renderers import JSONFragmentRenderer, ORJSONRenderer
+    from api.serializers import (ReviewSerializer, TitleGetSerializer,
+                                 TitleJSONSerializer)
+    from reviews.models import Title
+
+    ensure_titles(max(args.size, 10_000))
+    title = fill(max(args.size, 10_000))
+    titles = Title.objects.select_related('category').prefetch_related(
+        'genre').order_by('id')[:args.size]
+    reviews = title.reviews.select_related('author').order_by(
+        'pub_date', 'id')[:args.size]
+
+    def page(results):
+        return {'count': args.size, 'next': None, 'previous': None,
+                'results': results}
+
+    pages = (
+        ('произведения', page(TitleGetSerializer(titles, many=True).data),
+         JSONRenderer),
+        ('готовый JSON', page(TitleJSONSerializer(
+            list(titles), many=True).data), JSONFragmentRenderer),
+        ('отзывы', page(ReviewSerializer(reviews, many=True).data),
+         JSONRenderer),
+    )
+    print(f'orjson: {"есть" if orjson else "нет"}; страница {args.size} '
+          f'строк; медиана/максимум, мс')
+    for name, data, baseline in pages:
+        body = baseline().render(data)
+        assert ORJSONRenderer().render(data) == body
+        for label, func in (
+                ('рендер json', lambda: baseline().render(data)),
+                ('рендер orjson', lambda: ORJSONRenderer().render(data)),
+                ('разбор json',
+                 lambda: JSONParser().parse(io.BytesIO(body))),
+                ('разбор orjson',
+                 lambda: ORJSONParser().parse(io.BytesIO(body)))):
+            median, worst = measure(func, args.repeat)
+            print(f'{name:>13}, {label:>13}: {median:7.2f} / '
+                  f'{worst:7.2f}')
+
+
+if __name__ == '__main__':
+    main()
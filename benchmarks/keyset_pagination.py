@@ -0,0 +1,87 @@
+"""
+Сравнивает стоимость первой, средней и последней страницы отзывов
+произведения при постраничной пагинации и пагинации по ключу.
+
+    python -m benchmarks.keyset_pagination --reviews 1000000
+"""
+import argparse
+
+from benchmarks.common import measure, setup_django
+
+BATCH_SIZE = 5000
+
+
+def fill(reviews):
+    from django.db import connection, transaction
+
+    from reviews.models import CustomUser, Review, Title
+
+    title = Title.objects.filter(name='Бенчмарк').first()
+    if title is not None and title.rating_count == reviews:
+        return title
+    with transaction.atomic():
+        Title.objects.filter(name='Бенчмарк').delete()
+        CustomUser.objects.filter(username__startswith='bench').delete()
+        title = Title.objects.create(name='Бенчмарк', year=2000)
+        first_id = (CustomUser.objects.order_by('-id')
+                    .values_list('id', flat=True).first() or 0) + 1
+        for start in range(0, reviews, BATCH_SIZE):
+            ids = range(first_id + start,
+                        first_id + min(start + BATCH_SIZE, reviews))
+            CustomUser.objects.bulk_create(
+                CustomUser(id=pk, username=f'bench{pk}',
+                           email=f'bench{pk}@yamdb.fake') for pk in ids)
+            Review.objects.bulk_create(
+                Review(title=title, author_id=pk, text='Текст',
+                       score=pk % 10 + 1) for pk in ids)
+        # bulk_create ставит одно и то же auto_now_add, разносим даты.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE reviews_review SET pub_date = "
+                "datetime('2020-01-01', '+' || id || ' seconds') "
+                "WHERE title_id = %s", [title.pk])
+        Title.objects.filter(pk=title.pk).recount_ratings()
+    return Title.objects.get(pk=title.pk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reviews', type=int, default=100_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.test import Client
+
+    from api.pagination import KeysetPagination
+    from reviews.models import Review
+
+    title = fill(args.reviews)
+    client = Client()
+    url = f'/api/v1/titles/{title.pk}/reviews/'
+    page_size = KeysetPagination.page_size
+    last_page = (title.rating_count - 1) // page_size + 1
+    reviews = Review.objects.filter(title=title).order_by('pub_date', 'id')
+
+    keyset = KeysetPagination()
+    keyset.ordering = ('pub_date', 'id')
+    keyset.base_url = f'{url}?cursor='
+
+    print(f'Отзывов: {title.rating_count}, страниц: {last_page}')
+    print(f'{"страница":>10} {"page, мс":>16} {"cursor, мс":>16}')
+    for page in (1, last_page // 2, last_page):
+        if page > 1:
+            before = reviews[(page - 1) * page_size - 1]
+            cursor_url = keyset.encode_cursor(before, reverse=False)
+        else:
+            cursor_url = keyset.base_url
+        page_ms = measure(lambda: client.get(url, {'page': page}),
+                          args.repeat)
+        cursor_ms = measure(lambda: client.get(cursor_url), args.repeat)
+        print(f'{page:>10} {page_ms[0]:>10.2f}/{page_ms[1]:<5.1f}'
+              f' {cursor_ms[0]:>10.2f}/{cursor_ms[1]:<5.1f}')
+
+
+if __name__ == '__main__':
+    main()
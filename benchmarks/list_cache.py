@@ -0,0 +1,46 @@
+"""
+`/api/v1/genres/` и `/api/v1/categories/`: полный проход DRF с COUNT и
+SELECT против попадания в общий кеш ответов.
+
+    python -m benchmarks.list_cache
+"""
+import argparse
+
+from benchmarks.common import (count_queries, ensure_titles, measure,
+                               setup_django)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.test import Client
+
+    from api.cache import bump, model_tag
+    from reviews.models import Category, Genre
+
+    ensure_titles(1000)
+    client = Client()
+    print('медиана/максимум, мс; SQL-запросов на запрос')
+    for url, model in (('/api/v1/genres/', Genre),
+                       ('/api/v1/categories/', Category)):
+
+        def miss():
+            bump(model_tag(model))
+            client.get(url)
+
+        client.get(url)
+        for name, func in (('без кеша', miss),
+                           ('из кеша', lambda: client.get(url))):
+            with count_queries() as queries:
+                func()
+            median, worst = measure(func, args.repeat)
+            print(f'{url} {name:>9}: {median:6.2f} / {worst:6.2f}; '
+                  f'{len(queries)}')
+
+
+if __name__ == '__main__':
+    main()
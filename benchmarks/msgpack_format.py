@@ -0,0 +1,67 @@
+"""
+Размер и время кодирования/разбора страниц списков в JSON
+(ORJSONRenderer/ORJSONParser) и MessagePack
+(MessagePackRenderer/MessagePackParser).
+
+    python -m benchmarks.msgpack_format --size 1000
+"""
+import argparse
+import gzip
+import io
+
+from benchmarks.common import ensure_titles, measure, setup_django
+from benchmarks.keyset_pagination import fill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=1000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from api.parsers import MessagePackParser, ORJSONParser
+    from api.renderers import MessagePackRenderer, ORJSONRenderer, expand
+    from api.serializers import ReviewSerializer, TitleJSONSerializer
+    from reviews.models import Title
+
+    ensure_titles(max(args.size, 10_000))
+    title = fill(max(args.size, 10_000))
+    titles = Title.objects.order_by('id')[:args.size]
+    reviews = title.reviews.select_related('author').order_by(
+        'pub_date', 'id')[:args.size]
+
+    def page(results):
+        return {'count': args.size, 'next': None, 'previous': None,
+                'results': results}
+
+    pages = (
+        ('произведения', page(TitleJSONSerializer(
+            list(titles), many=True).data)),
+        ('отзывы', page(ReviewSerializer(reviews, many=True).data)),
+    )
+    print(f'страница {args.size} строк; размер в байтах (gzip), '
+          f'медиана/максимум, мс')
+    for name, data in pages:
+        bodies = {
+            'json': (ORJSONRenderer, ORJSONParser,
+                     ORJSONRenderer().render(data)),
+            'msgpack': (MessagePackRenderer, MessagePackParser,
+                        MessagePackRenderer().render(data)),
+        }
+        assert MessagePackParser().parse(io.BytesIO(
+            bodies['msgpack'][2])) == expand(data)
+        for label, (renderer, parser_class, body) in bodies.items():
+            print(f'{name:>12}, {label:>7}: {len(body):9} '
+                  f'({len(gzip.compress(body)):8})')
+            for action, func in (
+                    ('рендер', lambda: renderer().render(data)),
+                    ('разбор', lambda: parser_class().parse(
+                        io.BytesIO(body)))):
+                median, worst = measure(func, args.repeat)
+                print(f'{"":>22}{action}: {median:7.2f} / {worst:7.2f}')
+
+
+if __name__ == '__main__':
+    main()
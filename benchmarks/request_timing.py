@@ -0,0 +1,57 @@
+"""
+Цена замеров RequestTimingMiddleware: время ответа без замеров
+(REQUEST_TIMING_SAMPLE_RATE = 0), с замером каждого запроса и с долей
+по умолчанию из настроек.
+
+    python -m benchmarks.request_timing --titles 10000 --reviews 1000
+"""
+import argparse
+import logging
+
+from benchmarks.common import ensure_titles, measure, setup_django
+from benchmarks.keyset_pagination import fill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=10_000)
+    parser.add_argument('--reviews', type=int, default=1000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.conf import settings
+    from django.test import Client
+
+    from api.views import AnonymousResponseCacheMixin
+
+    ensure_titles(args.titles)
+    title = fill(args.reviews)
+    # Строки журнала не выводятся: замеряется их подготовка, а не вывод.
+    logging.getLogger('api.timing').addHandler(logging.NullHandler())
+    logging.getLogger('api.timing').propagate = False
+    default_rate = settings.REQUEST_TIMING_SAMPLE_RATE
+    client = Client()
+    urls = ('/api/v1/titles/', f'/api/v1/titles/{title.pk}/',
+            f'/api/v1/titles/{title.pk}/reviews/', '/api/v1/categories/')
+    print('медиана/максимум, мс')
+    for cache_timeout, cache_name in ((0, 'без кеша ответов'),
+                                      (60, 'кеш ответов')):
+        AnonymousResponseCacheMixin.response_cache_timeout = cache_timeout
+        print(cache_name)
+        for url in urls:
+            client.get(url)
+            row = []
+            for rate in (0, default_rate, 1):
+                settings.REQUEST_TIMING_SAMPLE_RATE = rate
+                median, worst = measure(lambda: client.get(url),
+                                        args.repeat)
+                row.append(f'доля {rate}: {median:6.3f} / {worst:6.2f}')
+            print(f'{url:>32}  ' + '; '.join(row))
+        settings.REQUEST_TIMING_SAMPLE_RATE = 1
+        print(f'{"":>32}  {client.get(urls[1])["Server-Timing"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Анонимные GET произведений и отзывов: полный проход DRF против
+попадания в общий кеш ответов с проверкой версий тегов.
+
+    python -m benchmarks.response_cache --titles 100000 --reviews 10000
+"""
+import argparse
+
+from benchmarks.common import (count_queries, ensure_titles, measure,
+                               setup_django)
+from benchmarks.keyset_pagination import fill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100_000)
+    parser.add_argument('--reviews', type=int, default=10_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.test import Client
+
+    from api.views import AnonymousResponseCacheMixin
+
+    ensure_titles(args.titles)
+    title = fill(args.reviews)
+    client = Client()
+    urls = ('/api/v1/titles/', '/api/v1/titles/?genre=drama&ordering=-rating',
+            f'/api/v1/titles/{title.pk}/',
+            f'/api/v1/titles/{title.pk}/reviews/?page=100')
+    print('медиана/максимум, мс; SQL-запросов на запрос')
+    for url in urls:
+        for name, timeout in (('без кеша', 0), ('из кеша', 60)):
+            AnonymousResponseCacheMixin.response_cache_timeout = timeout
+            # Первый запрос строит индексы и заполняет кеш.
+            client.get(url)
+            client.get(url)
+            with count_queries() as queries:
+                assert client.get(url).status_code == 200
+            median, worst = measure(lambda: client.get(url), args.repeat)
+            print(f'{url:>46} {name:>9}: {median:6.2f} / {worst:6.2f}; '
+                  f'{len(queries)}')
+
+
+if __name__ == '__main__':
+    main()
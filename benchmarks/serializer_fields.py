@@ -0,0 +1,69 @@
+"""
+Создание сериализатора, его поля и .data для каждого ModelSerializer из
+api.serializers: поля строятся разбором _meta модели на каждом
+экземпляре (как в DRF) или копируются из построенных один раз на класс
+(CachedFieldsMixin).
+
+    python -m benchmarks.serializer_fields
+"""
+import argparse
+
+from benchmarks.common import measure, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from rest_framework.serializers import ModelSerializer
+
+    from api import serializers
+    from reviews.models import (Category, Comment, CustomUser, Genre, Review,
+                                Title)
+
+    category = Category(name='Фильм', slug='movie')
+    genre = Genre(name='Драма', slug='drama')
+    user = CustomUser(username='reader', email='reader@yamdb.fake')
+    title = Title(id=1, name='Сталкер', year=1979, category=category)
+    review = Review(id=1, title=title, author=user, text='Текст', score=9)
+    comment = Comment(id=1, review=review, author=user, text='Текст')
+    # Жанры без запроса к базе.
+    title._prefetched_objects_cache = {'genre': Genre.objects.none()}
+    title._prefetched_objects_cache['genre']._result_cache = [genre]
+    cases = (
+        (serializers.UserSerializer, user),
+        (serializers.CategorySerializer, category),
+        (serializers.GenreSerializer, genre),
+        (serializers.TitleGetSerializer, title),
+        (serializers.TitlePostSerializer, title),
+        (serializers.ReviewSerializer, review),
+        (serializers.CommentSerializer, comment),
+    )
+    print('медиана/максимум, мкс на сериализатор с полями и .data')
+    for serializer_class, instance in cases:
+        def run():
+            serializer = serializer_class(instance)
+            # TitlePostSerializer отдаёт .data через TitleGetSerializer.
+            serializer.fields
+            serializer.data
+
+        results = []
+        for cached in (False, True):
+            if not cached:
+                serializer_class.get_fields = ModelSerializer.get_fields
+            try:
+                run()
+                median, worst = measure(run, args.repeat)
+            finally:
+                serializer_class.__dict__.get('get_fields') and delattr(
+                    serializer_class, 'get_fields')
+            results.append(f'{median * 1000:7.1f} / {worst * 1000:8.1f}')
+        print(f'{serializer_class.__name__:>20}: без кеша {results[0]}; '
+              f'с кешем {results[1]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Фильтр `/api/v1/titles/?genre=...&genre_mode=...`: подсчёт и страница
+через ORM (подзапросы к связующей таблице) против битового индекса в
+памяти.
+
+    python -m benchmarks.title_bitmap --titles 1000000
+"""
+import argparse
+import time
+
+from benchmarks.common import ensure_titles, measure, setup_django
+
+FILTERS = (
+    {'genre': 'drama'},
+    {'genre': 'drama,comedy,noir'},
+    {'genre': 'drama,horror', 'genre_mode': 'all'},
+    {'genre': 'thriller,fantasy', 'genre_mode': 'all', 'category': 'book',
+     'year': 1949},
+)
+PAGE = 50
+PAGE_SIZE = 5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=1_000_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.test import Client
+
+    from api.indexes import BitmapResult, title_bitmap_index
+    from reviews.models import Title
+
+    ensure_titles(args.titles)
+    started = time.perf_counter()
+    title_bitmap_index.ensure_fresh()
+    print(f'Произведений: {args.titles}; индекс построен за '
+          f'{time.perf_counter() - started:.1f} с; медиана/максимум, мс')
+    queryset = Title.objects.select_related('category').prefetch_related(
+        'genre').order_by('id')
+    bottom = (PAGE - 1) * PAGE_SIZE
+    client = Client()
+
+    for params in FILTERS:
+        genres = tuple(params['genre'].split(','))
+        match_all = params.get('genre_mode') == 'all'
+        extra = {key: params[key] for key in ('category', 'year')
+                 if key in params}
+
+        def orm():
+            filtered = queryset.with_genres(genres, match_all)
+            if 'category' in extra:
+                filtered = filtered.filter(category__slug=extra['category'])
+            if 'year' in extra:
+                filtered = filtered.filter(year=extra['year'])
+            return filtered.count(), list(
+                filtered[bottom:bottom + PAGE_SIZE])
+
+        def index():
+            result = BitmapResult(title_bitmap_index.select(
+                genres, match_all, **extra), queryset, title_bitmap_index)
+            return result.count(), result[bottom:bottom + PAGE_SIZE]
+
+        (orm_count, orm_page), (index_count, index_page) = orm(), index()
+        assert orm_count == index_count and orm_page == index_page
+        print(f'{params} - {index_count} произведений')
+        for name, func in (
+                ('ORM', orm), ('индекс', index),
+                ('HTTP', lambda: client.get(
+                    '/api/v1/titles/', {**params, 'page': PAGE}))):
+            median, worst = measure(func, args.repeat)
+            print(f'{name:>10}: {median:8.2f} / {worst:8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Счётчики фасетов каталога для фильтра `genre=drama`: отдельный COUNT на
+каждый жанр и категорию (как раньше делал клиент), сгруппированные
+запросы TitleQuerySet.facet_counts() и битовый индекс в памяти.
+
+    python -m benchmarks.title_facets --titles 1000000
+"""
+import argparse
+
+from benchmarks.common import (CATEGORIES, GENRES, ensure_titles, measure,
+                               setup_django)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=1_000_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.test import Client
+
+    from api.indexes import title_bitmap_index
+    from reviews.models import Title
+
+    ensure_titles(args.titles)
+    title_bitmap_index.ensure_fresh()
+    filtered = Title.objects.with_genres(('drama',))
+
+    def count_per_value():
+        for slug in GENRES:
+            filtered.with_genres((slug,)).count()
+        for slug in CATEGORIES:
+            filtered.filter(category__slug=slug).count()
+
+    def index():
+        title_bitmap_index.facets(title_bitmap_index.select(('drama',)))
+
+    client = Client()
+    client.get('/api/v1/titles/facets/', {'genre': 'drama'})
+    results = (
+        ('COUNT на значение', measure(count_per_value, args.repeat)),
+        ('GROUP BY', measure(filtered.facet_counts, args.repeat)),
+        ('индекс', measure(index, args.repeat)),
+        ('HTTP из кеша', measure(
+            lambda: client.get('/api/v1/titles/facets/', {'genre': 'drama'}),
+            args.repeat)),
+    )
+    print(f'Произведений: {args.titles}; медиана/максимум, мс')
+    for name, (median, worst) in results:
+        print(f'{name:>18}: {median:9.2f} / {worst:9.2f}')
+
+
+if __name__ == '__main__':
+    main()
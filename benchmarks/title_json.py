@@ -0,0 +1,56 @@
+"""
+Сериализация 1000 произведений: TitleGetSerializer с вложенными
+категорией и жанрами и JSONRenderer против сохранённого JSON
+(TitleJSONSerializer и JSONFragmentRenderer). Строки загружаются до
+замера, меряется только CPU сериализации и рендера.
+
+    python -m benchmarks.title_json
+"""
+import argparse
+
+from benchmarks.common import ensure_titles, measure, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=10_000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from rest_framework.renderers import JSONRenderer
+
+    from api.renderers import JSONFragmentRenderer
+    from api.serializers import (TitleGetSerializer, TitleJSONSerializer,
+                                 store_stale_title_json)
+    from reviews.models import Title
+
+    ensure_titles(args.titles)
+    queryset = Title.objects.order_by('id')[:args.batch]
+    titles = list(queryset.select_related('category')
+                  .prefetch_related('genre'))
+    store_stale_title_json()
+    stored = list(queryset)
+
+    def serializer():
+        JSONRenderer().render(TitleGetSerializer(titles, many=True).data)
+
+    def fragments():
+        JSONFragmentRenderer().render(
+            TitleJSONSerializer(stored, many=True).data)
+
+    assert len(JSONRenderer().render(
+        TitleGetSerializer(titles, many=True).data)) == len(
+        JSONFragmentRenderer().render(
+            TitleJSONSerializer(stored, many=True).data))
+    print(f'{args.batch} произведений; медиана/максимум, мс')
+    for name, func in (('сериализатор', serializer),
+                       ('готовый JSON', fragments)):
+        median, worst = measure(func, args.repeat)
+        print(f'{name:>12}: {median:7.2f} / {worst:7.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Первая страница «лучших» произведений: сортировка по вычисляемому
+выражению rating_sum / rating_count против индексированного ключа
+rating_avg, в том числе с фильтром по категории.
+
+    python -m benchmarks.title_ordering --titles 1000000
+"""
+import argparse
+
+from benchmarks.common import ensure_titles, measure, setup_django
+
+
+def ensure_ratings():
+    """Раскладывает по произведениям детерминированные оценки 1-10."""
+    from django.db import connection, transaction
+
+    from reviews.models import Title
+
+    if Title.objects.filter(rating_count__gt=0).exists():
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE reviews_title SET rating_count = id % 7, '
+            'rating_sum = id % 7 + (id * 37) % (9 * (id % 7) + 1)')
+        cursor.execute(
+            'UPDATE reviews_title SET rating_avg = '
+            'CAST(rating_sum AS REAL) / rating_count WHERE rating_count > 0')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=1_000_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.db.models import F, FloatField
+    from django.db.models.functions import Cast, NullIf
+    from django.test import Client
+
+    from reviews.models import Title
+
+    ensure_titles(args.titles)
+    ensure_ratings()
+    computed = Title.objects.annotate(computed=Cast(
+        'rating_sum', FloatField()) / NullIf(F('rating_count'), 0))
+    client = Client()
+    url = '/api/v1/titles/'
+
+    print(f'Произведений: {args.titles}; медиана/максимум, мс')
+    for name, func in (
+            ('выражение', lambda: list(
+                computed.order_by('-computed', '-id')[:5])),
+            ('rating_avg', lambda: list(
+                Title.objects.order_by('-rating_avg', '-id')[:5])),
+            ('выражение + категория', lambda: list(
+                computed.filter(category__slug='book')
+                .order_by('-computed', '-id')[:5])),
+            ('rating_avg + категория', lambda: list(
+                Title.objects.filter(category__slug='book')
+                .order_by('-rating_avg', '-id')[:5])),
+            ('HTTP ?ordering=-rating', lambda: client.get(
+                url, {'ordering': '-rating', 'count': 'false'})),
+            ('HTTP + category, year', lambda: client.get(
+                url, {'ordering': 'year', 'category': 'book',
+                      'count': 'false'}))):
+        median, worst = measure(func, args.repeat)
+        print(f'{name:>24}: {median:9.2f} / {worst:9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Поиск по названию: `icontains` (LIKE '%...%') против FTS5-индекса.
+Замеряется то же, что делает список произведений: COUNT и первая
+страница.
+
+    python -m benchmarks.title_search --titles 100000 1000000
+"""
+import argparse
+
+from benchmarks.common import ensure_titles, measure, setup_django
+
+QUERIES = ('ветер', 'северный король', 'стекл', 'капитан 777')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, nargs='+',
+                        default=[100_000, 1_000_000])
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from reviews.models import Title
+
+    def page(queryset):
+        queryset.count()
+        list(queryset[:5])
+
+    for count in args.titles:
+        ensure_titles(count)
+        print(f'Произведений: {count}; медиана, мс')
+        print(f'{"запрос":>18} {"найдено":>8} {"icontains":>10} '
+              f'{"FTS5":>8}')
+        for query in QUERIES:
+            like = Title.objects.filter(name__icontains=query)
+            fts = Title.objects.search(name=query)
+            like_ms, _ = measure(lambda: page(like.all()), args.repeat)
+            fts_ms, _ = measure(lambda: page(fts.all()), args.repeat)
+            print(f'{query:>18} {fts.count():>8} {like_ms:>10.2f} '
+                  f'{fts_ms:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Задержка автодополнения `/api/v1/titles/suggest/` на индексе в памяти:
+отдельно поиск в индексе и полный запрос через Django, а также первый
+поиск после изменения произведения в другом воркере.
+
+    python -m benchmarks.title_suggest --titles 1000000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import (count_queries, ensure_titles, percentiles,
+                               setup_django)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=1_000_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--writes', type=int, default=200)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from django.test import Client
+
+    from api.indexes import title_suggest_index
+    from reviews.dataset import WORDS
+    from reviews.models import Title
+
+    ensure_titles(args.titles)
+    started = time.perf_counter()
+    title_suggest_index.ensure_fresh()
+    print(f'Произведений: {args.titles}; индекс построен за '
+          f'{time.perf_counter() - started:.1f} с')
+
+    rng = random.Random(1)
+    queries = [rng.choice(WORDS)[:rng.randint(1, 6)]
+               for _ in range(args.requests)]
+    client = Client()
+
+    index_ms, http_ms = [], []
+    with count_queries() as captured:
+        for query in queries:
+            started = time.perf_counter()
+            title_suggest_index.suggest(query, 10)
+            index_ms.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            client.get('/api/v1/titles/suggest/', {'q': query})
+            http_ms.append((time.perf_counter() - started) * 1000)
+
+    for name, timings in (('индекс', index_ms), ('HTTP', http_ms)):
+        result = percentiles(timings)
+        print(f'{name:>8}: p50 {result[50]:.3f} мс, p95 {result[95]:.3f} мс,'
+              f' p99 {result[99]:.3f} мс')
+    print(f'SQL-запросов: {len(captured)}')
+
+    # Другой воркер меняет название и публикует изменение в журнал
+    # индекса; этот процесс дочитывает одну строку.
+    pks = list(Title.objects.order_by('?').values_list(
+        'id', flat=True)[:args.writes])
+    after_write_ms = []
+    for pk in pks:
+        name = f'{rng.choice(WORDS)} {pk}'
+        Title.objects.filter(pk=pk).update(name=name,
+                                           normalized_name=name)
+        title_suggest_index.publish([pk])
+        started = time.perf_counter()
+        title_suggest_index.suggest(name, 10)
+        after_write_ms.append((time.perf_counter() - started) * 1000)
+    result = percentiles(after_write_ms)
+    print(f'после записи в другом воркере: p50 {result[50]:.3f} мс, '
+          f'p95 {result[95]:.3f} мс, p99 {result[99]:.3f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Страница отзывов: объекты моделей и ReviewSerializer против
+values_list() и ValuesRepresentation. Меряется чтение страницы вместе
+с построением данных ответа и отдельно построение по уже прочитанным
+строкам.
+
+    python -m benchmarks.values_list --reviews 10000
+"""
+import argparse
+
+from benchmarks.common import measure, setup_django
+from benchmarks.keyset_pagination import fill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reviews', type=int, default=10_000)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    setup_django(args.db)
+
+    from api.serializers import ReviewSerializer, values_representation
+
+    title = fill(args.reviews)
+    queryset = title.reviews.select_related('author').order_by(
+        'pub_date', 'id')
+    representation = values_representation(ReviewSerializer)
+    print('медиана/максимум, мс')
+    for size in (5, 100, 1000):
+        def serializer():
+            return ReviewSerializer(queryset[:size], many=True).data
+
+        def values():
+            return representation.to_representation(
+                representation.rows(queryset)[:size])
+
+        objects = list(queryset[:size])
+        rows = list(representation.rows(queryset)[:size])
+        assert serializer() == values()
+        for name, func in (
+                ('сериализатор', serializer),
+                ('values_list', values),
+                ('  только сериализатор',
+                 lambda: ReviewSerializer(objects, many=True).data),
+                ('  только values_list',
+                 lambda: representation.to_representation(rows))):
+            median, worst = measure(func, args.repeat)
+            print(f'{size:>5} строк, {name:>22}: {median:7.2f} / '
+                  f'{worst:7.2f}')
+
+
+if __name__ == '__main__':
+    main()
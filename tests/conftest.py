@@ -1,6 +1,11 @@
 import os
 import sys
 
+import pytest
+
+from django.conf import settings
+from django.db import connections
+from django.test import override_settings
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -33,3 +38,33 @@ assert get_version() < '4.0.0', 'Пожалуйста, используйте в
 pytest_plugins = [
     'tests.fixtures.fixture_user',
 ]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def test_cache(tmp_path_factory):
+    """
+    Общий кеш тестов - во временном каталоге: не в рабочем дереве и не
+    вместе с запущенным на той же копии сервером.
+    """
+    location = tmp_path_factory.mktemp('cache')
+    with override_settings(CACHES={
+            'default': {**settings.CACHES['default'],
+                        'LOCATION': str(location)}}):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budgets(settings):
+    """Превышение бюджета SQL представления (api.budgets) - ошибка теста."""
+    settings.QUERY_BUDGET_STRICT = True
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(tmp_path_factory):
+    """
+    Тестовая база - файл, а не общая база в памяти: в памяти SQLite
+    отвечает «table is locked» читателю таблицы с незафиксированной
+    записью, а с файлом читатель видит старые строки, как на сервере.
+    """
+    connections.databases['default']['TEST']['NAME'] = str(
+        tmp_path_factory.mktemp('db') / 'test.sqlite3')
@@ -0,0 +1,162 @@
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import OperationalError, connection
+
+from reviews.models import CustomUser, Review, Title
+from tests.utils import create_single_review, create_titles
+
+RETRIES = 500
+
+
+def assert_counters_match_reviews(title_id):
+    title = Title.objects.get(pk=title_id)
+    scores = list(
+        Review.objects.filter(title_id=title_id).values_list('score',
+                                                             flat=True)
+    )
+    assert (title.rating_sum, title.rating_count) == (
+        sum(scores), len(scores)
+    ), (
+        'Проверьте, что счётчики рейтинга произведения совпадают с '
+        'суммой и количеством его отзывов.'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08Rating:
+
+    def test_01_counters_follow_review_writes(self, admin_client, user_client,
+                                              moderator_client, moderator):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]['id']
+        review_url = f'/api/v1/titles/{title_id}/reviews/'
+
+        create_single_review(user_client, title_id, 'Отлично', 10)
+        response = create_single_review(moderator_client, title_id, 'Так',
+                                        4)
+        assert_counters_match_reviews(title_id)
+        response = admin_client.get(f'/api/v1/titles/{title_id}/')
+        assert response.json()['rating'] == 7
+
+        review_id = Review.objects.get(author=moderator).pk
+        response = moderator_client.patch(f'{review_url}{review_id}/',
+                                          data={'score': 6})
+        assert response.status_code == HTTPStatus.OK
+        assert_counters_match_reviews(title_id)
+        assert Title.objects.get(pk=title_id).rating == 8
+
+        response = moderator_client.delete(f'{review_url}{review_id}/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert_counters_match_reviews(title_id)
+        assert Title.objects.get(pk=title_id).rating == 10
+
+    def test_02_counters_follow_cascades(self, admin_client, user_client,
+                                         moderator_client, user):
+        titles, _, _ = create_titles(admin_client)
+        for title in titles:
+            create_single_review(user_client, title['id'], 'Текст', 3)
+            create_single_review(moderator_client, title['id'], 'Текст', 9)
+
+        CustomUser.objects.filter(pk=user.pk).delete()
+        for title in titles:
+            assert_counters_match_reviews(title['id'])
+        assert Title.objects.get(pk=titles[0]['id']).rating == 9
+
+        Title.objects.filter(pk=titles[0]['id']).delete()
+        assert_counters_match_reviews(titles[1]['id'])
+
+    def test_03_rating_read_without_queries(self, admin_client, user_client,
+                                            django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'Текст', 5)
+        title = Title.objects.get(pk=titles[0]['id'])
+        with django_assert_num_queries(0):
+            assert title.rating == 5
+
+    def test_04_recount_command(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'Текст', 7)
+        Title.objects.update(rating_sum=100, rating_count=100)
+
+        call_command('recount_ratings')
+
+        for title in titles:
+            assert_counters_match_reviews(title['id'])
+        assert Title.objects.get(pk=titles[1]['id']).rating is None
+
+    def test_04a_counters_not_in_responses(self, admin_client,
+                                           user_client):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]['id'], 'Текст', 7)
+        fields = {'id', 'rating', 'category', 'genre', 'name', 'year',
+                  'description'}
+        response = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert set(response.json()) == fields, (
+            'Проверьте, что счётчики рейтинга не попадают в ответ API.'
+        )
+        response = admin_client.get('/api/v1/titles/')
+        assert {key for title in response.json()['results']
+                for key in title} == fields
+
+    def test_04b_stale_title_save_keeps_counters(self, admin_client,
+                                                 user):
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        Review.objects.create(title=title, author=user, text='Текст',
+                              score=9)
+        title.name = 'Новое название'
+        title.save()
+        assert_counters_match_reviews(title.pk)
+        title = Title.objects.get(pk=title.pk)
+        assert (title.name, title.rating_avg) == ('Новое название', 9)
+        assert title.normalized_name == 'новое название'
+
+    def test_05_parallel_review_writes(self, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        title = Title.objects.get(pk=titles[0]['id'])
+        authors = [
+            CustomUser.objects.create(username=f'writer{idx}',
+                                      email=f'writer{idx}@yamdb.fake')
+            for idx in range(8)
+        ]
+        errors = []
+
+        def retry(operation):
+            for _ in range(RETRIES):
+                try:
+                    return operation()
+                except OperationalError:
+                    # SQLite сразу отвечает «database is locked», а не ждёт
+                    # блокировку; откаченная транзакция просто повторяется.
+                    time.sleep(0.001)
+            raise AssertionError('Запись так и не прошла.')
+
+        def write(author, score):
+            try:
+                review = retry(lambda: Review.objects.create(
+                    title=title, author=author, text='Текст', score=score))
+                review.score = score % 10 + 1
+                retry(review.save)
+                if score % 2:
+                    retry(review.delete)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=write, args=(author, idx % 10 + 1))
+            for idx, author in enumerate(authors)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        assert Review.objects.filter(title=title).count() == len(authors) // 2
+        assert_counters_match_reviews(title.pk)
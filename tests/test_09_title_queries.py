@@ -0,0 +1,87 @@
+import pytest
+
+from api.views import TitleViewSet
+from reviews.models import Category, Genre, Title
+from tests.utils import create_single_review, create_titles
+
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def create_many_titles(count):
+    category = Category.objects.create(name='Сериал', slug='series')
+    genres = [
+        Genre.objects.create(name=f'Жанр {idx}', slug=f'genre-{idx}')
+        for idx in range(3)
+    ]
+    for idx in range(count):
+        title = Title.objects.create(name=f'Сериал {idx}', year=2000 + idx,
+                                     category=category)
+        title.genre.set(genres[:idx % 3 + 1])
+    return category, genres
+
+
+def warm_up(client, params=None, url=TITLES_URL):
+    # Первый запрос строит битовый индекс, кеширует количество и
+    # сохраняет JSON произведений.
+    assert client.get(url, params).status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09TitleQueries:
+
+    # Только строки страницы: JSON произведений уже собран.
+    LIST_QUERIES = 1
+    DETAIL_QUERIES = 1
+
+    @pytest.fixture(autouse=True)
+    def no_response_cache(self, monkeypatch):
+        # Считаются запросы построения ответа, а не попадания в кеш.
+        monkeypatch.setattr(TitleViewSet, 'response_cache_timeout', 0)
+
+    @pytest.mark.parametrize('count', (1, 12))
+    def test_01_list_queries_do_not_depend_on_page_size(
+            self, client, count, django_assert_num_queries):
+        create_many_titles(count)
+        warm_up(client)
+        with django_assert_num_queries(self.LIST_QUERIES):
+            response = client.get(TITLES_URL)
+        results = response.json()['results']
+        assert len(results) == min(count, 5)
+        assert all(title['genre'] and title['category'] for title in results)
+
+    def test_02_list_with_reviews(self, admin_client, user_client, client,
+                                  django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        for title in titles:
+            create_single_review(user_client, title['id'], 'Текст', 8)
+        warm_up(client)
+        with django_assert_num_queries(self.LIST_QUERIES):
+            response = client.get(TITLES_URL)
+        assert {title['rating'] for title in response.json()['results']} == {
+            8
+        }
+
+    def test_03_retrieve_queries(self, admin_client, client,
+                                 django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        url = f'{TITLES_URL}{titles[0]["id"]}/'
+        warm_up(client, url=url)
+        with django_assert_num_queries(self.DETAIL_QUERIES):
+            response = client.get(url)
+        assert len(response.json()['genre']) == 2
+
+    @pytest.mark.parametrize('params', (
+        {'genre': 'genre-0'},
+        {'category': 'series'},
+        {'year': 2003},
+        {'name': 'Сериал 1'},
+        {'genre': 'genre-2', 'category': 'series', 'year': 2005},
+    ))
+    def test_04_filtered_list_queries(self, client, params,
+                                      django_assert_num_queries):
+        create_many_titles(12)
+        warm_up(client, params)
+        with django_assert_num_queries(self.LIST_QUERIES):
+            response = client.get(TITLES_URL, params)
+        assert response.json()['count'] > 0
@@ -0,0 +1,112 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Comment, CustomUser, Review, Title
+
+
+def create_reviews(count):
+    title = Title.objects.create(name='Сталкер', year=1979)
+    for idx in range(count):
+        author = CustomUser.objects.create(username=f'reader{idx}',
+                                           email=f'reader{idx}@yamdb.fake')
+        Review.objects.create(title=title, author=author, text=f'Отзыв {idx}',
+                              score=idx % 10 + 1)
+    return title
+
+
+def walk(client, url, key='next'):
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'count' not in data
+        page = [item['id'] for item in data['results']]
+        ids.extend(page if key == 'next' else reversed(page))
+        url = data[key]
+    return ids
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10KeysetPagination:
+
+    def test_01_reviews_forward_and_backward(self, client):
+        title = create_reviews(12)
+        # Одинаковое время публикации проверяет, что id разрешает ничьи.
+        Review.objects.filter(pk__in=Review.objects.order_by('id')
+                              .values('id')[3:8]).update(
+            pub_date=Review.objects.order_by('id')[3].pub_date)
+        expected = list(
+            Review.objects.order_by('pub_date', 'id')
+            .values_list('id', flat=True))
+        url = f'/api/v1/titles/{title.pk}/reviews/?cursor='
+
+        forward = walk(client, url)
+        assert forward == expected
+
+        last_page = client.get(url)
+        while last_page.json()['next']:
+            last_page = client.get(last_page.json()['next'])
+        backward = walk(client, last_page.json()['previous'], 'previous')
+        assert list(reversed(backward)) == expected[:-2]
+
+    def test_02_page_number_mode_is_default(self, client):
+        title = create_reviews(7)
+        response = client.get(f'/api/v1/titles/{title.pk}/reviews/')
+        data = response.json()
+        assert data['count'] == 7
+        assert [item['id'] for item in data['results']] == list(
+            Review.objects.order_by('pub_date', 'id')
+            .values_list('id', flat=True)[:5])
+
+    def test_03_no_count_and_no_offset(self, client):
+        title = create_reviews(11)
+        url = f'/api/v1/titles/{title.pk}/reviews/?cursor='
+        url = client.get(url).json()['next']
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        sql = ' '.join(query['sql'] for query in queries).upper()
+        assert 'COUNT(' not in sql
+        assert 'OFFSET' not in sql
+
+    def test_04_keyset_query_uses_index(self, client):
+        title = create_reviews(11)
+        url = client.get(
+            f'/api/v1/titles/{title.pk}/reviews/?cursor=').json()['next']
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        page_query = next(
+            query['sql'] for query in queries.captured_queries
+            if 'ORDER BY' in query['sql']
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {page_query}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        assert 'review_title_keyset_idx (title_id=? AND pub_date>?)' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    def test_05_titles_and_comments(self, client):
+        title = create_reviews(3)
+        review = Review.objects.first()
+        for idx in range(7):
+            Comment.objects.create(review=review, author=review.author,
+                                   text=f'Комментарий {idx}')
+        for idx in range(6):
+            Title.objects.create(name=f'Фильм {idx}', year=2000)
+
+        assert walk(client, '/api/v1/titles/?cursor=') == list(
+            Title.objects.order_by('id').values_list('id', flat=True))
+        assert walk(
+            client,
+            f'/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/?cursor='
+        ) == list(Comment.objects.order_by('pub_date', 'id')
+                  .values_list('id', flat=True))
+
+    def test_06_invalid_cursor(self, client):
+        title = create_reviews(1)
+        response = client.get(
+            f'/api/v1/titles/{title.pk}/reviews/?cursor=broken')
+        assert response.status_code == HTTPStatus.NOT_FOUND
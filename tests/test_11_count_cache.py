@@ -0,0 +1,80 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, Genre, Title
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def count_queries(client, url, params=None):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    assert response.status_code == HTTPStatus.OK
+    counts = [query for query in queries if 'COUNT(' in query['sql']]
+    return response.json(), len(counts)
+
+
+def create_titles(count, genre_slug='drama'):
+    genre, _ = Genre.objects.get_or_create(name=genre_slug, slug=genre_slug)
+    for idx in range(count):
+        title = Title.objects.create(name=f'{genre_slug} {idx}', year=2000)
+        title.genre.add(genre)
+    return genre
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11CountCache:
+    # Поиск по названию идёт через базу: фильтры по жанру считаются
+    # битовым индексом без COUNT.
+
+    def test_01_count_is_cached_per_filter(self, client):
+        create_titles(7)
+        create_titles(2, 'comedy')
+
+        data, counts = count_queries(client, TITLES_URL, {'name': 'drama'})
+        assert (data['count'], counts) == (7, 1)
+        data, counts = count_queries(client, TITLES_URL,
+                                     {'name': 'drama', 'page': 2})
+        assert (data['count'], counts) == (7, 0)
+        data, counts = count_queries(client, TITLES_URL, {'name': 'comedy'})
+        assert (data['count'], counts) == (2, 1)
+
+    def test_02_writes_invalidate_count(self, client, admin_client):
+        genre = create_titles(3)
+        count_queries(client, TITLES_URL, {'name': 'drama'})
+
+        title = Title.objects.create(name='drama новый', year=2001)
+        title.genre.add(genre)
+        data, counts = count_queries(client, TITLES_URL, {'name': 'drama'})
+        assert (data['count'], counts) == (4, 1)
+
+        Title.objects.filter(pk=title.pk).delete()
+        data, _ = count_queries(client, TITLES_URL, {'name': 'drama'})
+        assert data['count'] == 3
+
+        data, _ = count_queries(client, '/api/v1/categories/')
+        assert data['count'] == 0
+        Category.objects.create(name='Фильм', slug='films')
+        data, _ = count_queries(client, '/api/v1/categories/')
+        assert data['count'] == 1
+
+    def test_03_count_false_skips_count(self, client):
+        create_titles(7)
+        data, counts = count_queries(client, TITLES_URL, {'count': 'false'})
+        assert counts == 0
+        assert data['count'] is None
+        assert len(data['results']) == 5
+        assert 'count=false' in data['next']
+        assert data['previous'] is None
+
+        data, counts = count_queries(client, data['next'])
+        assert counts == 0
+        assert len(data['results']) == 2
+        assert data['next'] is None
+        assert data['previous']
+
+        response = client.get(TITLES_URL, {'count': 'false', 'page': 3})
+        assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,75 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from reviews import search
+from reviews.models import Title
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def found(client, **params):
+    response = client.get(TITLES_URL, params)
+    assert response.status_code == HTTPStatus.OK
+    return [title['name'] for title in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12TitleSearch:
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        assert search.is_available(), (
+            'Проверьте, что миграции создают полнотекстовый индекс.'
+        )
+        Title.objects.create(name='Побег из Шоушенка', year=1994,
+                             description='Тюремная драма')
+        Title.objects.create(name='Шоу Трумана', year=1998,
+                             description='Жизнь в телешоу')
+        Title.objects.create(name='Шоу, шоу и ещё раз шоу', year=2001,
+                             description='Мюзикл')
+
+    def test_01_prefix_and_case(self, client):
+        assert found(client, name='шоушенк') == ['Побег из Шоушенка']
+        assert set(found(client, name='ШОУ')) == {
+            'Побег из Шоушенка', 'Шоу Трумана', 'Шоу, шоу и ещё раз шоу'
+        }
+        assert found(client, name='шоу трум') == ['Шоу Трумана']
+
+    def test_02_results_ranked_by_relevance(self, client):
+        assert found(client, name='шоу')[0] == 'Шоу, шоу и ещё раз шоу'
+
+    def test_03_description_and_combined(self, client):
+        assert found(client, description='драма') == ['Побег из Шоушенка']
+        assert found(client, name='шоу', description='жизнь') == [
+            'Шоу Трумана'
+        ]
+
+    def test_04_index_follows_writes(self, client):
+        title = Title.objects.get(name='Шоу Трумана')
+        title.name = 'Трумен'
+        title.save()
+        assert 'Трумен' in found(client, name='трумен')
+        assert found(client, name='трумана') == []
+
+        Title.objects.filter(pk=title.pk).delete()
+        assert found(client, name='трумен') == []
+
+    def test_05_query_syntax_is_escaped(self, client):
+        assert found(client, name='"шоу" OR NEAR(') == []
+        # Без слов остаётся поиск подстроки.
+        assert found(client, name=',') == ['Шоу, шоу и ещё раз шоу']
+
+    def test_06_rebuild_and_lost_triggers(self, client):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.FTS_TABLE}_insert')
+        Title.objects.create(name='Без индекса', year=2000)
+        assert found(client, name='индекса') == []
+
+        assert search.ensure_triggers() is True
+        assert found(client, name='индекса') == ['Без индекса']
+
+        call_command('rebuild_title_search')
+        assert len(found(client, name='шоу')) == 3
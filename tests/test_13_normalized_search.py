@@ -0,0 +1,87 @@
+from http import HTTPStatus
+from importlib import import_module
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews import search
+from reviews.models import Category, CustomUser, Genre, Title
+
+
+def names(client, url, search):
+    response = client.get(url, {'search': search})
+    assert response.status_code == HTTPStatus.OK
+    return [item['name'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13NormalizedSearch:
+
+    def test_01_normalized_columns_follow_saves(self):
+        genre = Genre.objects.create(name='  Научная   ФАНТАСТИКА ',
+                                     slug='sci-fi')
+        assert genre.normalized_name == 'научная фантастика'
+        genre.name = 'Ёлочная сказка'
+        genre.save(update_fields=['name'])
+        genre.refresh_from_db()
+        assert genre.normalized_name == 'елочная сказка'
+
+    def test_02_category_and_genre_search(self, client):
+        Category.objects.create(name='Фильм', slug='films')
+        Category.objects.create(name='Фильмы ужасов', slug='horror')
+        Genre.objects.create(name='Ёлки-палки', slug='yolki')
+
+        assert names(client, '/api/v1/categories/', 'ФИЛЬМ') == [
+            'Фильм', 'Фильмы ужасов'
+        ]
+        assert names(client, '/api/v1/categories/', 'фильмы  уж') == [
+            'Фильмы ужасов'
+        ]
+        assert names(client, '/api/v1/genres/', 'елки') == ['Ёлки-палки']
+        assert names(client, '/api/v1/genres/', 'палки') == []
+
+    def test_03_prefix_search_uses_index(self, client):
+        Genre.objects.create(name='Драма', slug='drama')
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/api/v1/genres/', {'search': 'дра'})
+        select = next(query['sql'] for query in queries
+                      if 'ORDER BY' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {select}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        assert '(normalized_name>? AND normalized_name<?)' in plan
+
+    def test_04_users_search(self, admin_client, admin):
+        CustomUser.objects.create(username='Ёжик', email='Hedgehog@Fog.ru')
+        response = admin_client.get('/api/v1/users/', {'search': 'ежик'})
+        assert [user['username'] for user in response.json()['results']] == [
+            'Ёжик'
+        ]
+        response = admin_client.get('/api/v1/users/',
+                                    {'search': 'hedgehog@fog'})
+        assert response.json()['count'] == 1
+
+    def test_05_title_name_filter(self, client):
+        Title.objects.create(name='Ёжик в тумане', year=1975)
+        response = client.get('/api/v1/titles/', {'name': 'ЕЖИК туман'})
+        assert [title['name'] for title in response.json()['results']] == [
+            'Ёжик в тумане'
+        ]
+        assert 'normalized_name' not in response.json()['results'][0]
+
+    def test_06_migrations_round_trip(self, client):
+        Title.objects.create(name='Ёжик в тумане', year=1975)
+        call_command('migrate', 'reviews', '0006', verbosity=0)
+        call_command('migrate', verbosity=0)
+        response = client.get('/api/v1/titles/', {'name': 'ежик'})
+        assert response.json()['count'] == 1
+
+    def test_07_migration_normalize_frozen(self):
+        # Копия normalize() в миграции 0007 совпадает с reviews.search.
+        migration = import_module(
+            'reviews.migrations.0007_normalized_search_fields')
+        for value in ('  Научная   ФАНТАСТИКА ', 'Ёжик', 'Straße', ''):
+            assert migration.normalize(value, 256) == search.normalize(
+                value, 256)
@@ -0,0 +1,125 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import caches
+
+from api import indexes
+from api.indexes import TitleSuggestIndex, title_suggest_index
+from reviews.models import Title
+
+SUGGEST_URL = '/api/v1/titles/suggest/'
+
+
+def suggest(client, q, **params):
+    response = client.get(SUGGEST_URL, {'q': q, **params})
+    assert response.status_code == HTTPStatus.OK
+    return [(item['name'], item['year']) for item in response.json()]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14TitleSuggest:
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        for name, year in (('Звёздные войны', 1977), ('Звезда', 2002),
+                           ('Звездный путь', 2009), ('Зверополис', 2016),
+                           ('Сталкер', 1979)):
+            Title.objects.create(name=name, year=year)
+
+    def test_01_prefix_matches(self, client):
+        assert suggest(client, 'ЗВЕЗД') == [
+            ('Звезда', 2002), ('Звёздные войны', 1977),
+            ('Звездный путь', 2009),
+        ]
+        assert suggest(client, 'звёздн', limit=1) == [
+            ('Звёздные войны', 1977)
+        ]
+        assert suggest(client, 'зв', limit='много')[-1] == (
+            'Зверополис', 2016
+        )
+        assert suggest(client, '') == []
+        assert suggest(client, 'матрица') == []
+
+    def test_02_no_queries_when_warm(self, client,
+                                     django_assert_num_queries):
+        suggest(client, 'с')
+        with django_assert_num_queries(0):
+            assert suggest(client, 'ста') == [('Сталкер', 1979)]
+
+    def test_03_signals_update_index(self, client,
+                                     django_assert_num_queries):
+        suggest(client, 'с')
+        title = Title.objects.create(name='Солярис', year=1972)
+        Title.objects.get(name='Сталкер').delete()
+        with django_assert_num_queries(0):
+            assert suggest(client, 'с') == [('Солярис', 1972)]
+
+        title.name = 'Зеркало'
+        title.year = 1975
+        title.save()
+        with django_assert_num_queries(0):
+            assert suggest(client, 'с') == []
+            assert suggest(client, 'зе') == [('Зеркало', 1975)]
+
+    def test_04_changes_from_other_processes(self, client):
+        suggest(client, 'с')
+        title = Title.objects.get(name='Сталкер')
+        Title.objects.filter(pk=title.pk).update(
+            name='Сталкер (1979)', normalized_name='сталкер (1979)')
+        assert suggest(client, 'сталкер (') == []
+
+        # Другой воркер записал изменение в журнал индекса.
+        title_suggest_index.publish([title.pk])
+        assert suggest(client, 'сталкер (') == [('Сталкер (1979)', 1979)]
+
+    def test_05_read_only(self, admin_client):
+        response = admin_client.post(SUGGEST_URL, {'q': 'с'})
+        assert response.status_code in (HTTPStatus.FORBIDDEN,
+                                        HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_06_concurrent_change_not_absorbed(self, client):
+        suggest(client, 'с')
+        # Изменение другого воркера попадает в журнал раньше своего:
+        # своё не применяется поверх, а дочитываются оба.
+        title = Title.objects.get(name='Сталкер')
+        Title.objects.filter(pk=title.pk).update(
+            name='Сталкер (1979)', normalized_name='сталкер (1979)')
+        title_suggest_index.publish([title.pk])
+        Title.objects.create(name='Солярис', year=1972)
+        assert suggest(client, 'с') == [
+            ('Солярис', 1972), ('Сталкер (1979)', 1979)]
+
+    def test_07_changes_applied_without_rebuild(
+            self, client, monkeypatch, django_assert_num_queries):
+        suggest(client, 'с')
+        title = Title.objects.get(name='Звезда')
+        Title.objects.filter(pk=title.pk).update(
+            name='Сталь', normalized_name='сталь')
+        title_suggest_index.publish([title.pk])
+
+        def rebuild(self):
+            raise AssertionError('Индекс перестраивается целиком.')
+
+        monkeypatch.setattr(TitleSuggestIndex, 'rebuild', rebuild)
+        with django_assert_num_queries(1):
+            assert suggest(client, 'ста') == [
+                ('Сталкер', 1979), ('Сталь', 2002)]
+
+    def test_08_evicted_change_rebuilds(self, client, monkeypatch):
+        suggest(client, 'с')
+        title = Title.objects.get(name='Звезда')
+        Title.objects.filter(pk=title.pk).update(
+            name='Сталь', normalized_name='сталь')
+        caches['default'].delete(title_suggest_index.change_key(
+            title_suggest_index.publish([title.pk])))
+        # Запись могла ещё не появиться: сначала индекс её ждёт.
+        assert suggest(client, 'ста') == [('Сталкер', 1979)]
+        monkeypatch.setattr(indexes, 'MISSING_CHANGE_GRACE', -1)
+        assert suggest(client, 'ста') == [('Сталкер', 1979), ('Сталь', 2002)]
+
+    def test_09_expire_rebuilds_everywhere(self, client):
+        suggest(client, 'с')
+        Title.objects.filter(name='Сталкер').update(
+            name='Солярис', normalized_name='солярис')
+        title_suggest_index.publish(indexes.FULL_REBUILD)
+        assert suggest(client, 'с') == [('Солярис', 1979)]
@@ -0,0 +1,123 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.indexes import (BITSET_SCAN_BYTES, bit_positions, title_bitmap_index,
+                         to_bitset)
+from reviews.models import Category, Genre, Title
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def names(client, **params):
+    response = client.get(TITLES_URL, {'count': 'true', **params})
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    assert data['count'] == len(data['results'])
+    return [title['name'] for title in data['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15TitleBitmap:
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        genres = {slug: Genre.objects.create(name=slug, slug=slug)
+                  for slug in ('drama', 'comedy', 'horror')}
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        book = Category.objects.create(name='Книга', slug='book')
+        for name, year, category, slugs in (
+                ('Первый', 2001, movie, ('drama',)),
+                ('Второй', 2002, movie, ('drama', 'comedy')),
+                ('Третий', 2002, book, ('comedy',)),
+                ('Четвёртый', 2003, None, ('drama', 'comedy', 'horror'))):
+            title = Title.objects.create(name=name, year=year,
+                                         category=category)
+            title.genre.set([genres[slug] for slug in slugs])
+        return genres
+
+    def test_01_genre_modes(self, client):
+        assert names(client, genre='drama,comedy') == [
+            'Первый', 'Второй', 'Третий', 'Четвёртый']
+        assert names(client, genre='drama, comedy', genre_mode='all') == [
+            'Второй', 'Четвёртый']
+        assert names(client, genre='drama,horror,comedy',
+                     genre_mode='all') == ['Четвёртый']
+        assert names(client, genre='drama,unknown', genre_mode='all') == []
+        assert names(client, genre='unknown,horror') == ['Четвёртый']
+        assert names(client, genre='comedy', category='movie',
+                     year=2002) == ['Второй']
+        assert names(client, genre=',') == [
+            'Первый', 'Второй', 'Третий', 'Четвёртый']
+        response = client.get(TITLES_URL, {'genre_mode': 'some'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_02_orm_paths_agree(self, client):
+        # Полнотекстовый поиск и курсор не используют индекс.
+        assert names(client, genre='drama,comedy', genre_mode='all',
+                     name='второй') == ['Второй']
+        assert names(client, genre='drama,comedy', genre_mode='all',
+                     name='первый') == []
+        response = client.get(TITLES_URL, {
+            'genre': 'drama,comedy', 'genre_mode': 'all', 'cursor': ''})
+        assert [title['name'] for title in response.json()['results']] == [
+            'Второй', 'Четвёртый']
+        assert list(Title.objects.with_genres(
+            ('drama', 'comedy')).order_by('name').values_list(
+            'name', flat=True)) == ['Второй', 'Первый', 'Третий', 'Четвёртый']
+
+    def test_03_only_page_is_loaded(self, client,
+                                    django_assert_num_queries):
+        for idx in range(20):
+            Title.objects.create(name=f'Ещё {idx}', year=2010)
+        title_bitmap_index.ensure_fresh()
+        # Только страница: JSON собран и сохранён при записи.
+        with django_assert_num_queries(1) as captured:
+            response = client.get(TITLES_URL, {'year': 2010, 'page': 2})
+        data = response.json()
+        assert data['count'] == 20
+        assert [title['name'] for title in data['results']] == [
+            f'Ещё {idx}' for idx in range(5, 10)]
+        assert 'COUNT(' not in captured.captured_queries[0]['sql']
+
+    def test_04_signals_keep_index_in_sync(self, client, titles,
+                                           django_assert_num_queries):
+        title_bitmap_index.ensure_fresh()
+        title = Title.objects.get(name='Первый')
+        title.genre.add(titles['horror'])
+        title.year = 2003
+        title.save()
+        Title.objects.get(name='Третий').delete()
+        titles['comedy'].title_set.add(title)
+        # JSON изменённых произведений сохранён при записи.
+        with django_assert_num_queries(1):
+            assert names(client, genre='horror,comedy', genre_mode='all',
+                         year=2003) == ['Первый', 'Четвёртый']
+        assert names(client, genre='comedy') == [
+            'Первый', 'Второй', 'Четвёртый']
+
+        titles['horror'].slug = 'scary'
+        titles['horror'].save()
+        assert names(client, genre='scary') == ['Первый', 'Четвёртый']
+        Category.objects.get(slug='movie').delete()
+        assert names(client, category='movie') == []
+
+    def test_05_changes_from_other_processes(self, client):
+        assert names(client, year=2001) == ['Первый']
+        Title.objects.filter(name='Первый').update(year=1999)
+        assert names(client, year=2001) == ['Первый']
+        title_bitmap_index.publish(
+            [Title.objects.get(name='Первый').pk])
+        assert names(client, year=2001) == []
+        assert names(client, year=1999) == ['Первый']
+
+    def test_06_bit_positions(self):
+        ids = [1, 7, 8, BITSET_SCAN_BYTES * 8 - 1, BITSET_SCAN_BYTES * 8,
+               BITSET_SCAN_BYTES * 24 + 3]
+        bits = to_bitset(ids)
+        assert bit_positions(bits, 0, 100) == ids
+        for offset in range(len(ids) + 1):
+            for limit in range(4):
+                assert bit_positions(bits, offset, limit) == (
+                    ids[offset:offset + limit])
+        assert bit_positions(0, 0, 5) == []
@@ -0,0 +1,89 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Category, Genre, Title
+
+FACETS_URL = '/api/v1/titles/facets/'
+
+
+def facets(client, **params):
+    response = client.get(FACETS_URL, params)
+    assert response.status_code == HTTPStatus.OK
+    data = response.json()
+    return (
+        data['count'],
+        {item['slug']: item['count'] for item in data['genre']},
+        {item['slug']: item['count'] for item in data['category']},
+        [(item['from'], item['to'], item['count']) for item in data['year']],
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16TitleFacets:
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        genres = {slug: Genre.objects.create(name=slug, slug=slug)
+                  for slug in ('drama', 'comedy', 'horror')}
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        book = Category.objects.create(name='Книга', slug='book')
+        for name, year, category, slugs in (
+                ('Первый', 1989, movie, ('drama',)),
+                ('Второй', 1990, movie, ('drama', 'comedy')),
+                ('Третий', 1999, book, ('comedy',)),
+                ('Четвёртый', 2003, None, ('drama', 'comedy', 'horror'))):
+            title = Title.objects.create(name=name, year=year,
+                                         category=category)
+            title.genre.set([genres[slug] for slug in slugs])
+
+    def test_01_counts(self, client):
+        assert facets(client) == (
+            4,
+            {'drama': 3, 'comedy': 3, 'horror': 1},
+            {'movie': 2, 'book': 1},
+            [(1980, 1989, 1), (1990, 1999, 2), (2000, 2009, 1)],
+        )
+        assert facets(client, genre='drama,comedy', genre_mode='all') == (
+            2,
+            {'drama': 2, 'comedy': 2, 'horror': 1},
+            {'movie': 1, 'book': 0},
+            [(1990, 1999, 1), (2000, 2009, 1)],
+        )
+        assert facets(client, category='book', genre='horror') == (
+            0, {'drama': 0, 'comedy': 0, 'horror': 0},
+            {'movie': 0, 'book': 0}, [],
+        )
+
+    def test_02_search_uses_grouped_queries(self, client,
+                                            django_assert_max_num_queries):
+        index_result = facets(client, genre='comedy', year=1990)
+        # Полнотекстовый поиск не покрывается индексом: те же счётчики
+        # считаются сгруппированными запросами.
+        with django_assert_max_num_queries(7):
+            assert facets(client, genre='comedy', name='второй') == (
+                index_result)
+        Genre.objects.bulk_create(
+            Genre(name=f'Жанр {idx}', slug=f'genre-{idx}')
+            for idx in range(20))
+        with django_assert_max_num_queries(7):
+            assert facets(client, name='первый')[0] == 1
+
+    def test_03_cached_per_filter(self, client, django_assert_num_queries):
+        facets(client, genre='drama')
+        with django_assert_num_queries(0):
+            assert facets(client, genre='drama')[0] == 3
+        assert facets(client, genre='comedy')[0] == 3
+
+        title = Title.objects.create(name='Пятый', year=2020)
+        title.genre.add(Genre.objects.get(slug='drama'))
+        count, _, _, years = facets(client, genre='drama')
+        assert count == 4
+        assert years[-1] == (2020, 2029, 1)
+
+    def test_04_validation_and_permissions(self, client, admin_client):
+        response = client.get(FACETS_URL, {'genre_mode': 'some'})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        response = admin_client.post(FACETS_URL)
+        assert response.status_code in (HTTPStatus.FORBIDDEN,
+                                        HTTPStatus.METHOD_NOT_ALLOWED)
@@ -0,0 +1,122 @@
+import base64
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from reviews.models import Category, CustomUser, Review, Title
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def names(client, **params):
+    url, result = TITLES_URL, []
+    while url:
+        response = client.get(url, params)
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        result.extend(title['name'] for title in data['results'])
+        url, params = data['next'], None
+    return result
+
+
+def cursor(*values):
+    return base64.urlsafe_b64encode(
+        json.dumps({'v': values}).encode()).decode()
+
+
+def walk(client, **params):
+    return names(client, cursor='', **params)
+
+
+def page_plan(client, params):
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(TITLES_URL, params).status_code == HTTPStatus.OK
+    page_query = next(
+        query['sql'] for query in queries.captured_queries
+        if 'ORDER BY' in query['sql'] and 'COUNT(' not in query['sql'])
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {page_query}')
+        return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17TitleOrdering:
+
+    @pytest.fixture(autouse=True)
+    def titles(self):
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        readers = [
+            CustomUser.objects.create(username=f'reader{idx}',
+                                      email=f'reader{idx}@yamdb.fake')
+            for idx in range(3)
+        ]
+        for name, year, category, scores in (
+                ('Бета', 2001, movie, (8, 9)),
+                ('альфа', 2001, None, (10,)),
+                ('Гамма', 1999, movie, ()),
+                ('Дельта', 2005, movie, (3, 4, 8)),
+                ('Ёж', 1999, None, (5,))):
+            title = Title.objects.create(name=name, year=year,
+                                         category=category)
+            for reader, score in zip(readers, scores):
+                Review.objects.create(title=title, author=reader,
+                                      text='Отзыв', score=score)
+
+    def test_01_ordering(self, client):
+        assert names(client, ordering='-rating') == [
+            'альфа', 'Бета', 'Ёж', 'Дельта', 'Гамма']
+        assert names(client, ordering='rating') == [
+            'Гамма', 'Дельта', 'Ёж', 'Бета', 'альфа']
+        assert names(client, ordering='year,-rating') == [
+            'Ёж', 'Гамма', 'альфа', 'Бета', 'Дельта']
+        # Имя сравнивается без учёта регистра, ё - как е.
+        assert names(client, ordering='name') == [
+            'альфа', 'Бета', 'Гамма', 'Дельта', 'Ёж']
+        assert names(client, ordering='-year,name', category='movie') == [
+            'Дельта', 'Бета', 'Гамма']
+        assert names(client, ordering='unknown,-id') == names(client)
+
+    def test_02_rating_key_follows_reviews(self, client):
+        title = Title.objects.get(name='Дельта')
+        assert title.rating_avg == pytest.approx(5)
+        review = title.reviews.get(score=3)
+        review.score = 9
+        review.save()
+        Review.objects.filter(title__name='альфа').delete()
+        assert names(client, ordering='-rating') == [
+            'Бета', 'Дельта', 'Ёж', 'Гамма', 'альфа']
+        Title.objects.update(rating_avg=0)
+        assert Title.objects.recount_ratings() == 3
+        assert names(client, ordering='-rating')[:3] == [
+            'Бета', 'Дельта', 'Ёж']
+
+    def test_03_cursor_follows_ordering(self, client):
+        movie = Category.objects.get(slug='movie')
+        for idx in range(8):
+            Title.objects.create(name=f'Фильм {idx % 3}', year=2000 + idx % 2,
+                                 category=movie)
+        for params in ({'ordering': '-rating'}, {'ordering': 'year,name'},
+                       {'ordering': '-name', 'category': 'movie'}):
+            ordered = walk(client, **params)
+            # Несколько страниц по 5 и одинаковые названия на границах.
+            assert len(ordered) > 10
+            assert ordered == names(client, **params)
+
+    @pytest.mark.parametrize('params, index', (
+        ({'ordering': '-rating'}, 'title_rating_idx'),
+        ({'ordering': 'rating', 'cursor': ''}, 'title_rating_idx'),
+        ({'category': 'movie', 'ordering': 'year'},
+         'title_category_year_idx (category_id=?)'),
+        ({'category': 'movie', 'ordering': '-rating'},
+         'title_category_rating_idx (category_id=?)'),
+        ({'category': 'movie', 'ordering': '-rating',
+          'cursor': cursor(5.0, 4)},
+         'title_category_rating_idx (category_id=? AND rating_avg<?)'),
+    ))
+    def test_04_index_range_scans(self, client, params, index):
+        plan = page_plan(client, params)
+        assert index in plan
+        assert 'TEMP B-TREE' not in plan
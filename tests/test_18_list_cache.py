@@ -0,0 +1,108 @@
+import multiprocessing
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.cache import caches
+from django.core.management import call_command
+
+from api.cache_backends import SharedFileCache
+from api.cache import VERSION_KEY_PREFIX, model_tag, new_version, reset_stats
+from reviews.models import Category, Genre
+
+URLS = ('/api/v1/categories/', '/api/v1/genres/')
+INCREMENTS = 200
+
+
+def increment(location):
+    counters = SharedFileCache(location, {})
+    for _ in range(INCREMENTS):
+        counters.incr('counter')
+
+
+def slugs(client, url, **params):
+    response = client.get(url, params)
+    assert response.status_code == HTTPStatus.OK
+    return [item['slug'] for item in response.json()['results']]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18ListCache:
+
+    @pytest.fixture(autouse=True)
+    def objects(self):
+        for model in (Category, Genre):
+            for slug in ('films', 'books'):
+                model.objects.create(name=slug.title(), slug=slug)
+
+    @pytest.mark.parametrize('url', URLS)
+    def test_01_hit_runs_no_queries(self, client, url,
+                                    django_assert_num_queries):
+        assert slugs(client, url) == ['films', 'books']
+        with django_assert_num_queries(0):
+            assert slugs(client, url) == ['films', 'books']
+        assert slugs(client, url, search='boo') == ['books']
+        with django_assert_num_queries(0):
+            assert slugs(client, url, search='boo') == ['books']
+
+    @pytest.mark.parametrize('url', URLS)
+    def test_02_writes_invalidate(self, admin_client, client, url):
+        slugs(client, url)
+        response = admin_client.post(url, {'name': 'Музыка',
+                                           'slug': 'music'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert slugs(client, url) == ['films', 'books', 'music']
+        response = admin_client.delete(f'{url}films/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert slugs(client, url) == ['books', 'music']
+
+    @pytest.mark.parametrize('url', URLS)
+    def test_02a_host_in_key(self, client, url):
+        for number in range(5):
+            Category.objects.create(name=f'c{number}', slug=f'c{number}')
+            Genre.objects.create(name=f'g{number}', slug=f'g{number}')
+        response = client.get(url, HTTP_HOST='evil.example')
+        assert response.json()['next'].startswith('http://evil.example/')
+        response = client.get(url)
+        assert response.json()['next'].startswith('http://testserver/')
+
+    def test_03_changes_from_other_processes(self, client):
+        url = URLS[0]
+        slugs(client, url)
+        Category.objects.filter(slug='films').update(slug='movies')
+        assert slugs(client, url) == ['films', 'books']
+        # Другой воркер видит тот же каталог кеша и меняет версию тега.
+        other_worker = caches.create_connection('default')
+        other_worker.set(
+            f'{VERSION_KEY_PREFIX}{model_tag(Category)}', new_version(),
+            timeout=None)
+        assert slugs(client, url) == ['movies', 'books']
+
+    def test_04_hit_ratio(self, client):
+        reset_stats()
+        for _ in range(4):
+            slugs(client, URLS[1])
+        output = StringIO()
+        call_command('cache_stats', '--reset', stdout=output)
+        assert 'list: попаданий 3, промахов 1, доля попаданий 75.0%' in (
+            output.getvalue())
+        assert 'count: попаданий 0, промахов 1' in output.getvalue()
+        output = StringIO()
+        call_command('cache_stats', stdout=output)
+        assert output.getvalue() == 'Статистики пока нет.\n'
+
+
+def test_shared_file_cache_incr_is_atomic(tmp_path):
+    counters = SharedFileCache(str(tmp_path), {})
+    assert counters.add('counter', 0, timeout=None)
+    assert not counters.add('counter', 1)
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=increment, args=(str(tmp_path),))
+                 for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert counters.get('counter') == 3 * INCREMENTS
+    counters.clear()
+    assert list(tmp_path.iterdir()) == [tmp_path / 'counters.lock']
@@ -0,0 +1,164 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import caches
+
+from api.cache import VERSION_KEY_PREFIX, object_tag
+from api.views import AnonymousResponseCacheMixin
+from reviews.models import Comment, Genre, Review, Title
+from tests.utils import open_write_transaction
+
+
+def conditional_get(client, url, response, header='ETag'):
+    request_header = {'ETag': 'HTTP_IF_NONE_MATCH',
+                      'Last-Modified': 'HTTP_IF_MODIFIED_SINCE'}[header]
+    return client.get(url, **{request_header: response[header]})
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19ConditionalGet:
+
+    @pytest.fixture(autouse=True)
+    def objects(self, user):
+        self.genre = Genre.objects.create(name='Драма', slug='drama')
+        self.title = Title.objects.create(name='Сталкер', year=1979)
+        self.title.genre.add(self.genre)
+        self.other_title = Title.objects.create(name='Солярис', year=1972)
+        self.review = Review.objects.create(
+            title=self.title, author=user, text='Отзыв', score=9)
+        self.comment = Comment.objects.create(
+            review=self.review, author=user, text='Комментарий')
+        self.urls = {
+            'titles': '/api/v1/titles/',
+            'title': f'/api/v1/titles/{self.title.pk}/',
+            'reviews': f'/api/v1/titles/{self.title.pk}/reviews/',
+            'review': (f'/api/v1/titles/{self.title.pk}/reviews/'
+                       f'{self.review.pk}/'),
+        }
+        self.urls['comments'] = f'{self.urls["review"]}comments/'
+        self.urls['comment'] = f'{self.urls["comments"]}{self.comment.pk}/'
+
+    def test_01_not_modified_without_queries(self, client,
+                                             django_assert_num_queries):
+        for url in self.urls.values():
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            assert response['ETag'] and response['Last-Modified']
+            with django_assert_num_queries(0):
+                not_modified = conditional_get(client, url, response)
+            assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+            assert not_modified['ETag'] == response['ETag']
+            assert not not_modified.content
+            assert conditional_get(
+                client, url, response, 'Last-Modified'
+            ).status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_02_authenticated_not_modified_is_one_query(
+            self, user_client, django_assert_max_num_queries):
+        response = user_client.get(self.urls['reviews'])
+        # Единственный запрос - пользователь из JWT-токена.
+        with django_assert_max_num_queries(1):
+            not_modified = conditional_get(
+                user_client, self.urls['reviews'], response)
+        assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_03_writes_change_validators(self, client, admin, user):
+        responses = {name: client.get(url)
+                     for name, url in self.urls.items()}
+
+        def changed():
+            result = set()
+            for name, url in self.urls.items():
+                response = conditional_get(client, url, responses[name])
+                if response.status_code == HTTPStatus.OK:
+                    result.add(name)
+                    responses[name] = response
+            return result
+
+        assert changed() == set()
+        Review.objects.create(title=self.title, author=admin, text='Ещё',
+                              score=1)
+        assert changed() == {'titles', 'title', 'reviews'}
+        Comment.objects.create(review=self.review, author=admin, text='Да')
+        assert changed() == {'comments'}
+        self.genre.name = 'Драма и мелодрама'
+        self.genre.save()
+        assert changed() == {'titles', 'title'}
+        user.bio = 'Новая биография'
+        user.save()
+        assert changed() == set()
+        user.username = 'renamed'
+        user.save()
+        assert changed() == {'reviews', 'review', 'comments', 'comment'}
+        self.comment.delete()
+        assert changed() == {'comments'}
+        response = conditional_get(client, self.urls['comment'],
+                                   responses['comment'])
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_04_validators_depend_on_path(self, client):
+        response = client.get(self.urls['reviews'])
+        other = f'/api/v1/titles/{self.other_title.pk}/reviews/'
+        assert conditional_get(client, other, response).status_code == (
+            HTTPStatus.OK)
+        response = client.get(self.urls['review'])
+        other = (f'/api/v1/titles/{self.other_title.pk}/reviews/'
+                 f'{self.review.pk}/')
+        assert conditional_get(client, other, response).status_code == (
+            HTTPStatus.NOT_FOUND)
+        assert conditional_get(
+            client, self.urls['reviews'] + '?page=2', response
+        ).status_code == HTTPStatus.NOT_FOUND
+
+    def test_05_validators_change_after_commit(self, client, monkeypatch):
+        monkeypatch.setattr(AnonymousResponseCacheMixin,
+                            'response_cache_timeout', 0)
+        url = self.urls['review']
+        before = client.get(url)
+
+        def write():
+            review = Review.objects.get(pk=self.review.pk)
+            review.score = 2
+            review.save()
+
+        with open_write_transaction(write):
+            # Запись ещё не зафиксирована: ответ и версии прежние.
+            during = client.get(url)
+            assert during.json()['score'] == 9
+            assert during['ETag'] == before['ETag']
+        response = conditional_get(client, url, during)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что версии тегов меняются после фиксации '
+            'транзакции, а не внутри неё.'
+        )
+        assert response.json()['score'] == 2
+        assert response['ETag'] != before['ETag']
+
+    def test_06_no_versions_for_missing_objects(self, client):
+        url = f'/api/v1/titles/{self.title.pk}/reviews/999/'
+        assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+        key = f'{VERSION_KEY_PREFIX}{object_tag(Review, 999)}'
+        assert caches['default'].get(key) is None
+
+    def test_07_zero_padded_ids(self, client, admin, monkeypatch):
+        monkeypatch.setattr(AnonymousResponseCacheMixin,
+                            'response_cache_timeout', 0)
+        title, review = f'0{self.title.pk}', f'0{self.review.pk}'
+        review_url = f'/api/v1/titles/{self.title.pk}/reviews/{review}/'
+        urls = (f'/api/v1/titles/{title}/',
+                f'/api/v1/titles/{title}/reviews/',
+                review_url, f'{review_url}comments/',
+                f'{review_url}comments/0{self.comment.pk}/')
+        responses = [client.get(url) for url in urls]
+        assert all(response.status_code == HTTPStatus.OK
+                   for response in responses)
+        Review.objects.create(title=self.title, author=admin, text='Ещё',
+                              score=1)
+        Review.objects.get(pk=self.review.pk).save()
+        Comment.objects.create(review=self.review, author=admin, text='Да')
+        self.comment.save()
+        for url, response in zip(urls, responses):
+            assert conditional_get(client, url, response).status_code == (
+                HTTPStatus.OK), (
+                f'Проверьте, что у `{url}` валидаторы меняются после '
+                'записи, как у адреса без ведущего нуля.')
@@ -0,0 +1,167 @@
+from http import HTTPStatus
+
+import pytest
+
+from api.cache import flush_stats, get_stats, reset_stats
+from reviews.models import Category, Comment, Genre, Review, Title
+from tests.utils import open_write_transaction
+
+
+def is_hit(client, url, **params):
+    reset_stats()
+    response = client.get(url, params)
+    assert response.status_code == HTTPStatus.OK
+    flush_stats()
+    return get_stats().get('response', {}).get('hits') == 1
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20ResponseCache:
+
+    @pytest.fixture(autouse=True)
+    def objects(self, user, admin):
+        self.drama = Genre.objects.create(name='Драма', slug='drama')
+        self.comedy = Genre.objects.create(name='Комедия', slug='comedy')
+        self.movie = Category.objects.create(name='Фильм', slug='movie')
+        self.title = Title.objects.create(name='Сталкер', year=1979,
+                                          category=self.movie)
+        self.title.genre.add(self.drama)
+        self.other_title = Title.objects.create(name='Ревизор', year=1836)
+        self.other_title.genre.add(self.comedy)
+        self.review = Review.objects.create(
+            title=self.title, author=user, text='Отзыв', score=9)
+        self.other_review = Review.objects.create(
+            title=self.other_title, author=admin, text='Отзыв', score=5)
+        self.comment = Comment.objects.create(
+            review=self.review, author=admin, text='Комментарий')
+        self.other_comment = Comment.objects.create(
+            review=self.other_review, author=admin, text='Комментарий')
+        review_url = (f'/api/v1/titles/{self.title.pk}/reviews/'
+                      f'{self.review.pk}/')
+        self.urls = {
+            'titles': '/api/v1/titles/',
+            'title': f'/api/v1/titles/{self.title.pk}/',
+            'other_title': f'/api/v1/titles/{self.other_title.pk}/',
+            'reviews': f'/api/v1/titles/{self.title.pk}/reviews/',
+            'other_reviews': f'/api/v1/titles/{self.other_title.pk}/reviews/',
+            'review': review_url,
+            'comments': f'{review_url}comments/',
+            'comment': f'{review_url}comments/{self.comment.pk}/',
+        }
+
+    def invalidated(self, client):
+        return {name for name, url in self.urls.items()
+                if not is_hit(client, url)}
+
+    def test_01_hit_runs_no_queries(self, client, django_assert_num_queries):
+        for url in self.urls.values():
+            data = client.get(url).json()
+            with django_assert_num_queries(0):
+                response = client.get(url)
+            assert response.json() == data
+
+    def test_02_normalized_query_string(self, client):
+        url = self.urls['titles']
+        assert not is_hit(client, f'{url}?year=1979&genre=drama')
+        assert is_hit(client, f'{url}?genre=drama&year=1979')
+        assert not is_hit(client, f'{url}?genre=comedy&year=1979')
+
+    def test_03_authenticated_never_cached(self, client, user_client):
+        url = self.urls['title']
+        assert client.get(url).json()['name'] == 'Сталкер'
+        Title.objects.filter(pk=self.title.pk).update(name='Солярис')
+        Title.objects.filter(pk=self.title.pk).expire_json()
+        # Обход сигналов: общий кеш ещё хранит старый ответ.
+        assert client.get(url).json()['name'] == 'Сталкер'
+        assert user_client.get(url).json()['name'] == 'Солярис'
+        reset_stats()
+        user_client.get(self.urls['reviews'])
+        flush_stats()
+        assert 'response' not in get_stats()
+        assert not is_hit(client, self.urls['reviews'])
+
+    def test_04_writes_purge_affected_tags(self, client, admin_client, user):
+        assert self.invalidated(client) == set(self.urls)
+        assert self.invalidated(client) == set()
+
+        response = admin_client.post(
+            self.urls['reviews'], {'text': 'Ещё', 'score': 1})
+        assert response.status_code == HTTPStatus.CREATED
+        assert self.invalidated(client) == {'titles', 'title', 'reviews'}
+
+        response = admin_client.post(self.urls['comments'], {'text': 'Да'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert self.invalidated(client) == {'comments'}
+
+        self.comedy.name = 'Комедия положений'
+        self.comedy.save()
+        assert self.invalidated(client) == {'titles', 'other_title'}
+
+        user.username = 'renamed'
+        user.save()
+        assert self.invalidated(client) == {'reviews', 'review'}
+
+        response = admin_client.delete('/api/v1/categories/movie/')
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert self.invalidated(client) == {'titles', 'title'}
+        assert client.get(self.urls['title']).json()['category'] is None
+
+    def test_05_ordering_by_rating_follows_reviews(self, client, admin):
+        url = self.urls['titles']
+        titles = [Title.objects.create(name=f'Сериал {idx}', year=2000 + idx)
+                  for idx in range(5)]
+        for ordering in ('-rating', 'year'):
+            assert not is_hit(client, url, ordering=ordering)
+        # Последнее по году произведение не попадает на первую страницу.
+        Review.objects.create(title=titles[-1], author=admin, text='Да',
+                              score=10)
+        assert is_hit(client, url, ordering='year')
+        assert not is_hit(client, url, ordering='-rating')
+        names = [item['name'] for item in
+                 client.get(url, {'ordering': '-rating'}).json()['results']]
+        assert names[0] == 'Сериал 4'
+
+    def test_06_deleted_title_reviews(self, client, admin_client):
+        url = self.urls['other_reviews']
+        self.other_review.delete()
+        assert client.get(url).json()['results'] == []
+        response = admin_client.delete(self.urls['other_title'])
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+    def test_07_no_stale_entry_from_open_transaction(self, client):
+        url = self.urls['review']
+        assert client.get(url).json()['text'] == 'Отзыв'
+
+        def write():
+            review = Review.objects.get(pk=self.review.pk)
+            review.text = 'Исправленный отзыв'
+            review.save()
+
+        with open_write_transaction(write):
+            # Запрос видит строки до фиксации и не должен закешировать
+            # их под версиями, которые уже учитывают эту запись.
+            assert client.get(url).json()['text'] == 'Отзыв'
+        assert client.get(url).json()['text'] == 'Исправленный отзыв', (
+            'Проверьте, что запись, прочитанная во время открытой '
+            'транзакции, не остаётся в кеше ответов после её фиксации.'
+        )
+
+    def test_08_host_in_key(self, client):
+        for number in range(5):
+            Title.objects.create(name=f'Сериал {number}', year=2000)
+        url = self.urls['titles']
+        response = client.get(url, HTTP_HOST='evil.example')
+        assert response.json()['next'].startswith('http://evil.example/')
+        response = client.get(url)
+        assert response.json()['next'].startswith('http://testserver/')
+
+    def test_09_zero_padded_ids(self, client, admin):
+        url = f'/api/v1/titles/0{self.title.pk}/reviews/'
+        assert client.get(url).json()['count'] == 1
+        Review.objects.create(title=self.title, author=admin, text='Ещё',
+                              score=1)
+        assert client.get(url).json()['count'] == 2, (
+            'Проверьте, что ответ по адресу с ведущим нулём в id '
+            'сбрасывается теми же записями, что и по каноническому.'
+        )
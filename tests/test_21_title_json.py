@@ -0,0 +1,148 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from api.indexes import title_bitmap_index
+from api.renderers import JSONFragment, JSONFragmentRenderer
+from api.serializers import (TitleGetSerializer, TitleJSONSerializer,
+                             store_stale_title_json, store_title_json)
+from reviews.models import Category, Genre, Review, Title
+
+TITLES_URL = '/api/v1/titles/'
+
+
+def stored(title):
+    return Title.objects.values_list('cached_json', flat=True).get(
+        pk=title.pk)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21TitleJSON:
+
+    @pytest.fixture(autouse=True)
+    def objects(self):
+        self.drama = Genre.objects.create(name='Драма', slug='drama')
+        self.comedy = Genre.objects.create(name='Комедия', slug='comedy')
+        self.movie = Category.objects.create(name='Фильм', slug='movie')
+        self.title = Title.objects.create(
+            name='Сталкер «Зона»', year=1979, category=self.movie,
+            description='Строка с разделителем')
+        self.title.genre.set([self.drama, self.comedy])
+        self.other_title = Title.objects.create(name='Ревизор', year=1836)
+
+    def expected(self, *titles):
+        return [TitleGetSerializer(Title.objects.get(pk=title.pk)).data
+                for title in titles]
+
+    def test_01_same_bytes_as_serializer(self, user_client):
+        for _ in range(2):
+            response = user_client.get(f'{TITLES_URL}{self.title.pk}/')
+            assert response.content == JSONRenderer().render(
+                self.expected(self.title)[0])
+            response = user_client.get(TITLES_URL)
+            assert response.content == JSONRenderer().render({
+                'count': 2, 'next': None, 'previous': None,
+                'results': self.expected(self.title, self.other_title)})
+            assert stored(self.title) is not None
+
+    def test_02_writes_store_json(self, client, user, admin_client):
+        url = f'{TITLES_URL}{self.title.pk}/'
+
+        def check():
+            # Запись пересобрала JSON после фиксации.
+            assert json.loads(stored(self.title)) == self.expected(
+                self.title)[0]
+            assert client.get(url).json() == self.expected(self.title)[0]
+
+        Review.objects.create(title=self.title, author=user, text='Да',
+                              score=7)
+        check()
+        self.drama.name = 'Драма положений'
+        self.drama.save()
+        check()
+        self.title.genre.remove(self.comedy)
+        check()
+        self.comedy.title_set.add(self.title)
+        check()
+        self.comedy.title_set.clear()
+        check()
+        response = admin_client.patch(url, {'name': 'Сталкер'})
+        assert response.status_code == HTTPStatus.OK
+        check()
+        self.movie.delete()
+        check()
+        assert client.get(url).json()['category'] is None
+        assert Title.objects.recount_ratings() == 0
+        assert stored(self.title) is not None
+
+    def test_03_reads_do_not_write(self, client,
+                                   django_assert_num_queries):
+        Title.objects.expire_json()
+        title = Title.objects.get(pk=self.title.pk)
+        data = TitleJSONSerializer(title).data
+        assert isinstance(data, JSONFragment)
+        assert json.loads(data) == self.expected(self.title)[0]
+        title_bitmap_index.ensure_fresh()
+        # Страница, категории и жанры; без UPDATE.
+        with django_assert_num_queries(3) as captured:
+            response = client.get(TITLES_URL)
+        assert not any(query['sql'].startswith('UPDATE')
+                       for query in captured.captured_queries)
+        assert response.json()['results'] == self.expected(
+            self.title, self.other_title)
+        assert stored(self.title) is None
+        store_title_json([self.title.pk])
+        assert json.loads(stored(self.title)) == self.expected(
+            self.title)[0]
+        assert stored(self.other_title) is None
+        store_stale_title_json(chunk_size=1)
+        assert stored(self.other_title) is not None
+
+    def test_03a_expired_while_building_is_not_saved(self, monkeypatch):
+        Title.objects.filter(pk=self.title.pk).expire_json()
+        render = TitleJSONSerializer.render
+
+        def expire_during_render(serializer, titles):
+            Title.objects.filter(pk=self.title.pk).expire_json()
+            return render(serializer, titles)
+
+        monkeypatch.setattr(TitleJSONSerializer, 'render',
+                            expire_during_render)
+        store_title_json([self.title.pk])
+        assert stored(self.title) is None
+
+    def test_03b_stale_title_save_while_building(self, monkeypatch):
+        loaded = Title.objects.get(pk=self.title.pk)
+        # Запись отзыва сбросила JSON и собирает его после фиксации.
+        Title.objects.filter(pk=self.title.pk).expire_json()
+        render = TitleJSONSerializer.render
+        calls = []
+
+        def save_during_render(serializer, titles):
+            calls.append(titles)
+            if len(calls) == 1:
+                # Изменение названия из загруженного раньше объекта.
+                loaded.name = 'Солярис'
+                loaded.save()
+            return render(serializer, titles)
+
+        monkeypatch.setattr(TitleJSONSerializer, 'render',
+                            save_during_render)
+        store_title_json([self.title.pk])
+        assert json.loads(stored(self.title))['name'] == 'Солярис'
+
+    def test_04_renderer(self, client):
+        renderer = JSONFragmentRenderer()
+        data = {'count': 1, 'results': [JSONFragment('{"a":[1,"ё"]}')],
+                'extra': {'b': None}}
+        assert renderer.render(data) == JSONRenderer().render(
+            {'count': 1, 'results': [{'a': [1, 'ё']}], 'extra': {'b': None}})
+        indented = client.get(TITLES_URL,
+                              HTTP_ACCEPT='application/json; indent=2')
+        assert b'\n  "count": 2' in indented.content
+        assert json.loads(indented.content) == client.get(TITLES_URL).json()
+        browsable = client.get(TITLES_URL, {'format': 'api'})
+        assert browsable.status_code == HTTPStatus.OK
+        assert 'Сталкер «Зона»' in browsable.content.decode()
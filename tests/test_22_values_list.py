@@ -0,0 +1,79 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleGetSerializer, ValuesRepresentation)
+from reviews.models import Comment, CustomUser, Review, Title
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22ValuesList:
+
+    @pytest.fixture(autouse=True)
+    def objects(self):
+        self.title = Title.objects.create(name='Сталкер', year=1979)
+        authors = [
+            CustomUser.objects.create(username=f'читатель.{idx}',
+                                      email=f'reader{idx}@yamdb.fake')
+            for idx in range(7)
+        ]
+        started = timezone.now() - timedelta(days=1)
+        for idx, author in enumerate(authors):
+            review = Review.objects.create(
+                title=self.title, author=author, score=idx % 10 + 1,
+                text=f'Отзыв "{idx}"\n  «цитата»')
+            # Даты с микросекундами и одна дата на две записи.
+            Review.objects.filter(pk=review.pk).update(
+                pub_date=started + timedelta(microseconds=idx // 2 * 1001))
+            for other in authors:
+                Comment.objects.create(review=review, author=other,
+                                       text=f'Ответ {idx}')
+        self.review = Review.objects.order_by('pub_date', 'id').first()
+        self.urls = {
+            f'/api/v1/titles/{self.title.pk}/reviews/': (
+                ReviewSerializer, self.title.reviews),
+            (f'/api/v1/titles/{self.title.pk}/reviews/{self.review.pk}/'
+             f'comments/'): (CommentSerializer, self.review.comments),
+        }
+
+    @pytest.mark.parametrize('params', ({}, {'page': 2}, {'cursor': ''},
+                                        {'count': 'false'}))
+    def test_01_same_bytes_as_serializer(self, user_client, params):
+        for url, (serializer_class, manager) in self.urls.items():
+            queryset = manager.order_by('pub_date', 'id')
+            page = int(params.get('page', 1))
+            response = user_client.get(url, params)
+            assert response.status_code == HTTPStatus.OK
+            expected = serializer_class(
+                queryset[(page - 1) * 5:page * 5], many=True).data
+            assert response.content == render(
+                {**response.json(), 'results': expected})
+
+    def test_02_cursor_walk(self, user_client):
+        url = f'/api/v1/titles/{self.title.pk}/reviews/'
+        response = user_client.get(url, {'cursor': ''}).json()
+        second = user_client.get(response['next']).json()
+        assert [item['id'] for item in response['results'] + second[
+            'results']] == list(self.title.reviews.order_by(
+                'pub_date', 'id').values_list('id', flat=True))
+
+    def test_03_representation(self):
+        for serializer_class, manager in self.urls.values():
+            queryset = manager.order_by('id')
+            representation = ValuesRepresentation(serializer_class)
+            for zone in ('UTC', 'Asia/Novosibirsk'):
+                with timezone.override(zone):
+                    assert render(representation.to_representation(
+                        representation.rows(queryset))) == render(
+                        serializer_class(queryset, many=True).data)
+        with pytest.raises(ImproperlyConfigured):
+            ValuesRepresentation(TitleGetSerializer)
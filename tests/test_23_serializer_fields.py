@@ -0,0 +1,80 @@
+import pytest
+from rest_framework.serializers import ModelSerializer
+
+from api.serializers import (CategorySerializer, CommentSerializer,
+                             GenreSerializer, ReviewSerializer,
+                             TitleGetSerializer, TitlePostSerializer,
+                             UserSerializer)
+from reviews.models import Category, Genre
+
+SERIALIZERS = (UserSerializer, CategorySerializer, GenreSerializer,
+               TitleGetSerializer, TitlePostSerializer, ReviewSerializer,
+               CommentSerializer)
+
+
+def uncached(monkeypatch, serializer_class):
+    monkeypatch.setattr(serializer_class, 'get_fields',
+                        ModelSerializer.get_fields)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23SerializerFields:
+
+    @pytest.mark.parametrize('serializer_class', SERIALIZERS)
+    def test_01_fields_built_once(self, monkeypatch, serializer_class):
+        calls = []
+        build = ModelSerializer.get_fields
+
+        def counted(serializer):
+            calls.append(type(serializer))
+            return build(serializer)
+
+        monkeypatch.delattr(serializer_class, '_field_prototypes',
+                            raising=False)
+        monkeypatch.setattr(ModelSerializer, 'get_fields', counted)
+        for _ in range(3):
+            serializer_class().fields
+        assert calls.count(serializer_class) == 1
+
+    @pytest.mark.parametrize('serializer_class', SERIALIZERS)
+    def test_02_same_fields(self, monkeypatch, serializer_class):
+        cached = repr(serializer_class())
+        uncached(monkeypatch, serializer_class)
+        assert repr(serializer_class()) == cached
+
+    def test_03_fields_are_not_shared(self):
+        first, second = TitleGetSerializer(), TitleGetSerializer()
+        for name in ('name', 'category', 'genre'):
+            assert first.fields[name] is not second.fields[name]
+            assert first.fields[name].parent is first
+            assert second.fields[name].parent is second
+        assert first.fields['genre'].child is not second.fields['genre'].child
+        post = TitlePostSerializer()
+        assert post.fields['genre'].child_relation.parent is (
+            post.fields['genre'])
+
+    @pytest.mark.parametrize('serializer_class, data', (
+        (TitlePostSerializer, {'name': 'Сталкер', 'year': 1979,
+                               'genre': ['drama'], 'category': 'movie'}),
+        (TitlePostSerializer, {'name': 'Сталкер', 'year': 3000,
+                               'genre': [], 'category': 'unknown'}),
+        (TitlePostSerializer, {'name': 'С' * 300, 'year': 'год',
+                               'genre': ['unknown']}),
+        (UserSerializer, {'username': 'читатель', 'email': 'reader@fake'}),
+        (UserSerializer, {'username': 'плохое имя!', 'email': 'x',
+                          'role': 'king', 'bio': 'б' * 300}),
+        (CategorySerializer, {'name': 'Фильм', 'slug': 'movie'}),
+        (GenreSerializer, {'name': '', 'slug': 'плохой слаг'}),
+    ))
+    def test_04_validation_unchanged(self, monkeypatch, serializer_class,
+                                     data):
+        Category.objects.create(name='Фильм', slug='movie')
+        Genre.objects.create(name='Драма', slug='drama')
+
+        def validate():
+            serializer = serializer_class(data=data)
+            return serializer.is_valid(), serializer.errors
+
+        cached = [validate() for _ in range(2)]
+        uncached(monkeypatch, serializer_class)
+        assert cached == [validate()] * 2
@@ -0,0 +1,86 @@
+import io
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from http import HTTPStatus
+
+import pytest
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import parsers, renderers
+from api.parsers import ORJSONParser
+from api.renderers import JSONFragment, ORJSONRenderer
+from reviews.models import Title
+
+DATA = OrderedDict([
+    ('count', 2),
+    ('rating', 6.666666666666667),
+    ('score', Decimal('7.50')),
+    ('pub_date', datetime(2024, 8, 31, 10, 48, 1, 123456,
+                          tzinfo=timezone.utc)),
+    ('day', date(2024, 8, 31)),
+    ('duration', timedelta(minutes=90)),
+    ('text', 'Кириллица «без» \\u-экранирования\u2028и\u2029'),
+    ('label', gettext_lazy('Имя')),
+    ('results', [{1: None, 'nested': [True, False, 0.5]}]),
+])
+
+
+@pytest.fixture(params=(True, False), ids=('orjson', 'json'))
+def with_orjson(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(renderers, 'orjson', None)
+        monkeypatch.setattr(parsers, 'orjson', None)
+    return request.param
+
+
+class Test24ORJSON:
+
+    def test_01_same_bytes_as_drf(self, with_orjson):
+        assert ORJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+        fragments = {'count': 1, 'results': [JSONFragment('{"a":"ё"}')]}
+        assert ORJSONRenderer().render(fragments) == (
+            b'{"count":1,"results":[{"a":"\xd1\x91"}]}')
+        indented = ORJSONRenderer().render(
+            DATA, 'application/json; indent=2')
+        assert indented == JSONRenderer().render(
+            DATA, 'application/json; indent=2')
+        huge = {'id': 2 ** 70}
+        assert ORJSONRenderer().render(huge) == JSONRenderer().render(huge)
+
+    def test_02_parser(self, with_orjson):
+        body = '{"text": "Отзыв", "score": 7.5, "tags": [null, true]}'
+        assert ORJSONParser().parse(io.BytesIO(body.encode())) == (
+            JSONParser().parse(io.BytesIO(body.encode())))
+        for invalid in (b'{"text": ', b'{"score": NaN}', b'\xff'):
+            with pytest.raises(ParseError) as orjson_error:
+                ORJSONParser().parse(io.BytesIO(invalid))
+            with pytest.raises(ParseError) as drf_error:
+                JSONParser().parse(io.BytesIO(invalid))
+            assert str(orjson_error.value) == str(drf_error.value)
+        cp1251 = '{"text": "Отзыв"}'.encode('cp1251')
+        assert ORJSONParser().parse(
+            io.BytesIO(cp1251), parser_context={'encoding': 'cp1251'}) == {
+            'text': 'Отзыв'}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_api(self, admin_client, with_orjson):
+        response = admin_client.post(
+            '/api/v1/titles/', '{"name": "Сталкер", "year": 1979, '
+            '"genre": [], "category": "none"}',
+            content_type='application/json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert set(response.json()) == {'genre', 'category'}
+        response = admin_client.post(
+            '/api/v1/titles/', '{"name": ', content_type='application/json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json()['detail'].startswith('JSON parse error')
+        title = Title.objects.create(name='Сталкер', year=1979)
+        response = admin_client.get(
+            f'/api/v1/titles/{title.pk}/reviews/'
+        )
+        assert response['Content-Type'] == 'application/json'
+        assert response.json()['results'] == []
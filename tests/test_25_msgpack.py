@@ -0,0 +1,101 @@
+import io
+from http import HTTPStatus
+
+import pytest
+from rest_framework.exceptions import ParseError
+
+from api.parsers import MessagePackParser
+from api.renderers import JSONFragment, MessagePackRenderer
+from reviews.models import Category, Comment, Genre, Review, Title
+
+msgpack = pytest.importorskip('msgpack')
+
+MSGPACK = 'application/msgpack'
+
+
+def unpack(response):
+    assert response['Content-Type'] == MSGPACK
+    return msgpack.unpackb(response.content)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25MessagePack:
+
+    @pytest.fixture(autouse=True)
+    def objects(self, admin):
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        self.title = Title.objects.create(
+            name='Сталкер «Зона»', year=1979, category=movie,
+            description='Строка с разделителем ')
+        self.title.genre.set([drama])
+        Title.objects.create(name='Ревизор', year=1836)
+        self.review = Review.objects.create(
+            title=self.title, author=admin, text='Отзыв', score=7)
+        Comment.objects.create(review=self.review, author=admin,
+                               text='Ответ')
+
+    def urls(self):
+        reviews = f'/api/v1/titles/{self.title.pk}/reviews/'
+        comments = f'{reviews}{self.review.pk}/comments/'
+        return (
+            '/api/v1/titles/', f'/api/v1/titles/{self.title.pk}/',
+            '/api/v1/titles/?ordering=-rating', reviews,
+            f'{reviews}{self.review.pk}/', f'{reviews}?cursor=',
+            comments, '/api/v1/categories/', '/api/v1/genres/',
+            '/api/v1/users/', '/api/v1/users/me/', '/api/v1/titles/0/',
+        )
+
+    @pytest.mark.parametrize('anonymous', (False, True))
+    def test_01_same_data_as_json(self, client, admin_client, anonymous):
+        api_client = client if anonymous else admin_client
+        for url in self.urls():
+            for _ in range(2):
+                as_json = api_client.get(url)
+                as_msgpack = api_client.get(url, HTTP_ACCEPT=MSGPACK)
+                assert as_msgpack.status_code == as_json.status_code
+                assert unpack(as_msgpack) == as_json.json(), url
+        response = client.get('/api/v1/titles/', {'format': 'msgpack'})
+        assert unpack(response) == client.get('/api/v1/titles/').json()
+        response = client.get('/api/v1/titles/', HTTP_ACCEPT='*/*')
+        assert response['Content-Type'] == 'application/json'
+
+    def test_02_etag_per_format(self, client):
+        url = f'/api/v1/titles/{self.title.pk}/'
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_ACCEPT=MSGPACK,
+                              HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(url, HTTP_ACCEPT=MSGPACK,
+                              HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    def test_03_request_body(self, admin_client):
+        url = f'/api/v1/titles/{self.title.pk}/'
+        response = admin_client.patch(
+            url, msgpack.packb({'name': 'Сталкер', 'genre': ['drama']}),
+            content_type=MSGPACK, HTTP_ACCEPT=MSGPACK)
+        assert response.status_code == HTTPStatus.OK
+        assert unpack(response) == admin_client.get(url).json()
+        assert unpack(response)['name'] == 'Сталкер'
+        response = admin_client.post(
+            '/api/v1/titles/', msgpack.packb({'name': 'Сталкер', 'year': 3000,
+                                              'genre': [], 'category': 'x'}),
+            content_type=MSGPACK)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert set(response.json()) == {'year', 'genre', 'category'}
+        response = admin_client.post('/api/v1/titles/', b'\xc1',
+                                     content_type=MSGPACK)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json()['detail'].startswith('MessagePack parse error')
+
+    def test_04_renderer_and_parser(self):
+        data = {'count': 1, 'results': [JSONFragment('{"a":[1,"ё",0.5]}')],
+                'score': 7}
+        body = MessagePackRenderer().render(data)
+        assert MessagePackParser().parse(io.BytesIO(body)) == {
+            'count': 1, 'results': [{'a': [1, 'ё', 0.5]}], 'score': 7}
+        assert MessagePackRenderer().render(None) == b''
+        for invalid in (b'', b'\x92\x01', b'\x81\x01\x02', b'\x01\x02'):
+            with pytest.raises(ParseError):
+                MessagePackParser().parse(io.BytesIO(invalid))
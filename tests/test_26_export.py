@@ -0,0 +1,116 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.views import ExportView
+from reviews.models import Category, Comment, Genre, Review, Title
+
+EXPORT_URL = '/api/v1/export/{}.ndjson'
+
+
+def lines(response):
+    assert response.streaming
+    assert response['Content-Type'] == 'application/x-ndjson'
+    content = b''.join(response.streaming_content)
+    assert content.endswith(b'\n') or not content
+    return content.splitlines()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26Export:
+
+    @pytest.fixture(autouse=True)
+    def objects(self, admin, user):
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        comedy = Genre.objects.create(name='Комедия', slug='comedy')
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        self.titles = []
+        for idx in range(5):
+            title = Title.objects.create(
+                name=f'Произведение «{idx}»', year=1900 + idx,
+                category=movie if idx % 2 else None,
+                description='Строка с разделителем')
+            title.genre.set([comedy, drama][:idx % 3])
+            self.titles.append(title)
+        for idx, title in enumerate(self.titles[:3]):
+            for author in (admin, user):
+                review = Review.objects.create(
+                    title=title, author=author, score=idx + 3,
+                    text=f'Отзыв "{idx}"\nвторая строка')
+                Comment.objects.create(review=review, author=user,
+                                       text='Ответ')
+
+    def test_01_titles_as_in_api(self, admin_client, client):
+        # Часть представлений сохранена, часть сброшена.
+        client.get(f'/api/v1/titles/{self.titles[1].pk}/')
+        client.get(f'/api/v1/titles/{self.titles[2].pk}/')
+        Title.objects.filter(pk=self.titles[2].pk).expire_json()
+        expected = [client.get(f'/api/v1/titles/{title.pk}/').content
+                    for title in self.titles]
+        Title.objects.filter(pk__in=[self.titles[0].pk, self.titles[3].pk]
+                             ).expire_json()
+        stale = set(Title.objects.filter(cached_json=None))
+        assert len(stale) >= 2
+        assert lines(admin_client.get(EXPORT_URL.format('titles'))) == (
+            expected)
+        # Выгрузка не сохраняет представления.
+        assert set(Title.objects.filter(cached_json=None)) == stale
+
+    def test_02_reviews_and_comments(self, admin_client, client):
+        reviews = [json.loads(line) for line in lines(
+            admin_client.get(EXPORT_URL.format('reviews')))]
+        comments = [json.loads(line) for line in lines(
+            admin_client.get(EXPORT_URL.format('comments')))]
+        assert [item['id'] for item in reviews] == list(
+            Review.objects.order_by('id').values_list('id', flat=True))
+        assert len(comments) == Comment.objects.count()
+        for review in reviews:
+            url = f'/api/v1/titles/{review.pop("title")}/reviews/'
+            assert client.get(f'{url}{review["id"]}/').json() == review
+        for comment in comments:
+            url = (f'/api/v1/titles/{comment.pop("title")}/reviews/'
+                   f'{comment.pop("review")}/comments/{comment["id"]}/')
+            assert client.get(url).json() == comment
+
+    def test_03_chunks(self, admin_client, monkeypatch):
+        monkeypatch.setattr(ExportView, 'chunk_size', 2)
+        Title.objects.expire_json()
+        for name in ('titles', 'reviews', 'comments'):
+            response = admin_client.get(EXPORT_URL.format(name))
+            with CaptureQueriesContext(connection) as queries:
+                chunks = list(response.streaming_content)
+            assert [chunk.count(b'\n') for chunk in chunks] == (
+                [2, 2, 1] if name == 'titles' else [2, 2, 2])
+            # Одна выборка с курсором; сброшенные произведения и их
+            # жанры - двумя запросами на порцию.
+            assert len(queries) == 1 + (
+                2 * len(chunks) if name == 'titles' else 0)
+
+    def test_04_first_chunk_before_query_ends(self, admin_client,
+                                              monkeypatch):
+        monkeypatch.setattr(ExportView, 'chunk_size', 2)
+        response = admin_client.get(EXPORT_URL.format('titles'))
+        first = next(iter(response.streaming_content))
+        assert first.count(b'\n') == 2
+        response.close()
+
+    def test_05_permissions(self, client, user_client, moderator_client,
+                            admin_client):
+        for name in ('titles', 'reviews', 'comments'):
+            url = EXPORT_URL.format(name)
+            assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+            for api_client in (user_client, moderator_client):
+                response = api_client.get(url)
+                assert response.status_code == HTTPStatus.FORBIDDEN
+                assert response['Content-Type'] == 'application/x-ndjson'
+                assert response.content.count(b'\n') == 1
+                assert 'detail' in json.loads(response.content)
+            response = user_client.get(url, HTTP_ACCEPT='application/json')
+            assert response['Content-Type'] == 'application/json'
+        assert admin_client.get(
+            EXPORT_URL.format('users')).status_code == HTTPStatus.NOT_FOUND
+        response = admin_client.post(EXPORT_URL.format('titles'))
+        assert response.status_code == HTTPStatus.METHOD_NOT_ALLOWED
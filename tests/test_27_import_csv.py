@@ -0,0 +1,112 @@
+import csv
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db.models import Avg, Count
+from django.db.models.signals import post_init
+from django.utils.dateparse import parse_datetime
+
+from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+
+DATA_DIR = settings.BASE_DIR / 'static' / 'data'
+FILES = {'users.csv': CustomUser, 'category.csv': Category,
+         'genre.csv': Genre, 'titles.csv': Title,
+         'genre_title.csv': Title.genre.through, 'review.csv': Review,
+         'comments.csv': Comment}
+
+
+def rows(file_name):
+    with open(DATA_DIR / file_name, encoding='utf-8', newline='') as file:
+        return list(csv.DictReader(file))
+
+
+def import_csv(**options):
+    out = StringIO()
+    call_command('import_csv', stdout=out, **options)
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27ImportCSV:
+
+    def test_01_loads_all_files(self):
+        output = import_csv()
+        for file_name, model in FILES.items():
+            assert model.objects.count() == len(rows(file_name))
+            assert f'{file_name}: строк {len(rows(file_name))}' in output
+        review = rows('review.csv')[0]
+        assert Review.objects.get(pk=review['id']).pub_date == (
+            parse_datetime(review['pub_date']))
+        user = CustomUser.objects.get(username=rows('users.csv')[0][
+            'username'])
+        assert not user.has_usable_password()
+        assert user.normalized_email == user.email.casefold()
+        title = Title.objects.get(pk=rows('titles.csv')[0]['id'])
+        assert title.normalized_name == title.name.casefold()
+        assert title.category_id == int(rows('titles.csv')[0]['category'])
+
+    def test_02_derived_data(self, client):
+        client.get('/api/v1/titles/')
+        # Произведение без отзывов с неверными счётчиками.
+        empty = Title.objects.create(name='Пустое', year=2000, id=1000,
+                                     rating_sum=5, rating_count=1,
+                                     rating_avg=5)
+        import_csv()
+        expected = Review.objects.values('title').annotate(
+            avg=Avg('score'), count=Count('id'))
+        for row in expected:
+            title = Title.objects.get(pk=row['title'])
+            assert title.rating_count == row['count']
+            assert title.rating == pytest.approx(row['avg'])
+            assert title.rating_avg == title.rating
+        empty.refresh_from_db()
+        assert (empty.rating_sum, empty.rating_count, empty.rating_avg) == (
+            0, 0, 0)
+        assert Title.objects.recount_ratings() == 0
+        response = client.get('/api/v1/titles/', {'name': 'шоушенк'})
+        assert response.json()['count'] == 1
+        assert response.json()['results'][0]['rating'] is not None
+        title = Title.objects.order_by('id').first()
+        response = client.get(f'/api/v1/titles/{title.pk}/reviews/')
+        assert response.json()['count'] == title.rating_count
+
+    def test_03_idempotent(self):
+        import_csv(batch_size=7)
+        counts = {name: model.objects.count()
+                  for name, model in FILES.items()}
+        Title.objects.update(rating_sum=0)
+        output = import_csv()
+        assert 'добавлено: 0' in output
+        assert counts == {name: model.objects.count()
+                          for name, model in FILES.items()}
+        # Ничего не добавлено - производные данные не пересчитываются.
+        assert not Title.objects.exclude(rating_sum=0).exists()
+
+    def test_04_no_row_signals(self):
+        calls = []
+
+        def receiver(sender, **kwargs):
+            calls.append(sender)
+
+        post_init.connect(receiver)
+        try:
+            import_csv()
+            # Объекты создаёт только сборка JSON произведений после
+            # фиксации загрузки.
+            assert set(calls) <= {Title, Category, Genre}
+            assert not Title.objects.filter(cached_json=None).exists()
+            calls.clear()
+            CustomUser.objects.first()
+            assert calls == [CustomUser]
+        finally:
+            post_init.disconnect(receiver)
+
+    def test_05_missing_files(self, tmp_path):
+        (tmp_path / 'users.csv').write_text('id,username,email\n')
+        with pytest.raises(CommandError, match='genre.csv'):
+            import_csv(path=tmp_path)
+        with pytest.raises(CommandError):
+            import_csv(batch_size=0)
+        assert not CustomUser.objects.exists()
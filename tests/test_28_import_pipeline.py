@@ -0,0 +1,131 @@
+import shutil
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+
+from reviews import csv_pipeline
+from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+
+DATA_DIR = settings.BASE_DIR / 'static' / 'data'
+MODELS = (CustomUser, Category, Genre, Title, Title.genre.through, Review,
+          Comment)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def import_csv(**options):
+    out = StringIO()
+    call_command('import_csv', stdout=out, **options)
+    return out.getvalue()
+
+
+def snapshot():
+    """Содержимое таблиц без даты регистрации (ставится при загрузке)."""
+    return {
+        model._meta.label: list(model.objects.order_by('pk').values_list(
+            *(field.attname for field in model._meta.concrete_fields
+              if field.name != 'date_joined')))
+        for model in MODELS}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    target = tmp_path / 'data'
+    shutil.copytree(DATA_DIR, target)
+    return target
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28ImportPipeline:
+
+    def test_01_same_as_sequential(self, data_dir):
+        import_csv(path=data_dir)
+        expected = snapshot()
+        call_command('flush', interactive=False, verbosity=0)
+        output = import_csv(path=data_dir, workers=2, chunk_rows=7)
+        assert snapshot() == expected
+        assert f'review.csv: строк {Review.objects.count()}' in output
+        assert 'производные данные' in output
+        assert not csv_pipeline.default_checkpoint(data_dir).exists()
+        assert not list(data_dir.glob('*.json'))
+        assert not CustomUser.objects.first().has_usable_password()
+
+    def test_02_multiline_fields(self, tmp_path):
+        path = tmp_path / 'genre.csv'
+        path.write_bytes('id,name,slug\n1,"Две\nстроки",a\n'
+                         '2,"С ""кавычками""\n\nи абзацем",b\n3,Одна,c\n'
+                         .encode('utf-8'))
+        fieldnames, start = csv_pipeline.read_header(path)
+        assert fieldnames == ['id', 'name', 'slug']
+        ranges = list(csv_pipeline.chunk_ranges(path, start, 1))
+        assert len(ranges) == 3
+        table_index = [table.file_name for table in
+                       csv_pipeline.TABLES].index('genre.csv')
+        names = [csv_pipeline.parse_chunk(table_index, path, fieldnames,
+                                          begin, end, 'default')[1][0][1]
+                 for begin, end in ranges]
+        assert names == ['Две\nстроки', 'С "кавычками"\n\nи абзацем',
+                         'Одна']
+
+    def test_03_resumes_after_interruption(self, data_dir, monkeypatch):
+        checkpoint = csv_pipeline.default_checkpoint(data_dir)
+        write = csv_pipeline.write_chunk
+        reviews = []
+
+        def failing(connection, sql, values):
+            if 'reviews_review' in sql:
+                if len(reviews) == 2:
+                    raise Interrupted
+                reviews.append(values)
+            write(connection, sql, values)
+
+        monkeypatch.setattr(csv_pipeline, 'write_chunk', failing)
+        with pytest.raises(Interrupted):
+            import_csv(path=data_dir, workers=2, chunk_rows=5)
+        assert Review.objects.count() == 10
+        assert not Comment.objects.exists()
+        assert checkpoint.exists()
+        assert not list(data_dir.glob('*.json'))
+        state = csv_pipeline.Checkpoint(checkpoint).state
+        assert state['review.csv']['rows'] == 10
+        assert not state['review.csv']['done']
+        assert state['users.csv']['done']
+
+        written = []
+
+        def counting(connection, sql, values):
+            written.append(sql)
+            write(connection, sql, values)
+
+        monkeypatch.setattr(csv_pipeline, 'write_chunk', counting)
+        output = import_csv(path=data_dir, workers=2, chunk_rows=5)
+        assert 'users.csv: загружен ранее' in output
+        assert 'продолжено после 10' in output
+        assert not any('reviews_customuser' in sql for sql in written)
+        assert not checkpoint.exists()
+        for model in MODELS:
+            assert model.objects.exists()
+        title = Title.objects.filter(reviews__isnull=False).first()
+        assert title.rating_count == title.reviews.count()
+
+    def test_04_changed_file_restarts(self, data_dir):
+        checkpoint = csv_pipeline.Checkpoint(data_dir / 'checkpoint.json')
+        path = data_dir / 'genre.csv'
+        table = csv_pipeline.TABLES[2]
+        checkpoint.save(table, path, 10, 1)
+        assert checkpoint.position(table, path) == (10, 1, False)
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write('100,Новый,new\n')
+        assert checkpoint.position(table, path) == (None, 0, False)
+
+    def test_05_in_process(self, data_dir):
+        total, _ = csv_pipeline.Pipeline(
+            data_dir, data_dir / 'checkpoint.json', workers=0,
+            chunk_rows=3, report=lambda line: None).run()
+        assert total == sum(model.objects.count() for model in MODELS)
+        with pytest.raises(CommandError):
+            import_csv(path=data_dir, workers=2, chunk_rows=0)
@@ -0,0 +1,92 @@
+from collections import Counter
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Avg, Count, F
+
+from reviews import dataset
+from reviews.models import Comment, CustomUser, Review, Title
+
+
+def generate_dataset(**options):
+    out = StringIO()
+    call_command('generate_dataset', stdout=out, **options)
+    return out.getvalue()
+
+
+def snapshot():
+    return {
+        model._meta.label: list(model.objects.order_by('pk').values_list(
+            *(field.attname for field in model._meta.concrete_fields)))
+        for model in dataset.MODELS}
+
+
+@pytest.mark.django_db(transaction=True)
+class Test29GenerateDataset:
+
+    def test_01_sizes(self):
+        output = generate_dataset(scale=2)
+        sizes = dataset.dataset_sizes(2)
+        assert CustomUser.objects.count() == sizes['users']
+        assert Title.objects.count() == sizes['titles']
+        assert Review.objects.count() == sizes['reviews']
+        assert Comment.objects.count() == sizes['comments']
+        assert f'reviews_review: строк {sizes["reviews"]}' in output
+        assert not CustomUser.objects.first().has_usable_password()
+
+    def test_02_deterministic(self):
+        generate_dataset(seed=3, batch_size=7)
+        first = snapshot()
+        generate_dataset(seed=3, clear=True)
+        assert snapshot() == first
+        generate_dataset(seed=4, clear=True)
+        assert snapshot() != first
+
+    def test_03_skewed_reviews(self):
+        generate_dataset(scale=3)
+        counts = sorted(Title.objects.values_list('rating_count', flat=True),
+                        reverse=True)
+        # Десятая часть произведений собирает больше половины отзывов,
+        # часть произведений остаётся без отзывов.
+        assert sum(counts[:len(counts) // 10]) > sum(counts) / 2
+        assert counts[-1] == 0
+        # Популярные произведения не идут подряд по id.
+        top = Title.objects.order_by('-rating_count').values_list(
+            'id', flat=True)[:5]
+        assert sorted(top) != list(range(min(top), min(top) + 5))
+
+    def test_04_dates_and_derived_data(self):
+        generate_dataset()
+        start = dataset.DATASET_END - timedelta(days=dataset.DATASET_DAYS)
+        assert not Review.objects.exclude(
+            pub_date__range=(start, dataset.DATASET_END)).exists()
+        assert not Comment.objects.filter(
+            pub_date__lt=F('review__pub_date')).exists()
+        # Всплески: в самый активный день больше отзывов, чем в среднем
+        # за неделю.
+        days = Counter(Review.objects.values_list('pub_date__date',
+                                                  flat=True))
+        assert max(days.values()) > 7 * Review.objects.count() / len(days)
+        expected = Review.objects.values('title').annotate(
+            avg=Avg('score'), count=Count('id'))
+        for row in expected:
+            title = Title.objects.get(pk=row['title'])
+            assert title.rating_count == row['count']
+            assert title.rating == pytest.approx(row['avg'])
+        assert Title.objects.recount_ratings() == 0
+
+    def test_05_api_and_errors(self, client):
+        generate_dataset()
+        response = client.get('/api/v1/titles/')
+        assert response.json()['count'] == Title.objects.count()
+        review = Review.objects.first()
+        response = client.get(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/')
+        assert response.json()['text'] == review.text
+        with pytest.raises(CommandError, match='--clear'):
+            generate_dataset()
+        with pytest.raises(CommandError):
+            generate_dataset(scale=0, clear=True)
+        assert Title.objects.count() == dataset.dataset_sizes(1)['titles']
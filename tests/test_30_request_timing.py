@@ -0,0 +1,107 @@
+import json
+import logging
+import re
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api import middleware
+from api.views import AnonymousResponseCacheMixin
+from reviews.models import Category, Genre, Review, Title
+
+
+def metrics(response):
+    """Server-Timing: имя -> (длительность, описание)."""
+    result = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        params = dict(param.split('=', 1) for param in params)
+        result[name] = (float(params['dur']),
+                        params.get('desc', '').strip('"'))
+    return result
+
+
+def timing_logs(caplog):
+    return [record for record in caplog.records
+            if record.name == 'api.timing']
+
+
+@pytest.mark.django_db(transaction=True)
+class Test30RequestTiming:
+
+    @pytest.fixture(autouse=True)
+    def objects(self, admin, monkeypatch, caplog, settings):
+        settings.REQUEST_TIMING_SAMPLE_RATE = 1
+        caplog.set_level(logging.INFO, logger='api.timing')
+        # Запросы доходят до базы, а не до кеша ответов.
+        monkeypatch.setattr(AnonymousResponseCacheMixin,
+                            'response_cache_timeout', 0)
+        drama = Genre.objects.create(name='Драма', slug='drama')
+        movie = Category.objects.create(name='Фильм', slug='movie')
+        self.title = Title.objects.create(name='Сталкер', year=1979,
+                                          category=movie)
+        self.title.genre.set([drama])
+        self.review = Review.objects.create(
+            title=self.title, author=admin, text='Отзыв', score=7)
+
+    def test_01_server_timing(self, client):
+        url = f'/api/v1/titles/{self.title.pk}/reviews/'
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        timing = metrics(response)
+        assert set(timing) == {'db', 'serializer', 'view', 'total'}
+        assert timing['db'][1] == f'{len(queries)} SQL'
+        assert 0 < timing['db'][0] <= timing['view'][0] <= timing['total'][0]
+        assert timing['serializer'][0] > 0
+
+    def test_02_log_line(self, client, admin_client, caplog):
+        client.get(f'/api/v1/titles/{self.title.pk}/')
+        response = admin_client.post(
+            f'/api/v1/titles/{self.title.pk}/reviews/',
+            {'text': 'Ещё', 'score': 5}, format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        detail, create = (record.request_timing
+                          for record in timing_logs(caplog))
+        assert detail['view'] == 'titles-detail'
+        assert (detail['method'], detail['status']) == ('GET', 200)
+        assert create['view'] == 'reviews-list'
+        assert (create['method'], create['status']) == ('POST', 400)
+        # Проверка единственности отзыва - SQL внутри сериализатора.
+        assert create['serializer_ms'] > 0 and create['queries'] > 0
+        message = json.loads(timing_logs(caplog)[-1].getMessage())
+        assert message == create
+        assert set(message) == {
+            'method', 'path', 'view', 'status', 'queries', 'db_ms',
+            'serializer_ms', 'view_ms', 'total_ms'}
+
+    def test_03_nested_serializers_counted_once(self, client):
+        response = client.get('/api/v1/titles/')
+        timing = metrics(response)
+        assert timing['serializer'][0] <= timing['view'][0]
+        Title.objects.expire_json()
+        response = client.get(f'/api/v1/titles/{self.title.pk}/')
+        timing = metrics(response)
+        assert 0 < timing['serializer'][0] <= timing['view'][0]
+
+    def test_04_sampling(self, client, caplog, monkeypatch, settings):
+        url = '/api/v1/categories/'
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0
+        assert 'Server-Timing' not in client.get(url)
+        values = iter((0.7, 0.2))
+        monkeypatch.setattr(middleware.random, 'random',
+                            lambda: next(values))
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0.5
+        assert 'Server-Timing' not in client.get(url)
+        assert 'Server-Timing' in client.get(url)
+        assert len(timing_logs(caplog)) == 1
+
+    def test_05_without_debug(self, client, settings):
+        settings.DEBUG = False
+        response = client.get('/api/v1/genres/')
+        assert re.fullmatch(r'db;dur=[\d.]+;desc="\d+ SQL", .*',
+                            response['Server-Timing'])
+        # Журнал запросов Django при этом не ведётся.
+        assert not connection.queries
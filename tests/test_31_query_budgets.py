@@ -0,0 +1,142 @@
+import json
+import logging
+from http import HTTPStatus
+
+import pytest
+from rest_framework import viewsets
+
+from api import budgets
+from api.budgets import QueryBudgetExceeded, fingerprint
+from api.urls import router_v1
+from api.views import (AnonymousResponseCacheMixin, CategoryViewSet,
+                       GenreViewSet, ReviewViewSet, TitleViewSet)
+from reviews.models import Category, Genre, Review, Title
+
+# Заглушки с ответом 405: бюджет им не нужен.
+NOT_ALLOWED = {(CategoryViewSet, 'retrieve'), (GenreViewSet, 'retrieve'),
+               (TitleViewSet, 'update')}
+
+
+def budget_logs(caplog):
+    return [record for record in caplog.records
+            if record.name == 'api.budgets']
+
+
+def reviews_without_authors(self):
+    # N+1: авторы отзывов загружаются по одному при сериализации.
+    return self.get_title().reviews.order_by(*self.keyset_ordering)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test31QueryBudgets:
+
+    @pytest.fixture(autouse=True)
+    def objects(self, django_user_model, monkeypatch):
+        monkeypatch.setattr(AnonymousResponseCacheMixin,
+                            'response_cache_timeout', 0)
+        self.title = Title.objects.create(name='Сталкер', year=1979)
+        for number in range(5):
+            author = django_user_model.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@yamdb.fake')
+            Review.objects.create(title=self.title, author=author,
+                                  text='Отзыв', score=number + 5)
+        self.url = f'/api/v1/titles/{self.title.pk}/reviews/'
+
+    def n_plus_one(self, monkeypatch):
+        monkeypatch.setattr(ReviewViewSet, 'list', viewsets.ModelViewSet.list)
+        monkeypatch.setattr(ReviewViewSet, 'get_queryset',
+                            reviews_without_authors)
+
+    def test_01_fingerprint(self):
+        assert fingerprint(
+            "SELECT  \"id\" FROM t WHERE name = 'O''Hara' AND id IN "
+            "(1, 2, 3) LIMIT 21") == (
+            'SELECT "id" FROM t WHERE name = ? AND id IN (...) LIMIT ?')
+        assert fingerprint('SELECT * FROM t WHERE id IN (%s, %s)') == (
+            fingerprint('SELECT * FROM t WHERE id IN (%s)'))
+        # Цифры в именах не заменяются.
+        assert fingerprint('SELECT t2.id FROM t2') == 'SELECT t2.id FROM t2'
+
+    def test_02_within_budget(self, client):
+        response = client.get(self.url)
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == 5
+
+    def test_03_strict_n_plus_one(self, client, monkeypatch):
+        self.n_plus_one(monkeypatch)
+        with pytest.raises(QueryBudgetExceeded) as error:
+            client.get(self.url)
+        message = str(error.value)
+        assert message.startswith('ReviewViewSet.list: ')
+        assert 'при бюджете 4' in message
+        assert any(line.startswith('5 x SELECT') and 'WHERE' in line
+                   for line in message.splitlines())
+
+    def test_04_sampled_warning(self, client, monkeypatch, settings,
+                                caplog):
+        settings.QUERY_BUDGET_STRICT = False
+        settings.QUERY_BUDGET_SAMPLE_RATE = 1
+        self.n_plus_one(monkeypatch)
+        response = client.get(self.url)
+        assert response.status_code == HTTPStatus.OK
+        record, = (log.query_budget for log in budget_logs(caplog))
+        assert (record['view'], record['action']) == ('ReviewViewSet', 'list')
+        assert record['path'] == self.url
+        assert record['budget'] == 4 and record['queries'] > 4
+        assert record['fingerprints'][0]['count'] == 5
+        assert len(record['fingerprints']) <= budgets.REPORTED_FINGERPRINTS
+        assert json.loads(budget_logs(caplog)[0].getMessage()) == record
+
+    def test_05_sampling(self, client, monkeypatch, settings, caplog):
+        caplog.set_level(logging.WARNING, logger='api.budgets')
+        settings.QUERY_BUDGET_STRICT = False
+        # random.random() подменяется только для выборки бюджетов.
+        settings.REQUEST_TIMING_SAMPLE_RATE = 0
+        self.n_plus_one(monkeypatch)
+        settings.QUERY_BUDGET_SAMPLE_RATE = 0
+        client.get(self.url)
+        assert not budget_logs(caplog)
+        values = iter((0.7, 0.2))
+        monkeypatch.setattr(budgets.random, 'random', lambda: next(values))
+        settings.QUERY_BUDGET_SAMPLE_RATE = 0.5
+        client.get(self.url)
+        client.get(self.url)
+        assert len(budget_logs(caplog)) == 1
+
+    def test_06_routed_actions_budgeted(self):
+        for _, viewset, _ in router_v1.registry:
+            actions = set()
+            for route in router_v1.get_routes(viewset):
+                actions.update(
+                    action for method, action in route.mapping.items()
+                    if method in viewset.http_method_names
+                    and hasattr(viewset, action))
+            missing = {action for action in actions - set(
+                viewset.query_budgets) if (viewset, action) not in NOT_ALLOWED}
+            assert not missing, (viewset.__name__, missing)
+
+    def test_07_title_writes_with_many_genres(self, admin_client):
+        Category.objects.create(name='Фильм', slug='movie')
+        slugs = [f'genre{number}' for number in range(12)]
+        for slug in slugs:
+            Genre.objects.create(name=slug, slug=slug)
+        # Загруженный битовый индекс обновляется при каждой записи.
+        admin_client.get('/api/v1/titles/')
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Солярис', 'year': 1972, 'category': 'movie',
+            'genre': slugs})
+        assert response.status_code == HTTPStatus.CREATED
+        assert [genre['slug'] for genre in response.json()['genre']] == (
+            slugs)
+        url = f'/api/v1/titles/{response.json()["id"]}/'
+        response = admin_client.patch(url, data={'genre': slugs[6:]},
+                                      format='json')
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['genre']) == 6
+
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Зеркало', 'year': 1975, 'category': 'movie',
+            'genre': slugs + ['unknown']})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert 'unknown' in str(response.json()['genre'])
@@ -1,5 +1,9 @@
+import threading
+from contextlib import contextmanager
 from http import HTTPStatus
 
+from django.db import connection, transaction
+
 
 check_name_and_slug_patterns = (
     (
@@ -305,3 +309,37 @@ def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
         f'данные {obj_types[obj_type]}{results_in_msg}. Поле `id` не '
         'найдено или не является целым числом.'
     )
+
+
+@contextmanager
+def open_write_transaction(write):
+    """
+    Выполняет write() в транзакции другого потока и держит её открытой,
+    пока выполняется тело with; при выходе транзакция фиксируется.
+    """
+    written = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def writer():
+        try:
+            with transaction.atomic():
+                write()
+                written.set()
+                release.wait(10)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            written.set()
+            connection.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    written.wait(10)
+    try:
+        assert not errors, errors
+        yield
+    finally:
+        release.set()
+        thread.join()
+    assert not errors, errors